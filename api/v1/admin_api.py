@@ -0,0 +1,66 @@
+from fastapi import APIRouter, HTTPException
+import services.classify_email as classify_email_service
+import services.sentiment_model as sentiment_model_service
+from services import llm_cache, llm_gateway
+from services.imap_pool import imap_pool
+
+router = APIRouter(prefix="/v1/admin", tags=["Admin"])
+
+@router.get("/model")
+def model_status():
+    """
+    Version and prediction counters of the department classifier in service.
+    """
+    return classify_email_service.registry.status()
+
+@router.post("/model/reload")
+def reload_model():
+    """
+    Load the classifier artifact again and swap it in atomically.
+    Requests keep using the previous model until the new one is fully loaded.
+    """
+    try:
+        model = classify_email_service.load_model()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model reload failed, previous model kept: {e}")
+    return {"version": model.version, "loaded_at": model.loaded_at}
+
+@router.get("/sentiment-model")
+def sentiment_model_status():
+    """
+    Version and prediction counters of the local sentiment classifier, if one is configured.
+    """
+    if sentiment_model_service.registry is None:
+        return {"enabled": False}
+    return {"enabled": True, **sentiment_model_service.registry.status()}
+
+@router.get("/cache")
+def prediction_cache_stats():
+    """
+    Hit and miss counters of the department prediction cache.
+    With the process backend the counters include the workers' lookups, but
+    local_entries is this process's in-memory tier only; each worker keeps its own.
+    """
+    return classify_email_service.prediction_cache.stats()
+
+@router.get("/llm-cache")
+def llm_cache_stats():
+    """
+    Hit rates of the LLM response cache, overall and per service.
+    """
+    return llm_cache.stats()
+
+@router.get("/llm-gateway")
+def llm_gateway_stats():
+    """
+    Requests in flight against the LLM API, and requests, tokens and latency per service.
+    """
+    return llm_gateway.stats()
+
+
+@router.get("/imap-pool")
+def imap_pool_stats():
+    """
+    Open and idle IMAP sessions, and how often sessions were reused or had to log in again.
+    """
+    return imap_pool.stats()
@@ -1,16 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session
 from core.database import get_session
-import services.classify_email as classify_email_service
-from models.request_response import EmailClassificationRequest,EmailClassificationResponse
+from services.classification_executor import classify_email_async, classify_emails_async
+from models.request_response import EmailClassificationRequest,EmailClassificationResponse,EmailBatchClassificationRequest,EmailBatchClassificationResponse
 router = APIRouter(prefix="/v1", tags=["Classify Email"])
 
 @router.post("/email-classify", response_model=EmailClassificationResponse)
-def create(analysis: EmailClassificationRequest, session: Session = Depends(get_session)):
+async def create(analysis: EmailClassificationRequest, session: Session = Depends(get_session)):
     try:
-        result = classify_email_service.classify_email(analysis.email_content)
+        result = await classify_email_async(analysis.email_content)
         return EmailClassificationResponse(**result)
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail="An unexpected error occurred.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="An unexpected error occurred.")
+
+@router.post("/email-classify/batch", response_model=EmailBatchClassificationResponse)
+async def create_batch(analysis: EmailBatchClassificationRequest):
+    try:
+        results = await classify_emails_async(analysis.email_contents)
+        return EmailBatchClassificationResponse(results=[EmailClassificationResponse(**r) for r in results])
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="An unexpected error occurred.")
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Form
-from typing import Optional
+from fastapi import APIRouter, Form, HTTPException, Request
+from typing import AsyncIterator, Optional
 
 from langsmith import traceable
+from core import settings
 from graphs.email_classification_graph import graph, State
+from services.org_fanout import run_for_orgs
+from services.org_service import get_orgs_by_user_async
+from services.streaming import ndjson_response
 
 router = APIRouter(prefix="/v1/email-graph", tags=["Email Classification Graph"])
 
@@ -12,17 +16,110 @@ async def run_email_graph_api(
     user_id: str = Form(...),
     org_id: str = Form(...),
     offset: Optional[int] = Form(None),
-    limit: Optional[int] = Form(None)
+    limit: Optional[int] = Form(None),
+    refresh: bool = Form(False)
 ):
     """
     API endpoint to run the email classification graph.
+    Without offset, processes the next `limit` emails received since the org's last run; the first
+    run for an org (or after its mailbox's UIDVALIDITY changes) takes the latest `limit` emails, and
+    mail older than those is only reached with offset, which pages through the mailbox latest first.
+    Such runs report new_emails; with no new mail it is 0 and emails is empty.
+    Emails fetched or scored on earlier runs come from the store unless refresh is set.
     """
     state: State = {
         "userId": user_id or "",
         "orgId": org_id or "",
         "offset": offset,
         "limit": limit,
+        "refresh": refresh,
         "emails": None
     }
-    result = graph.invoke(state)
+    result = await graph.ainvoke(state)
     return result
+
+
+def _field_list(value: Optional[str]) -> Optional[set[str]]:
+    return {name.strip() for name in value.split(",") if name.strip()} if value else None
+
+
+def _project(email_obj: dict, fields: Optional[set[str]], exclude: Optional[set[str]]) -> dict:
+    return {
+        key: value for key, value in email_obj.items()
+        if (fields is None or key in fields) and (exclude is None or key not in exclude)
+    }
+
+
+async def _graph_records(state: State, fields: Optional[set[str]], exclude: Optional[set[str]]) -> AsyncIterator[dict]:
+    count = 0
+    final: dict = {}
+    # "custom" carries each finished email, written from inside the per-email subgraphs (hence subgraphs=True);
+    # "updates" the page state after every top-level node
+    async for namespace, mode, payload in graph.astream(state, stream_mode=["custom", "updates"], subgraphs=True):
+        if mode == "custom":
+            count += 1
+            yield {"type": "email", "email": _project(payload["email"], fields, exclude)}
+        elif not namespace:
+            for update in payload.values():
+                final.update(update or {})
+    yield {"type": "result", "count": count, "error": final.get("error"), "sync": final.get("sync"),
+           "new_emails": final.get("new_emails")}
+
+
+@router.post("/run/stream")
+async def run_email_graph_stream_api(
+    request: Request,
+    user_id: str = Form(...),
+    org_id: str = Form(...),
+    offset: Optional[int] = Form(None),
+    limit: Optional[int] = Form(None),
+    refresh: bool = Form(False),
+    fields: Optional[str] = Form(None, description="Comma-separated email fields to keep, e.g. email_id,subject,classification_report,sentiment_analysis"),
+    exclude: Optional[str] = Form(None, description="Comma-separated email fields to drop, e.g. body")
+):
+    """
+    Same as /run, streamed as newline-delimited JSON: a {"type": "email"} line as soon as each email
+    has its department and sentiment (in completion order), then one {"type": "result"} line with the
+    email count, error, sync state and new_emails. Disconnecting stops the run.
+    """
+    state: State = {
+        "userId": user_id or "",
+        "orgId": org_id or "",
+        "offset": offset,
+        "limit": limit,
+        "refresh": refresh,
+        "emails": None
+    }
+    return ndjson_response(request, _graph_records(state, _field_list(fields), _field_list(exclude)))
+
+
+@router.post("/run-all")
+async def run_email_graph_for_user_api(
+    user_id: str = Form(...),
+    offset: Optional[int] = Form(None),
+    limit: Optional[int] = Form(None),
+    refresh: bool = Form(False),
+    timeout: Optional[float] = Form(None)
+):
+    """
+    Run the email classification graph for every org of a user concurrently, with /run's offset and
+    limit semantics (a first run takes each org's latest `limit` emails).
+    Each org has its own timeout; orgs that fail or time out are reported without failing the others.
+    """
+    orgs = await get_orgs_by_user_async(int(user_id))
+    if not orgs:
+        raise HTTPException(status_code=404, detail="No orgs found for this user")
+
+    async def run_org(org_id: int) -> dict:
+        state: State = {
+            "userId": user_id,
+            "orgId": str(org_id),
+            "offset": offset,
+            "limit": limit,
+            "refresh": refresh,
+            "emails": None
+        }
+        return await graph.ainvoke(state)
+
+    report = await run_for_orgs([org.id for org in orgs], run_org, timeout or settings.ORG_FANOUT_TIMEOUT)
+    return {"userId": user_id, **report}
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Form
-from services.generate_email_using_rag import generate_email_with_rag
-from services.generic_email_replyer import generate_email_reply
+from fastapi import APIRouter, Form, Request
+from services.generate_email_using_rag import generate_email_with_rag_async, stream_email_with_rag
+from services.generic_email_replyer import generate_email_reply_async, stream_email_reply
+from services.streaming import sse_response, text_events
 
 router = APIRouter(prefix="/v1/email-reply", tags=["Generic Email Replyer"])
 
@@ -9,10 +10,19 @@ async def generate_reply_api(email_text: str = Form(...)):
 	"""
 	Generate a polite, professional, and context-aware email reply using LLM.
 	"""
-	reply = generate_email_reply(email_text)
+	reply = await generate_email_reply_async(email_text)
 	return {"reply": reply}
 
 
+@router.post("/generate_reply/stream")
+async def generate_reply_stream_api(request: Request, email_text: str = Form(...)):
+	"""
+	Same as /generate_reply, streamed as Server-Sent Events: a "token" event per chunk of the reply,
+	then "done" with the whole reply. Disconnecting cancels the LLM request.
+	"""
+	return sse_response(request, text_events(stream_email_reply(email_text), "reply"))
+
+
 # generate_email_with_rag
 @router.post("/generate_email_with_rag")
 async def generate_email_with_rag_api(
@@ -23,5 +33,18 @@ async def generate_email_with_rag_api(
 	"""
 	Generate a polite, professional, and context-aware email reply using RAG.
 	"""
-	reply = generate_email_with_rag(email_text, collection_name, k)
-	return {"reply": reply}
\ No newline at end of file
+	reply = await generate_email_with_rag_async(email_text, collection_name, k)
+	return {"reply": reply}
+
+
+@router.post("/generate_email_with_rag/stream")
+async def generate_email_with_rag_stream_api(
+	request: Request,
+	email_text: str = Form(...),
+	collection_name: str = Form(...),
+	k: int = Form(3)
+):
+	"""
+	Same as /generate_email_with_rag, streamed as Server-Sent Events ("token" events, then "done").
+	"""
+	return sse_response(request, text_events(stream_email_with_rag(email_text, collection_name, k), "reply"))
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from typing import List
 from models.schema import Org, ProviderEnum
-from services.org_service import create_org, get_orgs_by_user, get_org_by_id
+from services.org_service import create_org_async, get_orgs_by_user_async, get_org_by_id_async
 
 router = APIRouter(prefix="/v1/orgs", tags=["Org Functionality"])
 
@@ -9,7 +9,7 @@ router = APIRouter(prefix="/v1/orgs", tags=["Org Functionality"])
 @router.post("/create", response_model=Org)
 async def api_create_org(org: Org):
 	try:
-		created_org = create_org(org)
+		created_org = await create_org_async(org)
 		return created_org
 	except Exception as e:
 		raise HTTPException(status_code=500, detail=str(e))
@@ -17,13 +17,13 @@ async def api_create_org(org: Org):
 # 2. Get all orgs of a user
 @router.get("/user/{user_id}", response_model=List[Org])
 async def api_get_orgs_by_user(user_id: int):
-	orgs = get_orgs_by_user(user_id)
+	orgs = await get_orgs_by_user_async(user_id)
 	return orgs
 
 # 3. Get org by orgid
 @router.get("/{org_id}", response_model=Org)
 async def api_get_org_by_id(org_id: int):
-	org = get_org_by_id(org_id)
+	org = await get_org_by_id_async(org_id)
 	if not org:
 		raise HTTPException(status_code=404, detail="Org not found")
 	return org
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Query
-from services.rag_retrieval import retrieve_from_pgvector
+from services.rag_retrieval import retrieve_from_pgvector_async
 
 router = APIRouter(prefix="/v1/rag", tags=["RAG Retrieval"])
 
@@ -12,7 +12,7 @@ async def rag_retrieve(
 	"""
 	Retrieve top-k most similar documents from PGVector for a given query and collection name.
 	"""
-	output = retrieve_from_pgvector(query, collection_name, k)
+	output = await retrieve_from_pgvector_async(query, collection_name, k)
 	# Format results for API response
 	return {
 		"llm_answer": output["llm_answer"],
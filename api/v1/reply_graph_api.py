@@ -1,11 +1,25 @@
-from fastapi import APIRouter, Form
+from fastapi import APIRouter, Form, Request
 from typing import Optional
 
 from langsmith import traceable
-from graphs.reply_graph import graph, State
+from graphs.reply_graph import astream_reply, graph, State
+from services.streaming import sse_response
 
 router = APIRouter(prefix="/v1/reply-graph", tags=["Reply Graph"])
 
+def _initial_state(email_subject, email_body, custom_query_input, collection_name, tone, tool_instructions) -> State:
+    return {
+        "email_body": email_body or "",
+        "tone": tone or "professional",
+        "tool_instructions": tool_instructions or "",
+        "collection_name": collection_name or "",
+        "email_subject": email_subject or "",
+        "custom_query_input": custom_query_input or "",
+        "input": "",
+        "final_response": "",
+        "tool_outputs": ""
+    }
+
 @traceable(name="classify_reply_api")
 @router.post("/run")
 async def run_reply_graph_api(
@@ -19,16 +33,24 @@ async def run_reply_graph_api(
     """
     API endpoint to run the reply graph.
     """
-    state: State = {
-        "email_body": email_body or "",
-        "tone": tone or "professional",
-        "tool_instructions": tool_instructions or "",
-        "collection_name": collection_name or "",
-        "email_subject": email_subject or "",
-        "custom_query_input": custom_query_input or "",
-        "input": "",
-        "final_response": "",
-        "tool_outputs": ""
-    }
-    result = graph.invoke(state)
+    state = _initial_state(email_subject, email_body, custom_query_input, collection_name, tone, tool_instructions)
+    result = await graph.ainvoke(state)
     return result
+
+
+@router.post("/run/stream")
+async def run_reply_graph_stream_api(
+    request: Request,
+    email_subject: Optional[str] = Form(None),
+    email_body: Optional[str] = Form(None),
+    custom_query_input: Optional[str] = Form(None),
+    collection_name: Optional[str] = Form(None),
+    tone: Optional[str] = Form("professional"),
+    tool_instructions: Optional[str] = Form(None)
+):
+    """
+    Run the reply graph, streamed as Server-Sent Events: "step" as each node finishes, "token" for
+    each chunk of the final reply and "done" with final_response. Disconnecting cancels the run.
+    """
+    state = _initial_state(email_subject, email_body, custom_query_input, collection_name, tone, tool_instructions)
+    return sse_response(request, astream_reply(state))
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Form
-from services.generate_email_from_db import generate_select_query
+from services.generate_email_from_db import generate_select_query_async
 
 router = APIRouter(prefix="/v1/db-query", tags=["DB Query Generator"])
 
@@ -8,5 +8,5 @@ async def run_query_api(user_request: str = Form(...)):
 	"""
 	Generate and execute a safe SQL SELECT query using LLM and return the results.
 	"""
-	result = generate_select_query(user_request)
+	result = await generate_select_query_async(user_request)
 	return {"result": result}
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+import asyncio
 import os
 import tempfile
 from langchain_community.document_loaders import (
@@ -40,7 +41,8 @@ async def store_document_vector(
 	try:
 			file_bytes = await file.read()
 			loader_cls = loader_map[file.content_type]
-			result = store_pdf_in_pgvector(file_bytes, collection_name=collection_name, loader_cls=loader_cls)
+			# Loading, splitting and embedding are blocking: keep them off the event loop
+			result = await asyncio.to_thread(store_pdf_in_pgvector, file_bytes, collection_name=collection_name, loader_cls=loader_cls)
 			return {"status": "success", **result}
 	except Exception as e:
 		raise HTTPException(status_code=500, detail=str(e))
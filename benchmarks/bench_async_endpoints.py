@@ -0,0 +1,140 @@
+"""
+Whether slow requests hold up fast ones in the same worker. uvicorn serves the
+app in front of a fake chat server whose every reply takes --latency-ms; while
+--slow slow requests are in flight, --fast requests to /v1/email-classify (no
+LLM) are timed one after another.
+
+    blocking    the handlers as they were: async def calling generate_email_reply
+                and graph.invoke directly, which holds the event loop for the
+                whole model call
+    async       /v1/email-reply/generate_reply and /v1/reply-graph/run, which
+                await the async chain and graph.ainvoke
+
+For each it reports when the last slow request finished and the fast requests'
+median and worst latency. It is also the check that the async handlers don't
+block: it exits non-zero, naming the endpoint, if under an async handler any
+fast request took a quarter of a model call or more, or the slow requests did
+not overlap. The database-backed endpoints (RAG, db-query, orgs) need Postgres
+and are not run.
+
+Run from the repository root:
+    OPENAI_API_KEY=fake uv run python -m benchmarks.bench_async_endpoints --slow 4 --fast 20 --latency-ms 1000
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import uvicorn
+from fastapi import APIRouter, FastAPI, Form
+
+from benchmarks.fake_chat_server import FakeChatServer
+from core import settings
+from services.classify_email import load_model
+
+
+def _blocking_router() -> APIRouter:
+    from graphs.reply_graph import graph
+    from services.generic_email_replyer import generate_email_reply
+    router = APIRouter(prefix="/blocking")
+
+    @router.post("/generate_reply")
+    async def generate_reply(email_text: str = Form(...)):
+        return {"reply": generate_email_reply(email_text)}
+
+    @router.post("/reply-graph/run")
+    async def run_reply_graph(email_body: str = Form(...)):
+        return graph.invoke({"email_body": email_body, "tone": "professional"})
+
+    return router
+
+
+# A fast request under an async handler must stay well below one model call: a blocking
+# handler makes it wait for at least one (usually several)
+MAX_FAST_SHARE = 0.25
+
+
+def _email() -> str:
+    return f"Hello, could you confirm invoice {uuid.uuid4().hex[:8]} has been processed? Thanks, Priya"
+
+
+def _run(base_url: str, path: str, slow: int, fast: int) -> tuple[float, list[float]]:
+    field = "email_body" if "reply-graph" in path else "email_text"
+    with httpx.Client(base_url=base_url, timeout=120) as slow_client, \
+            httpx.Client(base_url=base_url, timeout=120) as fast_client, ThreadPoolExecutor(slow) as pool:
+        start = time.perf_counter()
+        pending = [pool.submit(lambda: slow_client.post(path, data={field: _email()}).raise_for_status())
+                   for _ in range(slow)]
+        time.sleep(0.2)  # the slow requests are in by now
+        latencies = []
+        for i in range(fast):
+            sent = time.perf_counter()
+            fast_client.post("/v1/email-classify", json={"email_content": f"Laptop {i} will not boot"}).raise_for_status()
+            latencies.append(time.perf_counter() - sent)
+        for future in pending:
+            future.result()
+        return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slow", type=int, default=4)
+    parser.add_argument("--fast", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=1000.0)
+    args = parser.parse_args()
+    latency = args.latency_ms / 1000
+    failures = []
+
+    with FakeChatServer(latency=latency, reply_words=20) as fake:
+        settings.OPENAI_BASE_URL = fake.url
+        settings.OPENAI_API_KEY = "fake"
+        # Every slow request must reach the model
+        settings.LLM_CACHE_EXCLUDE = "email_reply,reply_graph"
+        load_model()
+        # Imported only now: they build their chat models at import time, from these settings
+        from api.v1.classify_email_api import router as classify_router
+        from api.v1.email_replyer_api import router as email_replyer_router
+        from api.v1.reply_graph_api import router as reply_graph_router
+        app = FastAPI()
+        for router in (classify_router, email_replyer_router, reply_graph_router, _blocking_router()):
+            app.include_router(router)
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.01)
+        base_url = f"http://127.0.0.1:{server.servers[0].sockets[0].getsockname()[1]}"
+
+        print(f"{args.slow} slow requests ({args.latency_ms:.0f} ms per model call) while {args.fast} "
+              f"classify requests run one after another")
+        print(f"{'endpoint':>16} {'handler':>9} {'slow done':>10} {'fast p50':>9} {'fast max':>9} {'check':>6}")
+        for name, blocking_path, async_path in (
+                ("generate_reply", "/blocking/generate_reply", "/v1/email-reply/generate_reply"),
+                ("reply graph", "/blocking/reply-graph/run", "/v1/reply-graph/run")):
+            for handler, path in (("blocking", blocking_path), ("async", async_path)):
+                total, latencies = _run(base_url, path, args.slow, args.fast)
+                check = ""
+                if handler == "async":
+                    # Never queued behind a model call, and the slow ones ran side by side
+                    if max(latencies) >= latency * MAX_FAST_SHARE:
+                        failures.append(f"{name}: a fast request took {max(latencies) * 1000:.0f} ms, "
+                                        f"limit {latency * MAX_FAST_SHARE * 1000:.0f} ms")
+                    if total >= latency * 3.5:
+                        failures.append(f"{name}: the slow requests took {total * 1000:.0f} ms, they ran one by one")
+                    check = "FAIL" if any(failure.startswith(f"{name}:") for failure in failures) else "ok"
+                print(f"{name:>16} {handler:>9} {total * 1000:>8.0f}ms "
+                      f"{statistics.median(latencies) * 1000:>7.0f}ms {max(latencies) * 1000:>7.0f}ms {check:>6}")
+        server.should_exit = True
+        thread.join()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Emails per second of the single-email path (classify_email in a loop) against
+the vectorized batch path (classify_emails) on email_dataset_long.csv.
+
+Run from the repository root:
+    uv run python -m benchmarks.bench_batch_classify
+"""
+import argparse
+import time
+
+from benchmarks.common import load_email_texts
+import services.classify_email as classify_email_service
+from services.cache import TTLCache, TieredCache
+from services.classify_email import classify_email, classify_emails, load_model
+
+BATCH_SIZES = [1, 32, 256, 2048]
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cache", action="store_true", help="keep the prediction cache enabled")
+    args = parser.parse_args()
+
+    if not args.cache:
+        # The dataset repeats, so the cache would turn most of this into lookups
+        classify_email_service.prediction_cache = TieredCache(TTLCache(0, 0))
+    load_model()
+    print(f"{'batch':>6} {'single (emails/s)':>18} {'batch (emails/s)':>17} {'speedup':>8}")
+    for size in args.sizes:
+        texts = load_email_texts(size)
+
+        def single():
+            return [classify_email(text) for text in texts]
+
+        def batch():
+            return classify_emails(texts)
+
+        assert [r["predicted_department"] for r in single()] == [r["predicted_department"] for r in batch()]
+        single_rate = size / _best_of(single, args.repeat)
+        batch_rate = size / _best_of(batch, args.repeat)
+        print(f"{size:>6} {single_rate:>18.1f} {batch_rate:>17.1f} {batch_rate / single_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
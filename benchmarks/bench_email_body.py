@@ -0,0 +1,176 @@
+"""
+Equivalence check and benchmark of services.email_body against the original
+BeautifulSoup clean_email_body / parse_message.
+
+The check runs both HTML-to-text converters over the email_corpus shapes
+(newsletters, receipts, reply threads, Word HTML) plus random tag soup and
+requires identical output. Charset handling is reported separately: for parts
+declared windows-1252 or ISO-8859-1 the original decoded as UTF-8 and dropped
+the accented characters, and a single-part text/html email came back as raw
+markup, so for those the new output is expected to differ.
+
+Then it times HTML-to-text per email, and parse_messages on a batch of raw
+messages inline and on the process pool.
+
+Run from the repository root:
+    uv run python -m benchmarks.bench_email_body --emails 400 --workers 4
+"""
+import argparse
+import email
+import os
+import random
+import re
+import sys
+import time
+import warnings
+
+import bs4
+from bs4 import BeautifulSoup
+
+from benchmarks.email_corpus import build_corpus
+from core import settings
+from services import email_body
+from services.email_body import html_to_text, parse_messages
+
+
+def clean_email_body_reference(body):
+    # The original implementation, kept verbatim as the oracle
+    if body is None:
+        return ""
+    soup = BeautifulSoup(body, "html.parser")
+    for script_or_style in soup(["script", "style"]):
+        script_or_style.extract()
+    for tag in soup.find_all(True):
+        if isinstance(tag, bs4.element.Tag) and "style" in tag.attrs:
+            del tag.attrs["style"]
+    text = soup.get_text(separator="\n", strip=True)
+    text = re.sub(r'\n\s*\n', '\n\n', text).strip()
+    return text
+
+
+def parse_message_reference(email_id, raw_email):
+    msg = email.message_from_bytes(raw_email)
+    plain_text_body = ""
+    html_body_content = ""
+    if msg.is_multipart():
+        for part in msg.walk():
+            ctype = part.get_content_type()
+            cdispo = part.get_content_disposition()
+            if ctype == 'text/plain' and cdispo is None:
+                payload = part.get_payload(decode=True)
+                if isinstance(payload, bytes):
+                    plain_text_body = payload.decode(errors='ignore')
+                    break
+            elif ctype == 'text/html' and cdispo is None:
+                payload = part.get_payload(decode=True)
+                if isinstance(payload, bytes):
+                    html_body_content = payload.decode(errors='ignore')
+    else:
+        payload = msg.get_payload(decode=True)
+        if isinstance(payload, bytes):
+            plain_text_body = payload.decode(errors='ignore')
+    final_body = plain_text_body if plain_text_body else clean_email_body_reference(html_body_content)
+    return {"email_id": email_id, "subject": msg['subject'], "from": msg['from'], "date": msg['date'],
+            "body": final_body}
+
+
+FRAGMENTS = [
+    "<p>", "</p>", "<div>", "</div>", "<br>", "<br/>", "<td style='x'>", "</td>", "<script>", "</script>",
+    "<style>", "</style>", "<!-- c -->", "<!--[if mso]>", "<![endif]-->", "<!DOCTYPE html>", "<?xml x?>",
+    "<b>", "</b>", "<o:p>", "</o:p>", "&amp;", "&nbsp;", "&lt;", "&#8217;", "&eacute;", "&copy;", "\n", " ",
+    "  \n  ", "\t", "text", "more words", "é", "x < y", "a > b", "<img src='a' alt='b'>", "</span>",
+]
+
+
+def _tag_soup(rng: random.Random) -> str:
+    return "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 60)))
+
+
+def check(corpus: list[dict], cases: int, seed: int) -> int:
+    mismatches = 0
+    rng = random.Random(seed)
+    htmls = [item["html"] for item in corpus] + [_tag_soup(rng) for _ in range(cases)] + [None, ""]
+    for html in htmls:
+        expected, actual = clean_email_body_reference(html), html_to_text(html)
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"MISMATCH {html!r:.300}:\n  expected {expected!r:.300}\n  got      {actual!r:.300}")
+    print(f"html_to_text: checked {len(htmls)} documents, {mismatches} mismatches")
+
+    # Whole messages: identical for multipart UTF-8; the rest is where behaviour changed on purpose
+    changed = {}
+    for i, item in enumerate(corpus):
+        expected = parse_message_reference(str(i), item["raw"])
+        actual = email_body.parse_message(str(i), item["raw"])
+        if expected == actual:
+            continue
+        if not item["multipart"]:
+            reason = "single-part html"
+        elif item["charset"] != "utf-8":
+            reason = item["charset"]
+        else:
+            mismatches += 1
+            print(f"MISMATCH in parse_message for email {i}")
+            continue
+        changed[reason] = changed.get(reason, 0) + 1
+        if changed[reason] == 1:
+            at = next((j for j, (a, b) in enumerate(zip(expected["body"], actual["body"])) if a != b), 0)
+            print(f"{reason}: original {expected['body'][at:at + 40]!r}\n"
+                  f"{'':>{len(reason)}}  now      {actual['body'][at:at + 40]!r}")
+    print("parse_message: output changed for " + (", ".join(
+        f"{count} {reason}" for reason, count in changed.items()) or "no emails") + f" of {len(corpus)}")
+    return mismatches
+
+
+def _best(fn, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench(corpus: list[dict], workers: int):
+    print(f"\n{'shape':>10} {'avg KB':>7} {'bs4 (ms)':>9} {'stream (ms)':>12} {'speedup':>8}")
+    for shape in ("newsletter", "receipt", "reply", "outlook", "all"):
+        htmls = [item["html"] for item in corpus if shape in ("all", item["shape"])]
+        reference = _best(lambda: [clean_email_body_reference(html) for html in htmls]) / len(htmls)
+        fast = _best(lambda: [html_to_text(html) for html in htmls]) / len(htmls)
+        size = sum(len(html) for html in htmls) / len(htmls) / 1024
+        print(f"{shape:>10} {size:>7.1f} {reference * 1e3:>9.3f} {fast * 1e3:>12.3f} {reference / fast:>7.1f}x")
+
+    items = [(str(i), item["raw"]) for i, item in enumerate(corpus)]
+    reference = _best(lambda: [parse_message_reference(email_id, raw) for email_id, raw in items])
+    settings.EMAIL_BODY_WORKERS = 0
+    inline = _best(lambda: parse_messages(items))
+    print(f"\nparse {len(items)} raw messages: original {reference * 1e3:.0f} ms, "
+          f"inline {inline * 1e3:.0f} ms ({reference / inline:.1f}x)")
+    if workers:
+        settings.EMAIL_BODY_WORKERS = workers
+        settings.EMAIL_BODY_PARALLEL_MIN = 1
+        parse_messages(items[:workers])  # start the workers outside the timing
+        pooled = _best(lambda: parse_messages(items))
+        email_body.shutdown_pool()
+        print(f"  pool of {workers} workers {pooled * 1e3:.0f} ms ({reference / pooled:.1f}x) "
+              f"on {os.cpu_count()} CPUs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=400, help="corpus size")
+    parser.add_argument("--cases", type=int, default=5000, help="random tag-soup documents for the check")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="process pool size, 0 to skip")
+    args = parser.parse_args()
+    # The Word-style emails start with an XML declaration
+    warnings.filterwarnings("ignore", category=bs4.XMLParsedAsHTMLWarning)
+    corpus = build_corpus(args.emails)
+    if check(corpus, args.cases, args.seed):
+        sys.exit(1)
+    bench(corpus, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+The classification graph's page-wide chain (custom_model_classification over
+the page, then sentiment_analysis over the page) against the per-email fan-out
+(one department + sentiment subgraph per email, merged by store_results), with
+sentiment answered by an OpenAI-compatible fake server with a fixed per-call
+latency and every --slow-every-th call held for --slow-ms.
+
+Both run the real nodes on a page of dataset emails with no org, so nothing is
+read from or written to Postgres. For graph.invoke and for graph.astream
+(stream_mode="custom", what /v1/email-graph/run/stream uses) it reports the
+first finished email, the whole page and the most sentiment calls in flight,
+and checks every email has its department and the sentiment the server derives
+from its prompt. A last sweep shows the fan-out keeps to EMAIL_GRAPH_CONCURRENCY.
+
+Run from the repository root:
+    OPENAI_API_KEY=fake uv run python -m benchmarks.bench_graph_fanout --emails 100 --latency-ms 200
+"""
+import argparse
+import asyncio
+import copy
+import sys
+import time
+
+from langgraph.graph import END, START, StateGraph
+
+import graphs.email_classification_graph as email_graph
+from benchmarks.common import load_email_texts
+from benchmarks.fake_chat_server import FakeChatServer, expected_sentiment
+from core import settings
+from services import llm_cache, llm_gateway
+from services.classify_email import load_model
+
+
+def page_graph(fanout: bool = True, concurrency: int = 8):
+    """The graph past fetch_emails: the page comes in the initial state."""
+    workflow = StateGraph(email_graph.GraphState, input_schema=email_graph.State, output_schema=email_graph.State)
+    if fanout:
+        workflow.add_node("analyse_email", email_graph.email_workflow.compile())
+        workflow.add_node("store_results", email_graph.store_results)
+        workflow.add_conditional_edges(START, email_graph.route_emails, ["analyse_email"])
+        workflow.add_edge("analyse_email", "store_results")
+        workflow.add_edge("store_results", END)
+    else:
+        workflow.add_node("custom_model_classification", email_graph.custom_model_classification)
+        workflow.add_node("sentiment_analysis", email_graph.sentiment_analysis)
+        workflow.add_edge(START, "custom_model_classification")
+        workflow.add_edge("custom_model_classification", "sentiment_analysis")
+        workflow.add_edge("sentiment_analysis", END)
+    return workflow.compile().with_config(max_concurrency=concurrency)
+
+
+def page_state(n: int) -> dict:
+    return {"emails": [{"email_id": str(i), "subject": f"Ticket {i}", "body": body}
+                       for i, body in enumerate(load_email_texts(n))]}
+
+
+def _invoke(graph, state: dict) -> tuple[None, float, list[dict]]:
+    start = time.perf_counter()
+    emails = graph.invoke(copy.deepcopy(state))["emails"]
+    return None, time.perf_counter() - start, emails
+
+
+async def _astream(graph, state: dict) -> tuple[float, float, list[dict]]:
+    start = time.perf_counter()
+    first = None
+    emails = []
+    async for _, email_obj in graph.astream(copy.deepcopy(state), stream_mode="custom", subgraphs=True):
+        first = first if first is not None else time.perf_counter() - start
+        emails.append(email_obj["email"])
+    return first, time.perf_counter() - start, emails
+
+
+def _wrong(emails: list[dict], state: dict) -> int:
+    by_id = {email_obj["email_id"]: email_obj for email_obj in emails}
+    return sum(
+        1 for email_obj in state["emails"]
+        if email_obj["email_id"] not in by_id
+        or "predicted_department" not in by_id[email_obj["email_id"]]["classification_report"]
+        or by_id[email_obj["email_id"]]["sentiment_analysis"]
+        != expected_sentiment(f"Subject: {email_obj['subject']}\nBody: {email_obj['body']}")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--slow-every", type=int, default=10)
+    parser.add_argument("--slow-ms", type=float, default=1500.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--sweep", type=int, nargs="+", default=[4, 16])
+    args = parser.parse_args()
+    state = page_state(args.emails)
+    settings.SENTIMENT_CONCURRENCY = args.concurrency
+    settings.SENTIMENT_MODE = "single"
+    load_model()
+    failed = False
+
+    with FakeChatServer(latency=args.latency_ms / 1000, stall_every=args.slow_every,
+                        stall=args.slow_ms / 1000) as server:
+        settings.OPENAI_BASE_URL = server.url
+        settings.OPENAI_API_KEY = "fake"
+        settings.LLM_MAX_CONCURRENCY = max([args.concurrency, *args.sweep])
+        email_graph.llm = llm_gateway.get_chat_model("bench_sentiment", cache=False,
+                                                     timeout=args.slow_ms / 1000 * 4)
+
+        # One event loop throughout: the gateway's async connections belong to the loop that opened them
+        loop = asyncio.new_event_loop()
+
+        def run(graph, how: str):
+            llm_cache.response_cache.clear()
+            server.reset_counters()
+            if how == "invoke":
+                return _invoke(graph, state)
+            return loop.run_until_complete(_astream(graph, state))
+
+        print(f"{args.emails} emails, {args.latency_ms:.0f} ms per LLM call, every {args.slow_every}th "
+              f"{args.slow_ms:.0f} ms; concurrency {args.concurrency}")
+        print(f"{'graph':>16} {'first email':>12} {'all emails':>11} {'max in flight':>14} {'wrong':>6}")
+        for fanout in (False, True):
+            graph = page_graph(fanout, args.concurrency)
+            for how in ("invoke", "astream"):
+                first, total, emails = run(graph, how)
+                wrong = _wrong(emails, state)
+                failed |= bool(wrong) or len(emails) != args.emails
+                label = f"{'fan-out' if fanout else 'chain'} {how}"
+                first_text = f"{first * 1000:>10.0f}ms" if first is not None else f"{'-':>12}"
+                print(f"{label:>16} {first_text} {total * 1000:>9.0f}ms {server.max_in_flight:>14} {wrong:>6}")
+
+        print(f"\n{'EMAIL_GRAPH_CONCURRENCY':>23} {'all emails':>11} {'max in flight':>14}")
+        for concurrency in args.sweep:
+            _, total, emails = run(page_graph(True, concurrency), "astream")
+            failed |= bool(_wrong(emails, state)) or server.max_in_flight != concurrency
+            print(f"{concurrency:>23} {total * 1000:>9.0f}ms {server.max_in_flight:>14}")
+        loop.run_until_complete(llm_gateway.close())
+        loop.close()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Time to the first finished email of the classification graph's streamed run
+(graph.astream with stream_mode="custom", what /v1/email-graph/run/stream
+sends) against waiting for the whole page (graph.ainvoke, what /run returns),
+with sentiment answered by an OpenAI-compatible fake server with a fixed
+per-call latency.
+
+The graph here is the real per-email fan-out (see bench_graph_fanout) on a
+page of dataset emails, with no org so nothing is read from or written to
+Postgres. It checks every email is streamed exactly once, with the
+same department and sentiment as the full run, and reports the response size
+of /run against the stream with exclude=body.
+
+Run from the repository root:
+    OPENAI_API_KEY=fake uv run python -m benchmarks.bench_graph_streaming --emails 100 --latency-ms 200
+"""
+import argparse
+import asyncio
+import copy
+import json
+import sys
+import time
+
+import graphs.email_classification_graph as email_graph
+from api.v1.email_classification_graph_api import _project
+from benchmarks.bench_graph_fanout import page_graph, page_state
+from benchmarks.fake_chat_server import FakeChatServer
+from core import settings
+from services import llm_cache, llm_gateway
+from services.classify_email import load_model
+
+
+async def _full(graph, state: dict) -> tuple[float, list[dict]]:
+    start = time.perf_counter()
+    result = await graph.ainvoke(copy.deepcopy(state))
+    return time.perf_counter() - start, result["emails"]
+
+
+async def _streamed(graph, state: dict) -> tuple[float, float, list[dict]]:
+    start = time.perf_counter()
+    first = None
+    emails = []
+    async for _, email_obj in graph.astream(copy.deepcopy(state), stream_mode="custom", subgraphs=True):
+        first = first if first is not None else time.perf_counter() - start
+        emails.append(email_obj["email"])
+    return first, time.perf_counter() - start, emails
+
+
+async def _runs(graph, state: dict):
+    # One event loop for both: the gateway's async connections belong to the loop that opened them
+    full = await _full(graph, state)
+    streamed = await _streamed(graph, state)
+    await llm_gateway.close()
+    return full, streamed
+
+
+def _outcome(email_obj: dict) -> tuple:
+    return email_obj["email_id"], json.dumps(email_obj["classification_report"], sort_keys=True), \
+        email_obj["sentiment_analysis"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    state = page_state(args.emails)
+    settings.SENTIMENT_MODE = "single"
+    load_model()
+    graph = page_graph(concurrency=args.concurrency)
+
+    with FakeChatServer(latency=args.latency_ms / 1000) as server:
+        settings.OPENAI_BASE_URL = server.url
+        settings.OPENAI_API_KEY = "fake"
+        email_graph.llm = llm_gateway.get_chat_model("bench_sentiment", cache=False)
+        llm_cache.response_cache.clear()
+        (full_time, full_emails), (first, stream_time, streamed) = asyncio.run(_runs(graph, state))
+
+    print(f"{args.emails} emails, {args.latency_ms:.0f} ms per LLM call, EMAIL_GRAPH_CONCURRENCY={args.concurrency}")
+    print(f"{'':>8} {'first email':>12} {'all emails':>11}")
+    print(f"{'run':>8} {full_time * 1000:>10.0f}ms {full_time * 1000:>9.0f}ms")
+    print(f"{'stream':>8} {first * 1000:>10.0f}ms {stream_time * 1000:>9.0f}ms")
+
+    full_bytes = len(json.dumps({"emails": full_emails}))
+    stream_bytes = sum(len(json.dumps({"type": "email", "email": _project(email_obj, None, {"body"})})) + 1
+                       for email_obj in streamed)
+    print(f"response: /run {full_bytes} bytes, stream with exclude=body {stream_bytes} bytes "
+          f"({stream_bytes / full_bytes:.0%})")
+
+    same = sorted(map(_outcome, streamed)) == sorted(map(_outcome, full_emails))
+    print(f"each email streamed once with the full run's results: {same}")
+    if not same or first >= full_time:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
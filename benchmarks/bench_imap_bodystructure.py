@@ -0,0 +1,84 @@
+"""
+Bytes on the wire for full RFC822 downloads vs BODYSTRUCTURE-guided fetching.
+
+Serves a sample mailbox from the local fake IMAP server, in which every
+--attachment-every-th message carries a PDF attachment, and fetches the same
+page both ways:
+    rfc822         UID FETCH (RFC822) + services.email_body.parse_message (the old path)
+    bodystructure  services.mailbox.fetch_messages: BODYSTRUCTURE and headers,
+                   then only the chosen text part, capped at IMAP_BODY_MAX_BYTES
+It reports bytes sent by the server, fetch time and peak response size, and
+checks that both paths extract the same subject, sender, date and body
+(bodies longer than IMAP_BODY_MAX_BYTES are cut short by design and will differ).
+
+Run from the repository root:
+    uv run python -m benchmarks.bench_imap_bodystructure --messages 200 --attachment-kb 2048
+"""
+import argparse
+import time
+
+from benchmarks.fake_imap_server import FakeImapServer, build_messages
+from core import settings
+from services.email_body import parse_message
+from services.mailbox import connect, fetch_messages, search_uids, select_inbox
+
+
+def _fetch_rfc822(mail, uids: list[int], chunk_size: int) -> list[dict]:
+    emails = []
+    for start in range(0, len(uids), chunk_size):
+        chunk = uids[start:start + chunk_size]
+        _, msg_data = mail.uid("FETCH", ",".join(str(uid) for uid in chunk), "(UID RFC822)")
+        literals = [item[1] for item in msg_data if isinstance(item, tuple)]
+        emails.extend(parse_message(str(uid), raw) for uid, raw in zip(chunk, literals))
+    return emails
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--attachment-every", type=int, default=4)
+    parser.add_argument("--attachment-kb", type=int, default=1024)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--chunk-size", type=int, default=settings.IMAP_FETCH_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    messages = build_messages(args.messages, attachment_every=args.attachment_every,
+                              attachment_size=args.attachment_kb * 1024)
+    settings.IMAP_HOST, settings.IMAP_USE_SSL = "127.0.0.1", False
+    with FakeImapServer(messages, args.latency_ms / 1000) as server:
+        settings.IMAP_PORT = server.port
+        server.index()
+        mail = connect("bench@example.com", "secret")
+        uidvalidity = select_inbox(mail)
+        uids = search_uids(mail)
+
+        server.reset_counters()
+        start = time.perf_counter()
+        full = _fetch_rfc822(mail, uids, args.chunk_size)
+        full_time, full_bytes, full_commands = time.perf_counter() - start, server.bytes_sent, server.commands
+
+        server.reset_counters()
+        start = time.perf_counter()
+        light = [e for parsed in fetch_messages(mail, uids, args.chunk_size, uidvalidity) for e in parsed]
+        light_time, light_bytes, light_commands = time.perf_counter() - start, server.bytes_sent, server.commands
+        mail.logout()
+
+    mismatches = [
+        a["email_id"] for a, b in zip(full, light)
+        if (a["subject"], a["from"], a["date"], a["body"]) != (b["subject"], b["from"], b["date"], b["body"])
+    ]
+    attachments = sum(len(e["attachments"]) for e in light)
+    print(f"{len(light)} messages, {attachments} with a {args.attachment_kb} KB attachment, "
+          f"{args.latency_ms:.0f} ms round trip")
+    print(f"{'path':>14} {'MB sent':>9} {'commands':>9} {'seconds':>8}")
+    print(f"{'rfc822':>14} {full_bytes / 2**20:>9.2f} {full_commands:>9} {full_time:>8.3f}")
+    print(f"{'bodystructure':>14} {light_bytes / 2**20:>9.2f} {light_commands:>9} {light_time:>8.3f}")
+    print(f"bytes saved: {(full_bytes - light_bytes) / 2**20:.2f} MB ({1 - light_bytes / full_bytes:.1%}), "
+          f"{full_time / light_time:.1f}x faster")
+    print(f"identical subject/from/date/body: {len(light) - len(mismatches)}/{len(light)}")
+    if mismatches or len(full) != len(light):
+        raise SystemExit(f"Mismatched emails: {mismatches[:10]}")
+
+
+if __name__ == "__main__":
+    main()
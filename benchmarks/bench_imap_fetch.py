@@ -0,0 +1,58 @@
+"""
+End-to-end mailbox fetch time against the local fake IMAP server.
+
+For each simulated round-trip latency and page size (limit), connects, selects
+INBOX, searches and fetches the newest `limit` messages the way the
+classification graph does, comparing one FETCH per message (chunk size 1, the
+old behaviour) with chunked message-set FETCHes.
+
+Run from the repository root:
+    uv run python -m benchmarks.bench_imap_fetch --latencies-ms 0 5 20 --limits 10 50 200
+"""
+import argparse
+import time
+
+from benchmarks.fake_imap_server import FakeImapServer, build_messages
+from core import settings
+from services.mailbox import connect, fetch_messages, search_uids, select_inbox
+
+
+def _fetch_page(limit: int, chunk_size: int) -> int:
+    mail = connect("bench@example.com", "secret")
+    uidvalidity = select_inbox(mail)
+    selected_uids = search_uids(mail)[::-1][:limit]
+    fetched = sum(len(parsed) for parsed in fetch_messages(mail, selected_uids, chunk_size, uidvalidity))
+    mail.logout()
+    return fetched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000, help="size of the fake mailbox")
+    parser.add_argument("--latencies-ms", type=float, nargs="+", default=[0, 5, 20])
+    parser.add_argument("--limits", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--chunk-size", type=int, default=settings.IMAP_FETCH_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    messages = build_messages(args.messages)
+    settings.IMAP_HOST, settings.IMAP_USE_SSL = "127.0.0.1", False
+    print(f"{'latency ms':>10} {'limit':>6} {'per-msg s':>10} {'cmds':>5} {'chunked s':>10} {'cmds':>5} {'speedup':>8}")
+    for latency_ms in args.latencies_ms:
+        with FakeImapServer(messages, latency_ms / 1000) as server:
+            settings.IMAP_PORT = server.port
+            for limit in args.limits:
+                timings, commands = {}, {}
+                for label, chunk_size in (("per_message", 1), ("chunked", args.chunk_size)):
+                    server.reset_counters()
+                    start = time.perf_counter()
+                    fetched = _fetch_page(limit, chunk_size)
+                    timings[label] = time.perf_counter() - start
+                    commands[label] = server.commands
+                    assert fetched == min(limit, args.messages), f"{label} fetched {fetched} of {limit}"
+                print(f"{latency_ms:>10.1f} {limit:>6} {timings['per_message']:>10.3f} {commands['per_message']:>5} "
+                      f"{timings['chunked']:>10.3f} {commands['chunked']:>5} "
+                      f"{timings['per_message'] / timings['chunked']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
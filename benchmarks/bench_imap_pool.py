@@ -0,0 +1,80 @@
+"""
+Repeated mailbox polling with and without the per-org IMAP session pool.
+
+Against the local fake IMAP server (LOGIN delayed by --login-ms to stand in for
+the TLS handshake and authentication), runs the poll the classification graph
+does on every call, SELECT + UID SEARCH for new mail, --polls times:
+    fresh   connect and log in, poll, log out (the old path)
+    pooled  borrow a session from services.imap_pool.ImapPool, poll, return it
+Then checks the pool recovers when the server drops every session, and that
+concurrent polls of one org never open more than max_per_org connections.
+
+Run from the repository root:
+    uv run python -m benchmarks.bench_imap_pool --polls 50 --login-ms 300 --latency-ms 20
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_imap_server import FakeImapServer, build_messages
+from core import settings
+from services.imap_pool import ImapPool
+from services.mailbox import connect, search_uids, select_inbox
+
+
+def _poll(mail) -> int:
+    select_inbox(mail)
+    return len(search_uids(mail, after_uid=0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--polls", type=int, default=50)
+    parser.add_argument("--login-ms", type=float, default=300.0)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--max-per-org", type=int, default=2)
+    args = parser.parse_args()
+
+    settings.IMAP_HOST, settings.IMAP_USE_SSL = "127.0.0.1", False
+    with FakeImapServer(build_messages(100), args.latency_ms / 1000, login_latency=args.login_ms / 1000) as server:
+        settings.IMAP_PORT = server.port
+        pool = ImapPool(max_per_org=args.max_per_org, idle_timeout=300.0, acquire_timeout=30.0)
+
+        start = time.perf_counter()
+        for _ in range(args.polls):
+            mail = connect("org@example.com", "secret")
+            _poll(mail)
+            mail.logout()
+        fresh = time.perf_counter() - start
+        fresh_logins = server.connections
+
+        server.reset_counters()
+        start = time.perf_counter()
+        for _ in range(args.polls):
+            with pool.session(1, "org@example.com", "secret") as mail:
+                _poll(mail)
+        pooled = time.perf_counter() - start
+        print(f"{args.polls} polls, LOGIN {args.login_ms:.0f} ms, round trip {args.latency_ms:.0f} ms")
+        print(f"  fresh:  {fresh:.2f} s, {fresh_logins} logins")
+        print(f"  pooled: {pooled:.2f} s, {server.connections} logins ({fresh / pooled:.1f}x faster)")
+
+        server.disconnect_all()
+        time.sleep(0.05)
+        with pool.session(1, "org@example.com", "secret") as mail:
+            assert _poll(mail) == 100
+        print(f"  after the server dropped all sessions: poll OK, {pool.stats()['reconnects']} reconnect")
+
+        server.reset_counters()
+        def poll_once(_):
+            with pool.session(1, "org@example.com", "secret") as mail:
+                return _poll(mail)
+        with ThreadPoolExecutor(max_workers=8) as threads:
+            assert all(n == 100 for n in threads.map(poll_once, range(32)))
+        print(f"  32 polls from 8 threads: {server.max_clients} concurrent connections "
+              f"(cap {args.max_per_org}), pool stats {pool.stats()}")
+        assert server.max_clients <= args.max_per_org
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    main()
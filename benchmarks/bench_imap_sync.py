@@ -0,0 +1,73 @@
+"""
+Incremental UID sync against a large mailbox on the local fake IMAP server.
+
+Compares how the classification graph picks the next page of mail:
+    paged        SEARCH ALL over the whole mailbox, then slice (the old path)
+    incremental  UID SEARCH UID <high-water mark + 1>:*, only the new mail
+and then checks the high-water mark survives what breaks sequence numbers:
+old mail being expunged, and a UIDVALIDITY change forcing a full resync.
+
+Run from the repository root:
+    uv run python -m benchmarks.bench_imap_sync --messages 200000 --new 50 --latency-ms 20
+"""
+import argparse
+import itertools
+import time
+
+from benchmarks.fake_imap_server import FakeImapServer, build_messages
+from core import settings
+from services.mailbox import connect, search_uids, select_inbox
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=200000, help="size of the fake mailbox")
+    parser.add_argument("--new", type=int, default=50, help="messages delivered since the last sync")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    # A few hundred distinct bodies are enough; nothing here is fetched
+    distinct = build_messages(500)
+    messages = list(itertools.islice(itertools.cycle(distinct), args.messages))
+    settings.IMAP_HOST, settings.IMAP_USE_SSL = "127.0.0.1", False
+    with FakeImapServer(messages, args.latency_ms / 1000) as server:
+        settings.IMAP_PORT = server.port
+        mail = connect("bench@example.com", "secret")
+        uidvalidity = select_inbox(mail)
+        high_water_mark = search_uids(mail)[-1]
+        server.append(distinct[:args.new])
+        select_inbox(mail)
+
+        all_uids, paged = _timed(lambda: search_uids(mail))
+        new_uids, incremental = _timed(lambda: search_uids(mail, after_uid=high_water_mark))
+        print(f"mailbox of {len(all_uids)}, {args.new} new, {args.latency_ms:.0f} ms round trip")
+        print(f"  paged:       SEARCH ALL returned {len(all_uids)} ids in {paged * 1000:.1f} ms")
+        print(f"  incremental: UID SEARCH returned {len(new_uids)} ids in {incremental * 1000:.1f} ms "
+              f"({paged / incremental:.1f}x faster)")
+        assert new_uids == all_uids[-args.new:]
+
+        # Expunging old mail shifts every sequence number but no UID
+        server.expunge(1000)
+        select_inbox(mail)
+        assert search_uids(mail, after_uid=high_water_mark) == new_uids
+        print("  after expunging 1000 old messages: same new UIDs")
+
+        # Nothing new: 'UID n:*' still matches the newest message, which must be filtered out
+        assert search_uids(mail, after_uid=new_uids[-1]) == []
+        print("  nothing new above the high-water mark: no UIDs")
+
+        server.renumber()
+        new_validity = select_inbox(mail)
+        assert new_validity != uidvalidity
+        print(f"  UIDVALIDITY {uidvalidity} -> {new_validity}: the graph resyncs from UID 0")
+        mail.logout()
+
+
+if __name__ == "__main__":
+    main()
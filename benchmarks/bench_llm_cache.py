@@ -0,0 +1,97 @@
+"""
+Latency of repeated chat-model calls with services.llm_cache in front of an
+OpenAI-compatible fake server.
+
+For --prompts distinct sentiment prompts it times, per call:
+    cold      cache miss, the request goes to the server (--latency-ms)
+    local     repeat in the same process: in-memory tier hit
+    shared    repeat from a "new worker" (empty in-memory tier): SQLite tier hit
+and the cache lookup alone, without LangChain's call overhead. It also checks
+that a prompt differing only in edge whitespace or message ids hits, and that
+a different request parameter (temperature) misses.
+
+Run from the repository root:
+    uv run python -m benchmarks.bench_llm_cache --prompts 50 --latency-ms 300
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from langchain.chat_models import init_chat_model
+from langchain.schema import HumanMessage, SystemMessage
+from langchain_core.load import dumps
+
+from benchmarks.common import load_email_texts
+from benchmarks.fake_chat_server import FakeChatServer
+from services.cache import SQLiteCacheBackend, TieredCache, TTLCache
+from services.llm_cache import LLMResponseCache
+
+
+def _model(server: FakeChatServer, cache: LLMResponseCache, temperature: float = 0):
+    return init_chat_model(model="gpt-4o-mini", temperature=temperature, api_key="fake", base_url=server.url,
+                           cache=cache)
+
+
+def _timed(fn, items) -> list[float]:
+    timings = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    args = parser.parse_args()
+    prompts = [[SystemMessage(content="Classify the sentiment: Positive, Negative or Neutral."),
+                HumanMessage(content=f"Subject: Ticket {i}\nBody: {body}")]
+               for i, body in enumerate(load_email_texts(args.prompts))]
+    failed = False
+
+    with tempfile.TemporaryDirectory() as tmp, FakeChatServer(latency=args.latency_ms / 1000) as server:
+        shared = SQLiteCacheBackend(os.path.join(tmp, "llm_cache.sqlite"), "llm_cache", 100000, 3600)
+        cache = LLMResponseCache(TieredCache(TTLCache(10000, 3600), shared), "bench")
+        llm = _model(server, cache)
+
+        cold = _timed(llm.invoke, prompts)
+        cold_requests = server.requests
+        local = _timed(llm.invoke, prompts)
+        # Another worker: same SQLite file, empty in-memory tier
+        worker_cache = LLMResponseCache(TieredCache(TTLCache(10000, 3600), shared), "bench")
+        shared_hit = _timed(_model(server, worker_cache).invoke, prompts)
+        llm_string = llm._get_llm_string()
+        keys = [dumps(prompt) for prompt in prompts]
+        lookup = _timed(lambda key: cache.lookup(key, llm_string), keys)
+
+        print(f"{args.prompts} prompts, {args.latency_ms:.0f} ms per model call")
+        print(f"{'':>8} {'median':>12} {'p95':>12} {'requests':>9}")
+        for name, timings, requests in (("cold", cold, cold_requests), ("local", local, server.requests - cold_requests),
+                                        ("shared", shared_hit, server.requests - cold_requests),
+                                        ("lookup", lookup, 0)):
+            ordered = sorted(timings)
+            print(f"{name:>8} {statistics.median(ordered) * 1e6:>10.0f}us "
+                  f"{ordered[int(len(ordered) * 0.95) - 1] * 1e6:>10.0f}us {requests:>9}")
+        failed |= server.requests != cold_requests
+
+        before = server.requests
+        variant = [SystemMessage(content=prompts[0][0].content + "  \n"),
+                   HumanMessage(content=prompts[0][1].content, id="msg-123")]
+        llm.invoke(variant)
+        whitespace_hit = server.requests == before
+        _model(server, cache, temperature=0.7).invoke(prompts[0])
+        parameter_miss = server.requests == before + 1
+        print(f"whitespace/id variant hits: {whitespace_hit}, other temperature misses: {parameter_miss}")
+        print(f"hit rate: {cache.stats()['hit_rate']:.2f} (this process), {worker_cache.stats()['hit_rate']:.2f} (worker)")
+        failed |= not (whitespace_hit and parameter_miss)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Chat-model calls through services.llm_gateway against an OpenAI-compatible
+fake server with a fixed per-call latency.
+
+    clients     a new client per call (what a request handler building its own
+                model does) against the gateway's shared client: wall time and
+                TCP connections opened
+    caps        peak requests in flight with LLM_MAX_CONCURRENCY, and with a
+                per-service limit from LLM_SERVICE_CONCURRENCY, while the
+                callers ask for more
+    pacing      achieved request rate with LLM_REQUESTS_PER_SECOND
+    usage       prompt tokens reported by llm_gateway.stats() against the
+                server's count
+
+Responses are not cached here (cache=False), so every call reaches the server.
+
+Run from the repository root:
+    OPENAI_API_KEY=fake uv run python -m benchmarks.bench_llm_gateway --calls 64 --latency-ms 100
+"""
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain.chat_models import init_chat_model
+from langchain.schema import HumanMessage, SystemMessage
+
+from benchmarks.common import load_email_texts
+from benchmarks.fake_chat_server import FakeChatServer
+from core import settings
+from services import llm_gateway
+
+
+def _prompts(n: int) -> list[list]:
+    return [[SystemMessage(content="Classify the sentiment: Positive, Negative or Neutral."),
+             HumanMessage(content=f"Subject: Ticket {i}\nBody: {body}")]
+            for i, body in enumerate(load_email_texts(n))]
+
+
+def _reconfigure(server: FakeChatServer, **overrides):
+    # The gateway builds its pool, slots and rate limiter on first use: drop them so new settings apply
+    asyncio.run(llm_gateway.close())
+    settings.OPENAI_BASE_URL = server.url
+    settings.OPENAI_API_KEY = "fake"
+    settings.LLM_MAX_CONCURRENCY = 32
+    settings.LLM_SERVICE_CONCURRENCY = ""
+    settings.LLM_REQUESTS_PER_SECOND = 0.0
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    server.reset_counters()
+
+
+def _batch(service: str, prompts: list, concurrency: int):
+    llm_gateway.get_chat_model(service, cache=False).batch(prompts, config={"max_concurrency": concurrency})
+
+
+def _clients(server: FakeChatServer, prompts: list, concurrency: int) -> bool:
+    def fresh_client(prompt):
+        init_chat_model(model="gpt-4o-mini", temperature=0, api_key="fake", base_url=server.url).invoke(prompt)
+
+    print(f"{'clients':>8} {'seconds':>8} {'connections':>12} {'requests':>9}")
+    _reconfigure(server)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(fresh_client, prompts))
+    per_call = (time.perf_counter() - start, server.connections, server.requests)
+    print(f"{'per call':>8} {per_call[0]:>8.2f} {per_call[1]:>12} {per_call[2]:>9}")
+
+    _reconfigure(server)
+    _batch("bench", prompts[:concurrency], concurrency)  # warm the pool, as a running app would have it
+    server.reset_counters()
+    start = time.perf_counter()
+    _batch("bench", prompts, concurrency)
+    shared = (time.perf_counter() - start, server.connections, server.requests)
+    print(f"{'shared':>8} {shared[0]:>8.2f} {shared[1]:>12} {shared[2]:>9}")
+    return shared[1] == 0 and shared[2] == len(prompts)
+
+
+def _caps(server: FakeChatServer, prompts: list, concurrency: int) -> bool:
+    ok = True
+    print(f"\n{'caps':>28} {'asked':>6} {'max in flight':>14}")
+    for limit in (4, 8):
+        _reconfigure(server, LLM_MAX_CONCURRENCY=limit)
+        _batch("bench", prompts, concurrency)
+        print(f"{f'LLM_MAX_CONCURRENCY={limit}':>28} {concurrency:>6} {server.max_in_flight:>14}")
+        ok &= server.max_in_flight == limit and llm_gateway.stats()["waited_for_slot"] > 0
+
+    _reconfigure(server, LLM_MAX_CONCURRENCY=8, LLM_SERVICE_CONCURRENCY="capped=2")
+    _batch("capped", prompts, concurrency)
+    capped_alone = server.max_in_flight
+    print(f"{'capped=2, alone':>28} {concurrency:>6} {capped_alone:>14}")
+    server.reset_counters()
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(lambda service: _batch(service, prompts, concurrency), ["capped", "other"]))
+    print(f"{'capped=2 + other, global 8':>28} {2 * concurrency:>6} {server.max_in_flight:>14}")
+    return ok and capped_alone == 2 and server.max_in_flight == 8
+
+
+def _pacing(server: FakeChatServer, prompts: list, concurrency: int, rate: float) -> bool:
+    _reconfigure(server, LLM_REQUESTS_PER_SECOND=rate, LLM_RATE_BURST=1)
+    calls = prompts[:int(rate * 2)]
+    start = time.perf_counter()
+    _batch("bench", calls, concurrency)
+    achieved = len(calls) / (time.perf_counter() - start)
+    print(f"\npacing: {len(calls)} calls at LLM_REQUESTS_PER_SECOND={rate:g}: {achieved:.1f} requests/s")
+    return achieved <= rate * 1.2
+
+
+def _usage(server: FakeChatServer, prompts: list, concurrency: int) -> bool:
+    _reconfigure(server)
+    _batch("usage", prompts, concurrency)
+    expected = sum(sum(len(m.content) for m in prompt) // 4 for prompt in prompts)
+    reported = llm_gateway.stats()["services"]["usage"]
+    print(f"usage: {reported['requests']} requests, {reported['prompt_tokens']} prompt tokens reported, "
+          f"{expected} sent, {reported['avg_ms']:.0f} ms average")
+    return reported["requests"] == len(prompts) and reported["prompt_tokens"] == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=10.0)
+    args = parser.parse_args()
+    prompts = _prompts(args.calls)
+
+    with FakeChatServer(latency=args.latency_ms / 1000) as server:
+        print(f"{args.calls} calls, {args.latency_ms:.0f} ms per model call, {args.concurrency} callers")
+        ok = _clients(server, prompts, args.concurrency)
+        ok &= _caps(server, prompts, args.concurrency)
+        ok &= _pacing(server, prompts, args.concurrency, args.rate)
+        ok &= _usage(server, prompts, args.concurrency)
+    asyncio.run(llm_gateway.close())
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
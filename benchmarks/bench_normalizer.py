@@ -0,0 +1,99 @@
+"""
+Equivalence check and micro-benchmark of services.text_normalizer against the
+original five-regex preprocess_text_simple.
+
+The check compares the two byte for byte on every row of
+email_dataset_long.csv and on randomly generated strings built from the
+characters the regexes care about (emails, URLs, digits in other scripts,
+punctuation, unusual whitespace). Any mismatch is printed and the script
+exits non-zero before timing anything.
+
+Run from the repository root:
+    uv run python -m benchmarks.bench_normalizer --cases 200000
+"""
+import argparse
+import random
+import re
+import sys
+import timeit
+
+from benchmarks.common import load_email_texts
+from services.text_normalizer import normalize_text, normalize_texts
+
+
+def preprocess_text_reference(text):
+    # The original implementation, kept verbatim as the oracle
+    if text is None:
+        return ""
+    text = text.lower()
+    text = re.sub(r'\S+@\S+', ' email_address ', text)
+    text = re.sub(r'http\S+|www\S+', ' url_link ', text)
+    text = re.sub(r'\b\d+\b', ' number ', text)
+    text = re.sub(r'[^\w\s\?\!]', ' ', text)
+    text = ' '.join(text.split())
+    return text
+
+
+FRAGMENTS = [
+    "http", "www", "HTTP", "WWW", "@", "12", "3", "٣", "²", "İ", "é", " ", " ",
+    "　", "０", "_", "?", "!", ".", ":", "/", "-", "$", "#", "<", ">", "(", ")", " ", "\t", "\n",
+    "a", "b", "h", "t", "p", "w", "x@y.com", "https://a.b/c?d=1", "user@mail", "@@", "0x",
+]
+
+
+def _random_text(rng: random.Random) -> str:
+    return "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 40)))
+
+
+def _html_body(size: int, rng: random.Random) -> str:
+    pieces = ['<td style="padding:0 12px">', "Hello team, ", "https://example.com/track?id=42&utm=mail ",
+              "Invoice #12,345 due 2024-05-01. ", "contact billing@example.com ", "&nbsp;", " | ", "</td>\n"]
+    return "".join(rng.choice(pieces) for _ in range(size // 10))[:size]
+
+
+def check(cases: int, seed: int) -> int:
+    mismatches = 0
+    rng = random.Random(seed)
+    texts = load_email_texts(1000) + [_random_text(rng) for _ in range(cases)] + [None, ""]
+    for text in texts:
+        expected, actual = preprocess_text_reference(text), normalize_text(text)
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"MISMATCH {text!r}: expected {expected!r}, got {actual!r}")
+    if normalize_texts(texts) != [preprocess_text_reference(text) for text in texts]:
+        mismatches += 1
+        print("MISMATCH in normalize_texts")
+    print(f"checked {len(texts)} texts, {mismatches} mismatches")
+    return mismatches
+
+
+def bench(number: int):
+    rng = random.Random(0)
+    short = load_email_texts(1)[0]
+    prose = " ".join(load_email_texts(2000))[:100_000]
+    html = _html_body(100_000, rng)
+    print(f"{'body':>12} {'reference (us)':>15} {'normalizer (us)':>16} {'speedup':>8}")
+    for name, text in (("short", short), ("100KB prose", prose), ("100KB html", html)):
+        reference = min(timeit.repeat(lambda: preprocess_text_reference(text), number=number, repeat=5)) / number
+        fast = min(timeit.repeat(lambda: normalize_text(text), number=number, repeat=5)) / number
+        print(f"{name:>12} {reference * 1e6:>15.1f} {fast * 1e6:>16.1f} {reference / fast:>7.1f}x")
+    batch = load_email_texts(1000)
+    reference = min(timeit.repeat(lambda: [preprocess_text_reference(t) for t in batch], number=5, repeat=3)) / 5
+    fast = min(timeit.repeat(lambda: normalize_texts(batch), number=5, repeat=3)) / 5
+    print(f"{'1000 short':>12} {reference * 1e6:>15.1f} {fast * 1e6:>16.1f} {reference / fast:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=50000, help="random strings for the equivalence check")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+    if check(args.cases, args.seed):
+        sys.exit(1)
+    bench(args.number)
+
+
+if __name__ == "__main__":
+    main()
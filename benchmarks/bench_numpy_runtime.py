@@ -0,0 +1,84 @@
+"""
+Cold start and per-worker memory of the sklearn pickle against the NumPy runtime.
+
+Each runtime is measured in fresh subprocesses that import the classifier,
+load the model and classify one email, the way a uvicorn worker starts up.
+Reports wall time to first prediction, peak RSS, and PSS (proportional set
+size, which splits memory-mapped pages shared between workers) where the
+kernel exposes it.
+
+Run from the repository root (export the NumPy runtime first):
+    uv run python -m services.numpy_runtime export pkl_files/email_dataset_long.pkl pkl_files/numpy_model
+    uv run python -m benchmarks.bench_numpy_runtime --workers 4
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Runs in the child process; prints one JSON line
+CHILD = r"""
+import json, os, resource, sys, time
+start = time.perf_counter()
+import services.classify_email as classify_email_service
+classify_email_service.load_model()
+classify_email_service.classify_email("Please share the weekly delivery status report by EOD.")
+elapsed = time.perf_counter() - start
+pss_kb = None
+try:
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                pss_kb = int(line.split()[1])
+except OSError:
+    pass
+sys.stdout.write(json.dumps({
+    "seconds": elapsed,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "pss_kb": pss_kb,
+    "sklearn_imported": "sklearn" in sys.modules,
+}) + "\n")
+sys.stdout.flush()
+sys.stdin.read()  # stay alive so the next workers share mapped pages with this one
+"""
+
+
+def _run_workers(runtime: str, workers: int) -> list[dict]:
+    env = dict(os.environ, CLASSIFIER_RUNTIME=runtime, MODEL_WATCH_INTERVAL="0")
+    procs = [
+        subprocess.Popen([sys.executable, "-c", CHILD], env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                         stderr=subprocess.DEVNULL, text=True)
+        for _ in range(workers)
+    ]
+    results = []
+    for proc in procs:
+        line = proc.stdout.readline()
+        while not line.startswith("{"):  # skip the model's load messages
+            line = proc.stdout.readline()
+        results.append(json.loads(line))
+    for proc in procs:
+        proc.communicate("")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'runtime':>8} {'start (s)':>10} {'max RSS (MB)':>13} {'PSS (MB)':>9} {'sklearn':>8}")
+    for runtime in ("sklearn", "numpy"):
+        results = _run_workers(runtime, args.workers)
+        pss = [r["pss_kb"] for r in results if r["pss_kb"] is not None]
+        print(
+            f"{runtime:>8} {statistics.median(r['seconds'] for r in results):>10.3f} "
+            f"{statistics.median(r['max_rss_kb'] for r in results) / 1024:>13.1f} "
+            f"{(statistics.median(pss) / 1024 if pss else float('nan')):>9.1f} "
+            f"{str(any(r['sklearn_imported'] for r in results)):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Multi-org fan-out: total latency of fetching and classifying every mailbox of a user.
+
+Each org is a local fake IMAP server with its own round-trip latency. Every org
+run connects, selects INBOX, searches, fetches --limit messages and classifies
+them (the blocking work of the graph's fetch and classification nodes), and is
+executed either one org after another or through services.org_fanout.run_for_orgs.
+One extra org never answers in time and one refuses connections, to show
+per-org timeouts and partial-failure reporting.
+
+Run from the repository root:
+    uv run python -m benchmarks.bench_org_fanout --orgs 10 --limit 50
+"""
+import argparse
+import asyncio
+import imaplib
+import socket
+import time
+from contextlib import ExitStack
+
+from benchmarks.fake_imap_server import FakeImapServer, build_messages
+from services.classification_executor import classify_emails_offloaded
+from services.mailbox import fetch_messages, search_uids, select_inbox
+from services.org_fanout import run_for_orgs
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _make_runner(ports: dict[int, int], limit: int):
+    def run_org(org_id: int) -> dict:
+        mail = imaplib.IMAP4("127.0.0.1", ports[org_id])
+        mail.login("org@example.com", "secret")
+        uidvalidity = select_inbox(mail)
+        uids = search_uids(mail)[::-1][:limit]
+        emails = [e for parsed in fetch_messages(mail, uids, 50, uidvalidity) for e in parsed]
+        for email_obj, report in zip(emails, classify_emails_offloaded([e["body"] for e in emails])):
+            email_obj["classification_report"] = report
+        mail.logout()
+        return {"orgId": str(org_id), "emails": emails}
+    return run_org
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orgs", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--min-latency-ms", type=float, default=20.0)
+    parser.add_argument("--max-latency-ms", type=float, default=150.0)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    messages = build_messages(200)
+    step = (args.max_latency_ms - args.min_latency_ms) / max(args.orgs - 1, 1)
+    latencies = [(args.min_latency_ms + i * step) / 1000 for i in range(args.orgs)]
+    with ExitStack() as stack:
+        servers = [stack.enter_context(FakeImapServer(messages, latency)) for latency in latencies]
+        ports = {org_id: server.port for org_id, server in enumerate(servers, start=1)}
+        run_org = _make_runner(ports, args.limit)
+        org_ids = list(ports)
+        classify_emails_offloaded(["warm-up"])  # load the model outside the timings
+
+        per_org = {}
+        start = time.perf_counter()
+        for org_id in org_ids:
+            t0 = time.perf_counter()
+            run_org(org_id)
+            per_org[org_id] = time.perf_counter() - t0
+        sequential = time.perf_counter() - start
+
+        report = asyncio.run(run_for_orgs(org_ids, run_org, args.timeout, concurrency=args.orgs))
+        assert report["failed"] == 0, report
+        print(f"{args.orgs} orgs, {args.limit} emails each, round trips "
+              f"{args.min_latency_ms:.0f}-{args.max_latency_ms:.0f} ms")
+        print(f"  slowest single org: {max(per_org.values()):.2f} s")
+        print(f"  sequential:         {sequential:.2f} s (sum of all orgs)")
+        print(f"  fan-out:            {report['elapsed_ms'] / 1000:.2f} s")
+
+        # One org that never answers in time, one that refuses connections
+        stuck = stack.enter_context(FakeImapServer(messages, args.timeout))
+        ports[len(ports) + 1] = stuck.port
+        ports[len(ports) + 1] = _free_port()
+        report = asyncio.run(run_for_orgs(list(ports), run_org, args.timeout, concurrency=len(ports)))
+        print(f"  with a stuck and an unreachable org: {report['succeeded']} ok, {report['failed']} failed "
+              f"in {report['elapsed_ms'] / 1000:.2f} s")
+        for org in report["orgs"]:
+            if org["status"] != "ok":
+                print(f"    org {org['orgId']}: {org['status']} - {org['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Scaling of the process-pool classification backend from 1 to N workers.
+
+Fires many concurrent single-email classify() calls (the micro-batched path
+used by /v1/email-classify) and the batch classify_many() path at each worker
+count, and reports throughput, speedup over one worker and parallel efficiency.
+The prediction cache is disabled so every email is really scored.
+
+Run from the repository root:
+    uv run python -m benchmarks.bench_process_pool --max-workers 8
+"""
+import os
+
+# Spawned workers read their settings from the environment
+os.environ["PREDICTION_CACHE_SIZE"] = "0"
+os.environ["PREDICTION_CACHE_SHARED_PATH"] = ""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import load_email_texts
+from services.classification_executor import ClassificationExecutor
+
+
+async def _measure(executor: ClassificationExecutor, texts: list[str], mode: str) -> float:
+    start = time.perf_counter()
+    if mode == "single":
+        await asyncio.gather(*(executor.classify(text) for text in texts))
+    else:
+        await executor.classify_many(texts)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--emails", type=int, default=20000)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    texts = load_email_texts(args.emails)
+    baseline = {}
+    print(f"{'workers':>7} {'mode':>7} {'emails/s':>10} {'speedup':>8} {'efficiency':>10}")
+    for workers in range(1, args.max_workers + 1):
+        executor = ClassificationExecutor(workers, args.max_batch, args.max_wait_ms)
+        executor.start()
+        try:
+            for mode in ("single", "batch"):
+                asyncio.run(_measure(executor, texts[:1000], mode))  # warm-up
+                rate = asyncio.run(_measure(executor, texts, mode))
+                baseline.setdefault(mode, rate)
+                speedup = rate / baseline[mode]
+                print(f"{workers:>7} {mode:>7} {rate:>10.0f} {speedup:>7.2f}x {speedup / workers:>9.0%}")
+        finally:
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Time to first byte of the reply endpoints against their Server-Sent Events
+variants, served by uvicorn in front of a fake streaming chat server whose
+replies take --latency-ms to the first word and --word-ms per further word.
+
+    /v1/email-reply/generate_reply      vs  /v1/email-reply/generate_reply/stream
+    /v1/reply-graph/run                 vs  /v1/reply-graph/run/stream
+
+For each it reports the first body byte, the first reply token ("token"
+event) and the complete response, and checks the streamed reply equals the
+"done" event. It then disconnects from a stream mid-reply and while the model
+is still thinking, and checks the upstream request is dropped (the fake server
+sees the hang-up, nothing is left in flight at the gateway) long before the
+reply would have finished. The RAG endpoint needs Postgres and is not run.
+
+Run from the repository root:
+    OPENAI_API_KEY=fake uv run python -m benchmarks.bench_reply_streaming --runs 5 --latency-ms 400 --word-ms 30
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+import uuid
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from benchmarks.fake_chat_server import FakeChatServer
+from core import settings
+from services import llm_cache, llm_gateway
+
+ENDPOINTS = [
+    ("generate_reply", "/v1/email-reply/generate_reply", "reply"),
+    ("reply graph", "/v1/reply-graph/run", "final_response"),
+]
+
+
+def _form(path: str) -> dict:
+    # A fresh email every call, so the non-streaming endpoints never answer from the LLM cache
+    text = f"Hello, could you confirm invoice {uuid.uuid4().hex[:8]} has been processed? Thanks, Priya"
+    return {"email_body": text} if "reply-graph" in path else {"email_text": text}
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def _timed(client: httpx.Client, path: str) -> dict:
+    # The fake server's replies are all alike: without this the graph's formatting call would be a cache hit
+    llm_cache.response_cache.clear()
+    start = time.perf_counter()
+    first_byte = first_token = None
+    body = ""
+    with client.stream("POST", path, data=_form(path)) as response:
+        response.raise_for_status()
+        for chunk in response.iter_text():
+            now = time.perf_counter() - start
+            first_byte = first_byte if first_byte is not None else now
+            body += chunk
+            if first_token is None and (not path.endswith("/stream") or "event: token" in body):
+                first_token = now
+    return {"first_byte": first_byte, "first_token": first_token, "total": time.perf_counter() - start, "body": body}
+
+
+def _streamed_reply_ok(body: str, result_key: str) -> bool:
+    events = _events(body)
+    tokens = "".join(data["text"] for event, data in events if event == "token")
+    done = [data for event, data in events if event == "done"]
+    return bool(tokens) and len(done) == 1 and done[0][result_key] == tokens
+
+
+def _disconnect(client: httpx.Client, server: FakeChatServer, path: str, after_token: bool) -> tuple[bool, float]:
+    server.reset_counters()
+    start = time.perf_counter()
+    with client.stream("POST", path, data=_form(path)) as response:
+        if after_token:
+            for chunk in response.iter_text():
+                if "event: token" in chunk:
+                    break
+        else:
+            while server.requests == 0:
+                time.sleep(0.005)
+    hung_up = time.perf_counter()
+    # The model request must be gone well before the reply would have finished
+    while time.perf_counter() - hung_up < 2.0:
+        if server.in_flight == 0 and llm_gateway.stats()["in_flight"] == 0:
+            break
+        time.sleep(0.01)
+    dropped = time.perf_counter() - hung_up
+    return server.in_flight == 0 and llm_gateway.stats()["in_flight"] == 0 and server.disconnected >= 1, \
+        hung_up - start + dropped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--word-ms", type=float, default=30.0)
+    parser.add_argument("--words", type=int, default=80)
+    args = parser.parse_args()
+    ok = True
+
+    with FakeChatServer(latency=args.latency_ms / 1000, reply_words=args.words,
+                        word_latency=args.word_ms / 1000) as fake:
+        settings.OPENAI_BASE_URL = fake.url
+        settings.OPENAI_API_KEY = "fake"
+        # Imported only now: both build their chat models at import time, from these settings
+        from api.v1.email_replyer_api import router as email_replyer_router
+        from api.v1.reply_graph_api import router as reply_graph_router
+        app = FastAPI()
+        app.include_router(email_replyer_router)
+        app.include_router(reply_graph_router)
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            print(f"model: {args.latency_ms:.0f} ms to first word, {args.word_ms:.0f} ms per word, "
+                  f"{args.words} words; median of {args.runs} runs")
+            print(f"{'endpoint':>22} {'first byte':>11} {'first token':>12} {'complete':>9}")
+            for name, path, result_key in ENDPOINTS:
+                for variant in (path, f"{path}/stream"):
+                    runs = [_timed(client, variant) for _ in range(args.runs)]
+                    label = f"{name}{' stream' if variant.endswith('/stream') else ''}"
+                    print(f"{label:>22} " + " ".join(
+                        f"{statistics.median(run[key] for run in runs) * 1000:>{width}.0f}ms"
+                        for key, width in (("first_byte", 9), ("first_token", 10), ("total", 7))))
+                    if variant.endswith("/stream"):
+                        ok &= all(_streamed_reply_ok(run["body"], result_key) for run in runs)
+
+            full_reply = (args.latency_ms + args.word_ms * args.words) / 1000
+            for label, after_token in (("mid-reply", True), ("before first token", False)):
+                dropped, elapsed = _disconnect(client, fake, "/v1/email-reply/generate_reply/stream", after_token)
+                print(f"disconnect {label}: upstream request dropped {dropped} "
+                      f"after {elapsed * 1000:.0f} ms (full reply {full_reply * 1000:.0f} ms)")
+                ok &= dropped and elapsed < full_reply
+        server.should_exit = True
+        thread.join()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Wall time of the classification graph's sentiment_analysis node against an
+OpenAI-compatible fake server with a fixed per-call latency, for several values
+of SENTIMENT_CONCURRENCY (1 is the old one-call-after-another behaviour).
+
+Every answer is checked against the sentiment the server derives from that
+email's prompt, so a result attached to the wrong email fails the run. A last
+run injects 429s with Retry-After and calls that outlive the client timeout, to
+show they are retried with backoff and still land on the right email.
+
+Run from the repository root:
+    OPENAI_API_KEY=fake uv run python -m benchmarks.bench_sentiment_concurrency --emails 50 --latency-ms 200
+"""
+import argparse
+import copy
+import sys
+import time
+
+from langchain.chat_models import init_chat_model
+
+import graphs.email_classification_graph as email_graph
+from benchmarks.common import load_email_texts
+from benchmarks.fake_chat_server import FakeChatServer, expected_sentiment
+from core import settings
+
+
+def _emails(n: int) -> list[dict]:
+    return [{"email_id": str(i), "subject": f"Ticket {i}", "body": body}
+            for i, body in enumerate(load_email_texts(n))]
+
+
+def _run(server: FakeChatServer, emails: list[dict], concurrency: int, timeout: float) -> tuple[float, int]:
+    settings.SENTIMENT_CONCURRENCY = concurrency
+    email_graph.llm = init_chat_model(model="gpt-4o-mini", temperature=0, api_key="fake", base_url=server.url,
+                                      timeout=timeout, max_retries=settings.SENTIMENT_MAX_RETRIES)
+    state = {"emails": copy.deepcopy(emails)}
+    server.reset_counters()
+    start = time.perf_counter()
+    email_graph.sentiment_analysis(state)
+    elapsed = time.perf_counter() - start
+    wrong = sum(
+        1 for email_obj in state["emails"]
+        if email_obj["sentiment_analysis"] != expected_sentiment(f"Subject: {email_obj['subject']}\nBody: {email_obj['body']}")
+    )
+    return elapsed, wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+    emails = _emails(args.emails)
+    latency = args.latency_ms / 1000
+    failed = False
+
+    with FakeChatServer(latency=latency) as server:
+        print(f"{args.emails} emails, {args.latency_ms:.0f} ms per LLM call")
+        print(f"{'concurrency':>11} {'seconds':>8} {'speedup':>8} {'max in flight':>14} {'wrong':>6}")
+        baseline = None
+        for concurrency in args.concurrency:
+            elapsed, wrong = _run(server, emails, concurrency, timeout=30.0)
+            baseline = baseline or elapsed
+            failed |= bool(wrong)
+            print(f"{concurrency:>11} {elapsed:>8.2f} {baseline / elapsed:>7.1f}x {server.max_in_flight:>14} {wrong:>6}")
+
+    # Faults: every 7th request rate limited, every 11th held past the client timeout
+    timeout = latency * 3
+    with FakeChatServer(latency=latency, rate_limit_every=7, stall_every=11, stall=timeout * 2) as server:
+        elapsed, wrong = _run(server, emails, 8, timeout=timeout)
+        failed |= bool(wrong)
+        print(f"\nwith faults (concurrency 8, timeout {timeout:.1f}s): {elapsed:.2f} s, "
+              f"{server.rate_limited} rate limited and {server.stalled} timed-out calls retried, "
+              f"{server.requests} requests, {wrong} wrong")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+LLM calls and prompt tokens per email for the graph's sentiment_analysis node,
+SENTIMENT_MODE "single" against "packed", using the OpenAI-compatible fake server.
+
+Prompt tokens are estimated the same way the packer does (characters / 4) over
+everything sent, system prompts included. Every answer is checked against the
+sentiment the server derives from that email's text. Some bodies are far longer
+than the pack token budget, to show they get a pack of their own and are cut
+to fit. A last packed run has the server drop or garble some ids in its
+answers, which must be re-asked and still end up on the right email.
+
+Run from the repository root:
+    OPENAI_API_KEY=fake uv run python -m benchmarks.bench_sentiment_packing --emails 200
+and with every body at its dataset length (no oversized ones):
+    OPENAI_API_KEY=fake uv run python -m benchmarks.bench_sentiment_packing --emails 200 --long-every 0
+"""
+import argparse
+import copy
+import sys
+import time
+
+from langchain.chat_models import init_chat_model
+
+import graphs.email_classification_graph as email_graph
+from benchmarks.common import load_email_texts
+from benchmarks.fake_chat_server import FakeChatServer, expected_sentiment
+from core import settings
+from services.sentiment_packing import CHARS_PER_TOKEN, build_packs, email_text
+
+
+def _emails(n: int, long_every: int) -> list[dict]:
+    emails = []
+    for i, body in enumerate(load_email_texts(n)):
+        if long_every and i % long_every == 0:
+            body = (body + " ") * 400  # a long thread or a pasted log
+        emails.append({"email_id": str(1000 + i), "subject": f"Ticket {i}", "body": body})
+    return emails
+
+
+def _expected(email_obj: dict, mode: str) -> str:
+    text = email_text(email_obj["subject"], email_obj["body"])
+    if mode == "packed":
+        # What the packer actually sends for this email
+        text = build_packs([("x", text)], settings.SENTIMENT_PACK_TOKEN_BUDGET, 1)[0][0][1]
+    return expected_sentiment(text)
+
+
+def _run(server: FakeChatServer, emails: list[dict], mode: str) -> dict:
+    settings.SENTIMENT_MODE = mode
+    email_graph.llm = init_chat_model(model="gpt-4o-mini", temperature=0, api_key="fake", base_url=server.url,
+                                      max_retries=settings.SENTIMENT_MAX_RETRIES)
+    state = {"emails": copy.deepcopy(emails)}
+    server.reset_counters()
+    start = time.perf_counter()
+    email_graph.sentiment_analysis(state)
+    return {
+        "seconds": time.perf_counter() - start,
+        "requests": server.requests,
+        "tokens": server.prompt_chars // CHARS_PER_TOKEN,
+        "wrong": sum(1 for e in state["emails"] if e["sentiment_analysis"] != _expected(e, mode)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--long-every", type=int, default=25, help="every n-th body is ~400x longer, 0 for none")
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+    emails = _emails(args.emails, args.long_every)
+    failed = False
+
+    print(f"{args.emails} emails, pack budget {settings.SENTIMENT_PACK_TOKEN_BUDGET} tokens / "
+          f"{settings.SENTIMENT_PACK_MAX_EMAILS} emails, concurrency {settings.SENTIMENT_CONCURRENCY}")
+    print(f"{'mode':>16} {'requests':>9} {'prompt tokens':>14} {'tokens/email':>13} {'seconds':>8} {'wrong':>6}")
+    with FakeChatServer(latency=args.latency_ms / 1000) as server:
+        for mode in ("single", "packed"):
+            result = _run(server, emails, mode)
+            failed |= bool(result["wrong"])
+            print(f"{mode:>16} {result['requests']:>9} {result['tokens']:>14} "
+                  f"{result['tokens'] / len(emails):>13.0f} {result['seconds']:>8.2f} {result['wrong']:>6}")
+    with FakeChatServer(latency=args.latency_ms / 1000, drop_every=9, garble_every=13) as server:
+        result = _run(server, emails, "packed")
+        failed |= bool(result["wrong"])
+        print(f"{'packed + faults':>16} {result['requests']:>9} {result['tokens']:>14} "
+              f"{result['tokens'] / len(emails):>13.0f} {result['seconds']:>8.2f} {result['wrong']:>6}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Throughput and latency benchmark suite for the classification path,
+driven by pkl_files/email_dataset_long.csv.
+
+Stages, each timed per email:
+    preprocess      services.text_normalizer.normalize_text
+    vectorize       the TF-IDF step of the loaded model
+    predict         predict_proba on the vectorized email
+    classify_email  the end-to-end service call (prediction cache disabled)
+    endpoint        POST /v1/email-classify through an in-process ASGI client
+
+For every stage the suite reports p50/p95/p99 latency, throughput and peak
+traced memory, and writes machine-readable JSON. With --baseline it compares
+against a stored result and exits 1 when a stage regresses beyond --threshold.
+
+Run from the repository root:
+    uv run python -m benchmarks.classifier_suite --output bench.json
+    uv run python -m benchmarks.classifier_suite --baseline bench.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import services.classify_email as classify_email_service
+from benchmarks.common import load_email_texts
+from services.cache import TTLCache, TieredCache
+from services.text_normalizer import normalize_text
+
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summarize(latencies: list[float], wall: float, peak_bytes: int) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "count": len(latencies),
+        "p50_ms": _percentile(ordered, 0.50) * 1000,
+        "p95_ms": _percentile(ordered, 0.95) * 1000,
+        "p99_ms": _percentile(ordered, 0.99) * 1000,
+        "throughput_per_s": len(latencies) / wall if wall else 0.0,
+        "peak_memory_kb": peak_bytes / 1024,
+    }
+
+
+def _time_each(fn, items) -> tuple[list[float], float]:
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - start
+
+
+def _peak_memory(fn, items) -> int:
+    # Separate pass: tracemalloc slows allocation-heavy code, so it must not skew the timings
+    tracemalloc.start()
+    try:
+        for item in items:
+            fn(item)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _stage_functions(model):
+    pipeline = model.pipeline
+    if hasattr(pipeline, "steps"):
+        vectorizer, classifier = pipeline[:-1], pipeline.steps[-1][1]
+        return (lambda text: vectorizer.transform([text])), classifier.predict_proba
+    # NumPy runtime
+    return (lambda text: pipeline.transform([text])), pipeline.predict_proba_transformed
+
+
+def _endpoint_latencies(texts: list[str]) -> tuple[list[float], float]:
+    import httpx
+    from fastapi import FastAPI
+    from api.v1 import classify_email_api
+    from core.database import get_session
+
+    # Only the classification router: no database, static files or auth in the measured path
+    app = FastAPI()
+    app.include_router(classify_email_api.router)
+    app.dependency_overrides[get_session] = lambda: None
+
+    async def run():
+        latencies = []
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            start = time.perf_counter()
+            for text in texts:
+                t0 = time.perf_counter()
+                response = await client.post("/v1/email-classify", json={"email_content": text})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+            return latencies, time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+def run_suite(emails: int, memory_sample: int, stages: list[str]) -> dict:
+    # Every email must really be scored, not served from the cache
+    classify_email_service.prediction_cache = TieredCache(TTLCache(0, 0))
+    model = classify_email_service.load_model()
+    texts = load_email_texts(emails)
+    processed = [normalize_text(text) for text in texts]
+    vectorize, predict = _stage_functions(model)
+    vectors = [vectorize(text) for text in processed]
+
+    plan = {
+        "preprocess": (normalize_text, texts),
+        "vectorize": (vectorize, processed),
+        "predict": (predict, vectors),
+        "classify_email": (classify_email_service.classify_email, texts),
+    }
+    results = {}
+    for name in stages:
+        if name == "endpoint":
+            latencies, wall = _endpoint_latencies(texts)
+            results[name] = _summarize(latencies, wall, _peak_memory(_endpoint_latencies, [texts[:memory_sample]]))
+            continue
+        fn, items = plan[name]
+        fn(items[0])  # warm-up
+        latencies, wall = _time_each(fn, items)
+        results[name] = _summarize(latencies, wall, _peak_memory(fn, items[:memory_sample]))
+    return {
+        "meta": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "model_version": model.version,
+            "runtime": type(model.pipeline).__name__,
+            "emails": emails,
+            "timestamp": time.time(),
+        },
+        "stages": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Regressions: latency percentiles up, or throughput down, by more than threshold."""
+    regressions = []
+    for stage, now in current["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before:
+            continue
+        for key in LATENCY_KEYS:
+            if before[key] and now[key] > before[key] * (1 + threshold):
+                regressions.append(f"{stage}.{key}: {before[key]:.3f} -> {now[key]:.3f}")
+        if before["throughput_per_s"] and now["throughput_per_s"] < before["throughput_per_s"] * (1 - threshold):
+            regressions.append(
+                f"{stage}.throughput_per_s: {before['throughput_per_s']:.1f} -> {now['throughput_per_s']:.1f}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--memory-sample", type=int, default=200, help="emails traced for peak memory")
+    parser.add_argument("--stages", nargs="+", default=["preprocess", "vectorize", "predict", "classify_email", "endpoint"])
+    parser.add_argument("--output", help="write the JSON results here")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown, e.g. 0.10 = 10%%")
+    args = parser.parse_args()
+
+    results = run_suite(args.emails, args.memory_sample, args.stages)
+    print(f"{'stage':>15} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'per s':>10} {'peak KB':>9}")
+    for stage, r in results["stages"].items():
+        print(f"{stage:>15} {r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f} {r['p99_ms']:>8.3f} "
+              f"{r['throughput_per_s']:>10.1f} {r['peak_memory_kb']:>9.1f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
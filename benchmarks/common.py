@@ -0,0 +1,17 @@
+import csv
+import itertools
+from pathlib import Path
+
+DATASET_PATH = Path(__file__).resolve().parent.parent / "pkl_files" / "email_dataset_long.csv"
+
+
+def load_dataset(path=DATASET_PATH) -> list[dict]:
+    """Rows of the labelled email dataset as dicts (email_text, department)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def load_email_texts(n: int, path=DATASET_PATH) -> list[str]:
+    """Return n email bodies from the dataset, cycling through it if n is larger."""
+    texts = [row["email_text"] for row in load_dataset(path)]
+    return list(itertools.islice(itertools.cycle(texts), n))
@@ -0,0 +1,133 @@
+"""
+Deterministic corpus of real-world-shaped HTML emails for the body-extraction benchmarks.
+
+Four shapes, filled with text from the labelled dataset:
+    newsletter   table layout, big <style> block, inline styles everywhere, MSO
+                 conditional comments, hidden preheader, buttons, tracking pixel
+    receipt      order table with prices, entities and a <script> block
+    reply        Gmail-style thread with nested blockquotes and <br> line breaks
+    outlook      Word-generated HTML: XML declaration, namespaces, <o:p>, <![if ...]>
+Half of the messages are encoded in windows-1252 or ISO-8859-1 instead of UTF-8, and
+every fifth is a single-part text/html message rather than HTML plus a PDF attachment.
+"""
+import random
+from email.message import EmailMessage
+
+from benchmarks.common import load_email_texts
+
+_STYLE = "\n".join(
+    f".c{i} {{ font-family: Arial, sans-serif; font-size: {12 + i % 6}px; color: #{i * 99991 % 0xFFFFFF:06x}; }}"
+    for i in range(120)
+)
+
+
+def _newsletter(rng: random.Random, texts: list[str]) -> str:
+    rows = "".join(
+        f'<tr><td class="c{i}" style="padding:12px 24px;border-bottom:1px solid #eee">'
+        f'<table role="presentation" width="100%"><tr><td style="font-size:18px;font-weight:bold">'
+        f'{text.split(".")[0]} &amp; more</td></tr>'
+        f'<tr><td style="line-height:1.5">{text} <a href="https://example.com/a/{i}?utm_source=nl" '
+        f'style="color:#0066cc">Read&nbsp;more&nbsp;&raquo;</a></td></tr>'
+        f'<tr><td><img src="https://cdn.example.com/{i}.png" alt="Illustration {i}" width="560" '
+        f'style="display:block;border:0"></td></tr></table></td></tr>'
+        for i, text in enumerate(texts)
+    )
+    return (
+        '<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN" '
+        '"http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">'
+        '<html xmlns="http://www.w3.org/1999/xhtml"><head>'
+        '<meta http-equiv="Content-Type" content="text/html; charset=utf-8">'
+        f'<title>Weekly digest #{rng.randint(1, 500)}</title><style type="text/css">{_STYLE}</style>'
+        '<!--[if mso]><style>table {border-collapse:collapse;}</style><![endif]--></head>'
+        '<body style="margin:0;padding:0;background:#f4f4f4">'
+        '<span style="display:none;max-height:0;overflow:hidden">This week&#8217;s top stories &#8203;&zwnj;</span>'
+        '<center><table role="presentation" width="600" cellpadding="0" cellspacing="0" style="background:#fff">'
+        f'{rows}'
+        '<tr><td align="center" style="padding:24px"><a href="https://example.com/cta" '
+        'style="background:#0066cc;color:#fff;padding:12px 24px;border-radius:4px">Open the dashboard</a></td></tr>'
+        '<tr><td style="font-size:11px;color:#999">&copy; 2025 Example Corp &middot; 1 Main St. '
+        '<a href="https://example.com/unsubscribe">Unsubscribe</a></td></tr>'
+        '</table></center><img src="https://t.example.com/open.gif" width="1" height="1" alt=""></body></html>'
+    )
+
+
+def _receipt(rng: random.Random, texts: list[str]) -> str:
+    items = "".join(
+        f'<tr><td style="padding:4px">{" ".join(text.split()[:5])}</td>'
+        f'<td style="text-align:right">{rng.randint(1, 5)}</td>'
+        f'<td style="text-align:right">&euro;{rng.randint(100, 99999) / 100:.2f}</td></tr>'
+        for text in texts
+    )
+    return (
+        '<html><head><meta charset="utf-8"><script type="text/javascript">'
+        'window.dataLayer = window.dataLayer || []; function gtag(){dataLayer.push(arguments);}'
+        '</script></head><body><div style="max-width:640px;margin:auto">'
+        f'<h2 style="color:#333">Order #{rng.randint(10000, 99999)} confirmed</h2>'
+        f'<p>{texts[0]}</p><table style="width:100%;border-collapse:collapse">'
+        '<thead><tr><th>Item</th><th>Qty</th><th>Price</th></tr></thead>'
+        f'<tbody>{items}</tbody></table>'
+        '<p style="font-size:12px">Questions? Reply to this email &lt;support@example.com&gt;.</p>'
+        '</div></body></html>'
+    )
+
+
+def _reply(rng: random.Random, texts: list[str]) -> str:
+    html = f'<div dir="ltr">{texts[0]}<br><br>Thanks,<br>Alex</div>'
+    for depth, text in enumerate(texts[1:], start=1):
+        html = (
+            f'{html}<div class="gmail_quote"><div dir="ltr" class="gmail_attr">On Mon, {depth} Jun 2025 '
+            f'at 10:{depth:02d}, Sam &lt;sam@example.com&gt; wrote:<br></div>'
+            f'<blockquote class="gmail_quote" style="margin:0 0 0 .8ex;border-left:1px #ccc solid;padding-left:1ex">'
+            f'<div dir="ltr">{text.replace(". ", ".<br>")}</div>'
+        )
+    return html + "</blockquote></div>" * (len(texts) - 1)
+
+
+def _outlook(rng: random.Random, texts: list[str]) -> str:
+    paragraphs = "".join(
+        f'<p class="MsoNormal"><span style="font-size:11.0pt;font-family:&quot;Calibri&quot;,sans-serif">'
+        f'{text}<o:p></o:p></span></p><p class="MsoNormal"><o:p>&nbsp;</o:p></p>'
+        for text in texts
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<html xmlns:v="urn:schemas-microsoft-com:vml" xmlns:o="urn:schemas-microsoft-com:office:office">'
+        '<head><meta name="Generator" content="Microsoft Word 15 (filtered medium)">'
+        '<!--[if gte mso 9]><xml><o:shapedefaults v:ext="edit" spidmax="1026" /></xml><![endif]-->'
+        '<style><!-- p.MsoNormal {margin:0cm; font-size:11.0pt;} --></style></head>'
+        '<body lang="EN-US" link="#0563C1"><div class="WordSection1">'
+        '<![if !supportLists]><span>1.</span><![endif]>'
+        f'{paragraphs}<p class="MsoNormal">Best regards / Mit freundlichen Gr&uuml;&szlig;en<o:p></o:p></p>'
+        '</div></body></html>'
+    )
+
+
+SHAPES = {"newsletter": (_newsletter, 12), "receipt": (_receipt, 8), "reply": (_reply, 5), "outlook": (_outlook, 6)}
+
+
+def build_corpus(n: int, seed: int = 7) -> list[dict]:
+    """n emails as {shape, html, charset, multipart, raw}; raw is an RFC 822 message with the HTML as its only body."""
+    rng = random.Random(seed)
+    texts = load_email_texts(n * 12)
+    corpus = []
+    for i in range(n):
+        shape = list(SHAPES)[i % len(SHAPES)]
+        build, paragraphs = SHAPES[shape]
+        html = build(rng, texts[i * 12:i * 12 + rng.randint(2, paragraphs)])
+        # Accented text so the charset matters
+        accented = "<p>Caf&eacute; r&eacute;sum&eacute;: café résumé naïve — “quoted”</p>"
+        html = html.replace("</body>", accented + "</body>") if "</body>" in html else html + accented
+        charset = ("utf-8", "utf-8", "windows-1252", "iso-8859-1")[i // len(SHAPES) % 4]
+        # Characters outside the charset go out as character references, as mail clients do
+        html = html.encode(charset, errors="xmlcharrefreplace").decode(charset)
+        msg = EmailMessage()
+        msg["Subject"] = f"{shape} {i}"
+        msg["From"] = "news@example.com"
+        msg.set_content(html, subtype="html", charset=charset)
+        if i % 5:
+            # Most carry an attachment next to the HTML; every fifth is a bare single-part HTML email
+            msg.add_attachment(b"%PDF-1.4 " + bytes(2048), maintype="application", subtype="pdf",
+                               filename=f"{shape}-{i}.pdf")
+        corpus.append({"shape": shape, "html": html, "charset": charset, "multipart": bool(i % 5),
+                       "raw": msg.as_bytes()})
+    return corpus
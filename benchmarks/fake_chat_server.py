@@ -0,0 +1,204 @@
+"""
+Minimal OpenAI-compatible chat-completions server for the LLM benchmarks.
+
+POST /v1/chat/completions answers after `latency` seconds with a sentiment that is
+a pure function of the last user message (see expected_sentiment), so callers can
+check every answer went back to the right email. A message made of "### Email <id>"
+blocks (a packed sentiment request) gets a JSON object with the sentiment of every
+block instead. Faults can be injected: every `rate_limit_every`-th request gets a
+429 with Retry-After, every `stall_every`-th one is held for `stall` seconds so the
+client's timeout fires, and in packed answers every `drop_every`-th id is left out
+and every `garble_every`-th gets a label that isn't a sentiment.
+
+With reply_words > 0 a plain prompt is answered with a reply of that many words
+instead, each word taking `word_latency` seconds to "generate" after the first
+one arrives at `latency`. Requests with "stream": true get the reply as
+chat.completion.chunk server-sent events, one word per chunk; a client that
+hangs up mid-stream is counted in `disconnected`.
+
+Usage:
+    with FakeChatServer(latency=0.2) as server:
+        llm = init_chat_model("gpt-4o-mini", base_url=server.url, api_key="x")
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SENTIMENTS = ("Positive", "Negative", "Neutral")
+_EMAIL_BLOCK = re.compile(r"^### Email (\S+)\n", re.MULTILINE)
+_REPLY_WORDS = "Thank you for your email. We have received your request and will get back to you shortly.".split()
+
+
+def expected_sentiment(text: str) -> str:
+    return SENTIMENTS[hashlib.sha1(text.encode("utf-8")).digest()[0] % len(SENTIMENTS)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.fake._lock:
+            self.server.fake.connections += 1
+
+    def _send(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _stream(self, n: int, request: dict, words: list[str], prompt_tokens: int):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        base = {"id": f"chatcmpl-{n}", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": request.get("model", "fake")}
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.server.fake.word_latency)
+            delta = {"role": "assistant", "content": word} if i == 0 else {"content": " " + word}
+            self._chunk(b"data: " + json.dumps({**base, "choices": [{"index": 0, "delta": delta,
+                                                                         "finish_reason": None}]}).encode() + b"\n\n")
+        self._chunk(b"data: " + json.dumps({**base, "choices": [{"index": 0, "delta": {},
+                                                                     "finish_reason": "stop"}]}).encode() + b"\n\n")
+        if (request.get("stream_options") or {}).get("include_usage"):
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                     "total_tokens": prompt_tokens + len(words)}
+            self._chunk(b"data: " + json.dumps({**base, "choices": [], "usage": usage}).encode() + b"\n\n")
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        fake = self.server.fake
+        n = fake._enter()
+        try:
+            if fake.rate_limit_every and n % fake.rate_limit_every == 0:
+                fake.rate_limited += 1
+                self._send(429, {"error": {"message": "Rate limit reached", "type": "requests",
+                                           "code": "rate_limit_exceeded"}},
+                           {"Retry-After": str(fake.retry_after)})
+                return
+            if fake.stall_every and n % fake.stall_every == 0:
+                fake.stalled += 1
+                time.sleep(fake.stall)
+            else:
+                time.sleep(fake.latency)
+            content = fake.respond(request["messages"])
+            prompt_tokens = sum(len(m.get("content") or "") for m in request["messages"]) // 4
+            if request.get("stream"):
+                self._stream(n, request, content.split(" "), prompt_tokens)
+                return
+            if fake.reply_words:
+                time.sleep(fake.word_latency * (fake.reply_words - 1))
+            self._send(200, {
+                "id": f"chatcmpl-{n}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 1, "total_tokens": prompt_tokens + 1},
+            })
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on a stalled request, or hung up mid-stream
+            with fake._lock:
+                fake.disconnected += 1
+        finally:
+            fake._exit()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: "FakeChatServer"
+
+
+class FakeChatServer:
+    def __init__(self, latency: float = 0.1, rate_limit_every: int = 0, retry_after: float = 0.1,
+                 stall_every: int = 0, stall: float = 5.0, drop_every: int = 0, garble_every: int = 0,
+                 reply_words: int = 0, word_latency: float = 0.0):
+        self.latency = latency
+        self.reply_words = reply_words
+        self.word_latency = word_latency
+        self.drop_every = drop_every
+        self.garble_every = garble_every
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.stall_every = stall_every
+        self.stall = stall
+        self._lock = threading.Lock()
+        self.reset_counters()
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def respond(self, messages: list[dict]) -> str:
+        with self._lock:
+            self.prompt_chars += sum(len(m.get("content") or "") for m in messages)
+        user = [m["content"] for m in messages if m.get("role") == "user"]
+        text = user[-1] if user else ""
+        parts = _EMAIL_BLOCK.split(text)
+        if len(parts) == 1:
+            if self.reply_words:
+                return " ".join(_REPLY_WORDS[i % len(_REPLY_WORDS)] for i in range(self.reply_words))
+            return expected_sentiment(text)
+        answers = {}
+        for email_id, block in zip(parts[1::2], parts[2::2]):
+            with self._lock:
+                self.packed_ids += 1
+                n = self.packed_ids
+            if self.drop_every and n % self.drop_every == 0:
+                continue
+            answers[email_id] = "Mixed" if self.garble_every and n % self.garble_every == 0 \
+                else expected_sentiment(block.rstrip("\n"))
+        return json.dumps(answers)
+
+    def reset_counters(self):
+        self.requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.rate_limited = 0
+        self.stalled = 0
+        self.prompt_chars = 0
+        self.packed_ids = 0
+        self.disconnected = 0
+
+    def _enter(self) -> int:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return self.requests
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,378 @@
+"""
+Local IMAP4rev1 stand-in for benchmarking the mailbox code without Gmail.
+
+Serves one INBOX over plain TCP, built from the labelled dataset, and answers
+enough of the protocol for services.mailbox: CAPABILITY, LOGIN, SELECT
+(with UIDVALIDITY), SEARCH, FETCH, UID SEARCH, UID FETCH, NOOP and LOGOUT.
+FETCH understands UID, FLAGS, RFC822, BODYSTRUCTURE and BODY[.PEEK][section]<partial>,
+with sections by part number, HEADER, TEXT and HEADER.FIELDS (...).
+Messages get ascending UIDs with gaps, as after deletions, and the mailbox can
+be grown, expunged or given a new UIDVALIDITY while the server runs. Every tagged response is delayed by
+`latency` seconds to stand in for the network round trip to the real server
+(LOGIN additionally by `login_latency`, for the TLS handshake and authentication),
+and every byte written is counted in bytes_sent. disconnect_all() drops every
+client, as a server does to sessions it has timed out.
+
+    with FakeImapServer(build_messages(500), latency=0.02) as server:
+        settings.IMAP_HOST, settings.IMAP_PORT, settings.IMAP_USE_SSL = "127.0.0.1", server.port, False
+        ...
+
+Run standalone to point a dev server at it:
+    uv run python -m benchmarks.fake_imap_server --messages 1000 --latency-ms 20 --port 1143
+"""
+import argparse
+import random
+import re
+import socket
+import socketserver
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from functools import lru_cache
+from email import message_from_bytes
+from email.message import EmailMessage, Message
+from email.utils import format_datetime
+
+from benchmarks.common import load_email_texts
+
+_COMMAND = re.compile(rb"^(\S+) (\S+)(?: (.*))?$")
+_FETCH_ITEMS = re.compile(rb"^(\S+) \(?(.*?)\)?$")
+_FETCH_ITEM = re.compile(rb"(BODY(?:\.PEEK)?)\[([^\]]*)\](?:<(\d+)\.(\d+)>)?|[A-Z0-9.]+", re.IGNORECASE)
+_HEADER_FIELDS = re.compile(rb"^HEADER\.FIELDS \((.*)\)$", re.IGNORECASE)
+
+
+def build_messages(n: int, html_every: int = 3, attachment_every: int = 0,
+                   attachment_size: int = 512 * 1024) -> list[bytes]:
+    """
+    n RFC 822 messages from the dataset; every html_every-th one is multipart with an
+    HTML part, and every attachment_every-th one carries a PDF of attachment_size bytes.
+    """
+    messages = []
+    for i, text in enumerate(load_email_texts(n)):
+        msg = EmailMessage()
+        msg["Subject"] = f"Request #{i + 1}: {' '.join(text.split()[:6])}"
+        msg["From"] = f"customer{i % 97}@example.com"
+        msg["To"] = "support@example.com"
+        msg["Date"] = format_datetime(datetime.fromtimestamp(1_700_000_000 + i * 60, timezone.utc))
+        msg.set_content(text)
+        if html_every and i % html_every == 0:
+            msg.add_alternative(f"<html><body style=\"font-family: Arial\"><p>{text}</p></body></html>", subtype="html")
+        if attachment_every and i % attachment_every == 0:
+            msg.add_attachment(random.Random(i).randbytes(attachment_size), maintype="application",
+                               subtype="pdf", filename=f"statement-{i + 1}.pdf")
+        messages.append(msg.as_bytes())
+    return messages
+
+
+def parse_sequence_set(spec: bytes, values: list[int]) -> list[int]:
+    """The members of ascending `values` (sequence numbers or UIDs) in an IMAP set such as b'1,4:6,9:*'."""
+    if not values:
+        return []
+    matched = set()
+    for part in spec.split(b","):
+        low, _, high = part.partition(b":")
+        low, high = (values[-1] if x == b"*" else int(x) for x in (low, high or low))
+        low, high = min(low, high), max(low, high)
+        # Sorted values: slice the range out instead of scanning the whole mailbox
+        matched.update(values[bisect_left(values, low):bisect_right(values, high)])
+    return sorted(matched)
+
+
+@lru_cache(maxsize=4096)
+def _parse(raw: bytes) -> Message:
+    return message_from_bytes(raw)
+
+
+def _encoded_body(part: Message) -> bytes:
+    # The part's body exactly as it sits in the message (still base64/QP encoded)
+    return part.get_payload().encode("ascii", errors="surrogateescape")
+
+
+def _bodystructure(part: Message) -> list:
+    if part.is_multipart():
+        return [_bodystructure(child) for child in part.get_payload()] + [part.get_content_subtype().upper()]
+    params = [value for key, val in part.get_params()[1:] for value in (key.upper(), val)] or None
+    body = _encoded_body(part)
+    fields = [part.get_content_maintype().upper(), part.get_content_subtype().upper(), params,
+              part["Content-ID"], part["Content-Description"],
+              (part["Content-Transfer-Encoding"] or "7BIT").upper(), len(body)]
+    if part.get_content_maintype() == "text":
+        fields.append(body.count(b"\n"))
+    disposition = part.get_content_disposition()
+    filename = part.get_filename()
+    fields += [None, [disposition.upper(), ["FILENAME", filename] if filename else None] if disposition else None]
+    return fields
+
+
+def _serialize(value) -> bytes:
+    if value is None:
+        return b"NIL"
+    if isinstance(value, int):
+        return b"%d" % value
+    if isinstance(value, list):
+        return b"(" + b" ".join(_serialize(v) for v in value) + b")"
+    return b'"' + str(value).replace("\\", "\\\\").replace('"', '\\"').encode() + b'"'
+
+
+def _section(raw: bytes, spec: bytes) -> bytes:
+    msg = _parse(raw)
+    header_end = raw.find(b"\n\n") + 2 if b"\n\n" in raw else len(raw)
+    if not spec:
+        return raw
+    if spec.upper() == b"HEADER":
+        return raw[:header_end]
+    if spec.upper() == b"TEXT":
+        return raw[header_end:]
+    match = _HEADER_FIELDS.match(spec)
+    if match:
+        wanted = {name.lower() for name in match.group(1).decode().split()}
+        return "".join(f"{name}: {value}\r\n" for name, value in msg.items() if name.lower() in wanted).encode() + b"\r\n"
+    part = msg
+    for number in spec.split(b"."):
+        if part.is_multipart():
+            part = part.get_payload()[int(number) - 1]
+        elif number != b"1":
+            return b""
+    return _encoded_body(part)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_Server"
+    # Buffered, flushed once per response: unbuffered small writes hit Nagle/delayed-ACK stalls
+    wbufsize = 1 << 16
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.clients.add(self)
+            self.server.connections += 1
+            self.server.max_clients = max(self.server.max_clients, len(self.server.clients))
+
+    def finish(self):
+        with self.server.lock:
+            self.server.clients.discard(self)
+        try:
+            super().finish()
+        except OSError:
+            pass
+
+    def write(self, data: bytes):
+        self.server.bytes_sent += len(data)
+        self.wfile.write(data)
+
+    def send(self, line: bytes):
+        self.write(line + b"\r\n")
+
+    def handle(self):
+        self.send(b"* OK Fake IMAP4rev1 ready")
+        self.wfile.flush()
+        while True:
+            try:
+                line = self.rfile.readline()
+            except OSError:
+                return
+            if not line:
+                return
+            match = _COMMAND.match(line.rstrip(b"\r\n"))
+            if not match:
+                self.send(b"* BAD unparsable command")
+                continue
+            tag, command, args = match.group(1), match.group(2).upper(), match.group(3) or b""
+            self.server.commands += 1
+            time.sleep(self.server.latency)
+            handler = getattr(self, f"do_{command.decode()}", None)
+            if handler is None:
+                self.send(tag + b" BAD unknown command")
+                continue
+            status = handler(args)
+            self.send(tag + b" " + status)
+            self.wfile.flush()
+            if command == b"LOGOUT":
+                return
+
+    def do_CAPABILITY(self, args: bytes) -> bytes:
+        self.send(b"* CAPABILITY IMAP4rev1")
+        return b"OK CAPABILITY completed"
+
+    def do_LOGIN(self, args: bytes) -> bytes:
+        time.sleep(self.server.login_latency)
+        return b"OK LOGIN completed"
+
+    def do_NOOP(self, args: bytes) -> bytes:
+        return b"OK NOOP completed"
+
+    def do_LOGOUT(self, args: bytes) -> bytes:
+        self.send(b"* BYE logging out")
+        return b"OK LOGOUT completed"
+
+    def do_SELECT(self, args: bytes) -> bytes:
+        self.send(b"* %d EXISTS" % len(self.server.messages))
+        self.send(b"* FLAGS (\\Seen)")
+        self.send(b"* OK [UIDVALIDITY %d] UIDs valid" % self.server.uidvalidity)
+        self.send(b"* OK [UIDNEXT %d] Predicted next UID" % (self.server.uids[-1] + 1 if self.server.uids else 1))
+        return b"OK [READ-WRITE] SELECT completed"
+
+    def do_SEARCH(self, args: bytes, by_uid: bool = False) -> bytes:
+        # Only ALL and UID <set> are understood
+        numbers = self.server.uids if by_uid else list(range(1, len(self.server.messages) + 1))
+        criteria = args.split()
+        if len(criteria) == 2 and criteria[0].upper() == b"UID":
+            matched = parse_sequence_set(criteria[1], self.server.uids)
+            if not by_uid:
+                matched = [bisect_left(self.server.uids, uid) + 1 for uid in matched]
+            numbers = matched
+        self.send(b"* SEARCH" + b"".join(b" %d" % n for n in numbers))
+        return b"OK SEARCH completed"
+
+    def do_FETCH(self, args: bytes, by_uid: bool = False) -> bytes:
+        match = _FETCH_ITEMS.match(args)
+        if not match:
+            return b"BAD unparsable FETCH"
+        items = list(_FETCH_ITEM.finditer(match.group(2)))
+        uids = self.server.uids
+        if by_uid:
+            numbers = [bisect_left(uids, uid) + 1 for uid in parse_sequence_set(match.group(1), uids)]
+        else:
+            numbers = parse_sequence_set(match.group(1), list(range(1, len(uids) + 1)))
+        for number in numbers:
+            raw = self.server.messages[number - 1]
+            response = [b"UID %d" % uids[number - 1]] if by_uid else []
+            for item in items:
+                name = item.group(0).upper()
+                if item.group(1):
+                    data = _section(raw, item.group(2))
+                    label = b"BODY[%s]" % item.group(2)
+                    if item.group(3):
+                        origin = int(item.group(3))
+                        data = data[origin:origin + int(item.group(4))]
+                        label += b"<%d>" % origin
+                    response.append(label + b" {%d}\r\n" % len(data) + data)
+                elif name == b"UID":
+                    if not by_uid:
+                        response.append(b"UID %d" % uids[number - 1])
+                elif name == b"FLAGS":
+                    response.append(b"FLAGS ()")
+                elif name == b"RFC822":
+                    response.append(b"RFC822 {%d}\r\n" % len(raw) + raw)
+                elif name == b"BODYSTRUCTURE":
+                    response.append(b"BODYSTRUCTURE " + _serialize(_bodystructure(_parse(raw))))
+                else:
+                    return b"BAD unsupported FETCH item " + name
+            self.write(b"* %d FETCH (" % number + b" ".join(response) + b")\r\n")
+        return b"OK FETCH completed"
+
+    def do_UID(self, args: bytes) -> bytes:
+        command, _, rest = args.partition(b" ")
+        handler = {b"SEARCH": self.do_SEARCH, b"FETCH": self.do_FETCH}.get(command.upper())
+        if handler is None:
+            return b"BAD unsupported UID command"
+        return handler(rest, by_uid=True)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, messages: list[bytes], latency: float, login_latency: float):
+        super().__init__(address, _Handler)
+        self.login_latency = login_latency
+        self.lock = threading.Lock()
+        self.clients: set[_Handler] = set()
+        self.connections = 0
+        self.max_clients = 0
+        self.messages = list(messages)
+        # Every third UID is missing, as if those messages had been deleted
+        self.uids = [i + i // 2 + 1 for i in range(len(messages))]
+        self.uidvalidity = 1
+        self.latency = latency
+        self.commands = 0
+        self.bytes_sent = 0
+
+
+class FakeImapServer:
+    def __init__(self, messages: list[bytes], latency: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+                 login_latency: float = 0.0):
+        self._server = _Server((host, port), messages, latency, login_latency)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def commands(self) -> int:
+        return self._server.commands
+
+    @property
+    def bytes_sent(self) -> int:
+        return self._server.bytes_sent
+
+    def append(self, messages: list[bytes]):
+        """Deliver new mail; it gets UIDs above every existing one."""
+        next_uid = self._server.uids[-1] + 1 if self._server.uids else 1
+        self._server.uids.extend(range(next_uid, next_uid + len(messages)))
+        self._server.messages.extend(messages)
+
+    def expunge(self, count: int):
+        """Delete the oldest `count` messages, shifting every sequence number."""
+        del self._server.uids[:count]
+        del self._server.messages[:count]
+
+    def renumber(self):
+        """Reassign all UIDs under a new UIDVALIDITY, as a server does after rebuilding a mailbox."""
+        self._server.uidvalidity += 1
+        self._server.uids = list(range(1, len(self._server.messages) + 1))
+
+    @property
+    def connections(self) -> int:
+        """Connections accepted so far (one per login)."""
+        return self._server.connections
+
+    @property
+    def max_clients(self) -> int:
+        """Most connections open at the same time."""
+        return self._server.max_clients
+
+    def disconnect_all(self):
+        with self._server.lock:
+            clients = list(self._server.clients)
+        for client in clients:
+            try:
+                client.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def index(self):
+        """Parse every message up front, as a real server keeps MIME structure indexed."""
+        for raw in self._server.messages:
+            _parse(raw)
+
+    def reset_counters(self):
+        self._server.commands = 0
+        self._server.bytes_sent = 0
+        self._server.connections = 0
+        self._server.max_clients = 0
+
+    def __enter__(self) -> "FakeImapServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=1143)
+    args = parser.parse_args()
+    with FakeImapServer(build_messages(args.messages), args.latency_ms / 1000, port=args.port) as server:
+        print(f"Serving {args.messages} messages on 127.0.0.1:{server.port} "
+              f"(set IMAP_HOST=127.0.0.1 IMAP_PORT={server.port} IMAP_USE_SSL=false)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -1,14 +1,28 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy_utils import database_exists, create_database
 from sqlmodel import create_engine, SQLModel, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from .config import settings
 import models
 
 engine = create_engine(settings.DATABASE_URL, echo=True)
 
+def async_database_url(url: str) -> str:
+    """The same database through psycopg 3's asyncio driver."""
+    return make_url(url).set(drivername="postgresql+psycopg").render_as_string(hide_password=False)
+
+# For request handlers: a query waits on the event loop instead of holding up every other request
+async_engine = create_async_engine(async_database_url(settings.DATABASE_URL), echo=True)
+
 def get_session():
     with Session(engine) as session:
         yield session
 
+async def get_async_session():
+    async with AsyncSession(async_engine) as session:
+        yield session
+
 def init_db():
     if not database_exists(engine.url):
         create_database(engine.url)
@@ -1,24 +1,41 @@
-from services.classify_email import classify_email
+from services.classification_executor import classify_email_async, classify_emails_offloaded
+import services.classify_email as classify_email_service
+import services.sentiment_model as sentiment_model_service
+from services.cache import content_key
+from services.email_store import (
+    delete_stale_records,
+    get_records,
+    save_classifications,
+    save_fetched,
+    save_sentiments,
+    to_email,
+)
 from sqlmodel import Session, select
 from models.schema import Org
 from models.request_response import OrgRead
 from core.database import engine
-from typing import Optional, TypedDict
-from langgraph.graph import StateGraph, END
-import imaplib
-import email
+from typing import Annotated, Callable, Optional, TypedDict
+import operator
+from langchain_core.runnables import RunnableLambda
+from langgraph.config import get_stream_writer
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
+from services.imap_pool import imap_pool
+from services.mailbox import fetch_messages, search_uids, select_inbox
+from services.org_service import get_mailbox_state, get_org_by_id_async, save_mailbox_state, save_mailbox_state_async
+from services.sentiment_packing import build_packs, email_text, parse_packed_response, render_pack
+import asyncio
 import json
-import re
-from bs4 import BeautifulSoup
 from core import settings
-from langchain.chat_models import init_chat_model
+from services.llm_gateway import get_chat_model
 from langchain.schema import HumanMessage, SystemMessage
 #  Create LLM
 
-llm = init_chat_model(
-    model="gpt-4o-mini",
-    temperature=0,
-    api_key=settings.OPENAI_API_KEY
+llm = get_chat_model(
+    "sentiment",
+    # The OpenAI client backs off exponentially and honours Retry-After on 429s
+    timeout=settings.SENTIMENT_TIMEOUT,
+    max_retries=settings.SENTIMENT_MAX_RETRIES
 )
 
 
@@ -29,107 +46,127 @@ class State(TypedDict, total=False):
     offset: Optional[int]
     limit: Optional[int]
     emails: Optional[list]
+    error: Optional[str]
+    sync: Optional[dict]
+    # Emails above the high-water mark found by an incremental run (0: nothing new since the last one)
+    new_emails: Optional[int]
+    refresh: Optional[bool]
     
 
+class GraphState(State, total=False):
+    # Per-email results of the fan-out, in completion order; store_results puts them back in page order
+    analysed: Annotated[list[dict], operator.add]
+
+
+class EmailResult(TypedDict):
+    # All an email's subgraph hands back to the page
+    analysed: Annotated[list[dict], operator.add]
+
+
+class EmailState(EmailResult, total=False):
+    # One email's subgraph: both branches read "email" and each writes its own key
+    email: dict
+    index: int
+    classification_report: dict
+    sentiment: dict
+
+
+def current_model_version() -> Optional[str]:
+    try:
+        return classify_email_service.registry.get().version
+    except Exception:
+        return None
+
 
 # 2. Define nodes
+def _org_details(org) -> dict:
+    org_details = OrgRead.model_validate(org).model_dump()
+    print(f"Step 1: Fetched Org Details: {org_details}")
+    return org_details
+
+
 def fetch_emails(state: State):
 
     # Get Org details
     org_id = state.get("orgId")
-    limit = state.get("limit", 1)
-    offset = state.get("offset", 0)
     org_details = None
     if org_id:
         with Session(engine) as session:
             statement = select(Org).where(Org.id == int(org_id))
             result = session.exec(statement).first()
             if result:
-                org_read = OrgRead.model_validate(result)
-                org_details = org_read.model_dump()
-                print(f"Step 1: Fetched Org Details: {org_details}")
-    
+                org_details = _org_details(result)
+    return _fetch_org_emails(state, org_details)
+
+
+async def afetch_emails(state: State):
+    org_id = state.get("orgId")
+    org = await get_org_by_id_async(int(org_id)) if org_id else None
+    # imaplib and the store writes block: they get a worker thread, the event loop stays free
+    return await asyncio.to_thread(_fetch_org_emails, state, _org_details(org) if org else None)
+
+
+def _fetch_org_emails(state: State, org_details: Optional[dict]):
+    org_id = state.get("orgId")
     # Now we will fetch emails for this org
+    if not org_details:
+        state["error"] = f"Org {org_id} not found"
     if org_details:
         gmail_user = org_details.get("email")
         gmail_app_pass = org_details.get("password")
-        imap_server = "imap.gmail.com"
-        imap_port = 993
         fetched_emails_data = []
         if isinstance(gmail_user, str) and isinstance(gmail_app_pass, str):
             try:
-                mail = imaplib.IMAP4_SSL(imap_server, imap_port)
-                mail.login(gmail_user, gmail_app_pass)
-                status, messages = mail.select("inbox")
-                if status == 'OK':
-                    status, email_ids = mail.search(None, 'ALL')
-                    if status == 'OK' and email_ids[0]:
-                        all_email_ids = email_ids[0].split()
-                        # Apply offset and limit
+                # Borrowed from the per-org pool: no TLS handshake or LOGIN on repeat runs
+                with imap_pool.session(org_id, gmail_user, gmail_app_pass) as mail:
+                    uidvalidity = select_inbox(mail)
+                    if uidvalidity is not None:
+                        # Ensure offset and limit are integers
                         offset = state.get("offset")
                         limit = state.get("limit")
-                        # Ensure offset and limit are integers
-                        offset = int(offset) if offset is not None else 0
                         limit = int(limit) if limit is not None else 1
-                        # Get the correct slice (latest emails first)
-                        selected_ids = all_email_ids[::-1][offset:offset+limit]
-                        for email_id in selected_ids:
-                            status, msg_data = mail.fetch(email_id, "(RFC822)")
-                            if status == 'OK' and msg_data and msg_data[0]:
-                                raw_email = msg_data[0][1] if isinstance(msg_data[0], tuple) and len(msg_data[0]) > 1 else None
-                                if isinstance(raw_email, bytes):
-                                    msg = email.message_from_bytes(raw_email)
-                                    subject = msg['subject']
-                                    from_address = msg['from']
-                                    date = msg['date']
-                                    plain_text_body = ""
-                                    html_body_content = ""
-                                    if msg.is_multipart():
-                                        for part in msg.walk():
-                                            ctype = part.get_content_type()
-                                            cdispo = part.get_content_disposition()
-                                            if ctype == 'text/plain' and cdispo is None:
-                                                payload = part.get_payload(decode=True)
-                                                if isinstance(payload, bytes):
-                                                    plain_text_body = payload.decode(errors='ignore')
-                                                    break
-                                            elif ctype == 'text/html' and cdispo is None:
-                                                payload = part.get_payload(decode=True)
-                                                if isinstance(payload, bytes):
-                                                    html_body_content = payload.decode(errors='ignore')
-                                    else:
-                                        payload = msg.get_payload(decode=True)
-                                        if isinstance(payload, bytes):
-                                            plain_text_body = payload.decode(errors='ignore')
-                                    def clean_email_body(body: str) -> str:
-                                        """
-                                        Removes HTML tags and inline styles from email body.
-                                        Returns clean plain text.
-                                        """
-                                        if body is None:
-                                            return ""
-                                        soup = BeautifulSoup(body, "html.parser")
-                                        for script_or_style in soup(["script", "style"]):
-                                            script_or_style.extract()
-                                        import bs4
-                                        for tag in soup.find_all(True):
-                                            if isinstance(tag, bs4.element.Tag) and "style" in tag.attrs:
-                                                del tag.attrs["style"]
-                                        text = soup.get_text(separator="\n", strip=True)
-                                        text = re.sub(r'\n\s*\n', '\n\n', text).strip()
-                                        return text
-                                    final_body = plain_text_body if plain_text_body else clean_email_body(html_body_content)
-                                    email_data = {
-                                        "email_id": email_id.decode() if isinstance(email_id, bytes) else str(email_id),
-                                        "subject": subject,
-                                        "from": from_address,
-                                        "date": date,
-                                        "body": final_body,
-                                    }
-                                    fetched_emails_data.append(email_data)
-                mail.logout()
+                        if offset is None:
+                            mailbox_state = get_mailbox_state(int(org_id))
+                            last_uid = 0
+                            if mailbox_state and mailbox_state.uidvalidity == uidvalidity:
+                                # Incremental sync: the oldest mail above the org's high-water mark
+                                last_uid = mailbox_state.last_uid
+                                selected_uids = search_uids(mail, after_uid=last_uid)[:limit]
+                            else:
+                                if mailbox_state:
+                                    print(f"UIDVALIDITY changed for org {org_id}, resyncing the mailbox")
+                                    delete_stale_records(int(org_id), uidvalidity)
+                                # First sync: start from the latest `limit` emails, not the oldest in the mailbox;
+                                # the high-water mark lands on the newest, so later runs pick up new mail only
+                                selected_uids = search_uids(mail)[-limit:] if limit > 0 else []
+                            state["sync"] = {
+                                "uidvalidity": uidvalidity,
+                                "last_uid": selected_uids[-1] if selected_uids else last_uid,
+                            }
+                            state["new_emails"] = len(selected_uids)
+                        else:
+                            # Paged browsing (latest emails first); leaves the high-water mark alone
+                            offset = int(offset)
+                            selected_uids = search_uids(mail)[::-1][offset:offset+limit]
+                        # Emails already in the store are served from it; IMAP only downloads unseen ones
+                        records = {} if state.get("refresh") else get_records(int(org_id), uidvalidity, selected_uids)
+                        unseen_uids = [uid for uid in selected_uids if uid not in records]
+                        fetched = {}
+                        # One FETCH round trip per chunk of ids, not per email
+                        for parsed in fetch_messages(mail, unseen_uids, settings.IMAP_FETCH_CHUNK_SIZE, uidvalidity):
+                            save_fetched(int(org_id), parsed)
+                            fetched.update((email_obj["uid"], email_obj) for email_obj in parsed)
+                        model_version = current_model_version()
+                        local_sentiment_version = sentiment_model_service.current_version()
+                        for uid in selected_uids:
+                            if uid in fetched:
+                                fetched_emails_data.append(fetched[uid])
+                            elif uid in records:
+                                fetched_emails_data.append(to_email(records[uid], model_version, sentiment_prompt_version(),
+                                                                    local_sentiment_version))
             except Exception as e:
                 print(f"Error fetching email: {e}")
+                state["error"] = f"Error fetching email: {e}"
         state["emails"] = fetched_emails_data
     return state
 
@@ -137,14 +174,25 @@ def fetch_emails(state: State):
 def custom_model_classification(state: State):
     emails = state.get("emails", [])
     if emails and isinstance(emails, list):
-        for email_obj in emails:
-            email_body = email_obj.get("body", "")
+        # Emails with a stored prediction from the current model are not scored again
+        pending = [email_obj for email_obj in emails if "classification_report" not in email_obj]
+        # One batched call for the whole page, run on the process pool when configured
+        try:
+            reports = classify_emails_offloaded([email_obj.get("body", "") for email_obj in pending])
+        except Exception as e:
+            reports = [{"error": str(e)} for _ in pending]
+        for email_obj, report in zip(pending, reports):
+            email_obj["classification_report"] = report
+        if pending and state.get("orgId"):
             try:
-                email_obj["classification_report"] = classify_email(email_body)
+                save_classifications(int(state["orgId"]), pending)
             except Exception as e:
-                email_obj["classification_report"] = {"error": str(e)}
-    else:
+                print(f"Error storing classifications: {e}")
+    elif state.get("error"):
         state["emails"] = [{"classification_report": {"error": "No email body available for classification."}}]
+    else:
+        # Nothing to fetch (no new mail since the last run) is an empty page, not an error
+        state["emails"] = []
     return state
 
 sentiment_system_prompt = """
@@ -161,58 +209,338 @@ Guidelines:
 4. Respond with only the category name (Positive, Negative, or Neutral). Do not add explanations.  
 """
 
+packed_sentiment_system_prompt = sentiment_system_prompt + """
+Batch format:
+You will receive several emails, each starting with a line "### Email <id>".
+Classify each email on its own and, instead of a category name, respond with only a JSON object
+mapping every id to its category, e.g. {"12": "Positive", "15": "Neutral"}.
+"""
+
+# Stored sentiments are reused only while the model and prompt that produced them are unchanged
+SENTIMENT_PROMPT_VERSION = content_key("gpt-4o-mini", sentiment_system_prompt)[:12]
+PACKED_SENTIMENT_PROMPT_VERSION = content_key("gpt-4o-mini", packed_sentiment_system_prompt)[:12]
+
+
+def sentiment_prompt_version() -> str:
+    return PACKED_SENTIMENT_PROMPT_VERSION if settings.SENTIMENT_MODE == "packed" else SENTIMENT_PROMPT_VERSION
+
+
+def _response_text(response) -> str:
+    if hasattr(response, 'content'):
+        content = response.content
+        if isinstance(content, str):
+            return content.strip()
+        elif isinstance(content, list):
+            return " ".join(str(item) for item in content).strip()
+        return str(content).strip()
+    return str(response).strip()
+
+
+def _sentiment_prompt(email_obj: dict) -> list:
+    return [
+        SystemMessage(content=sentiment_system_prompt),
+        HumanMessage(content=email_text(email_obj.get("subject", ""), email_obj.get("body", "")))
+    ]
+
+
+def _email_writer() -> Callable[[dict], None]:
+    """Streams a finished email to graph.stream(..., stream_mode="custom", subgraphs=True) callers; a no-op otherwise."""
+    try:
+        writer = get_stream_writer()
+    except (RuntimeError, KeyError):
+        # Called outside a graph run (scripts and benchmarks call the nodes directly)
+        return lambda email_obj: None
+    # A copy: the consumer serializes it on another thread while the node goes on
+    return lambda email_obj: writer({"email": dict(email_obj)})
+
+
+def _analyse_single(emails: list[dict], on_done: Callable[[dict], None] = lambda email_obj: None):
+    # Concurrent calls, at most SENTIMENT_CONCURRENCY at a time; each email is done as soon as its call returns
+    prompts = [_sentiment_prompt(email_obj) for email_obj in emails]
+    responses = llm.batch_as_completed(prompts, config={"max_concurrency": settings.SENTIMENT_CONCURRENCY},
+                                       return_exceptions=True) if prompts else []
+    for i, response in responses:
+        email_obj = emails[i]
+        if isinstance(response, Exception):
+            email_obj["sentiment_analysis"] = {"error": str(response)}
+        else:
+            email_obj["sentiment_analysis"] = _response_text(response)
+        on_done(email_obj)
+
+
+def _analyse_packed(emails: list[dict], on_done: Callable[[dict], None] = lambda email_obj: None):
+    # Ids the model sees: the email ids when they're unique, positions otherwise
+    ids = [str(email_obj.get("email_id", i)) for i, email_obj in enumerate(emails)]
+    if len(set(ids)) != len(ids):
+        ids = [str(i) for i in range(len(emails))]
+    by_id = dict(zip(ids, emails))
+    texts = {email_id: email_text(e.get("subject", ""), e.get("body", "")) for email_id, e in by_id.items()}
+    json_llm = llm.bind(response_format={"type": "json_object"})
+
+    remaining = ids
+    for _ in range(settings.SENTIMENT_PACK_ATTEMPTS):
+        if not remaining:
+            break
+        packs = build_packs([(email_id, texts[email_id]) for email_id in remaining],
+                            settings.SENTIMENT_PACK_TOKEN_BUDGET, settings.SENTIMENT_PACK_MAX_EMAILS)
+        responses = json_llm.batch_as_completed(
+            [[SystemMessage(content=packed_sentiment_system_prompt), HumanMessage(content=render_pack(pack))]
+             for pack in packs],
+            config={"max_concurrency": settings.SENTIMENT_CONCURRENCY},
+            return_exceptions=True,
+        )
+        for i, response in responses:
+            if isinstance(response, Exception):
+                continue
+            pack = packs[i]
+            answers = parse_packed_response(_response_text(response), [email_id for email_id, _ in pack])
+            for email_id, sentiment in answers.items():
+                by_id[email_id]["sentiment_analysis"] = sentiment
+                on_done(by_id[email_id])
+        # Only the ids with no valid answer go out again
+        remaining = [email_id for email_id in remaining if "sentiment_analysis" not in by_id[email_id]]
+
+    # Whatever packing couldn't settle is asked one email at a time
+    if remaining:
+        _analyse_single([by_id[email_id] for email_id in remaining], on_done)
 
 
 def sentiment_analysis(state: State):
     emails = state.get("emails", [])
     if emails and isinstance(emails, list):
+        # Each email goes out to streaming callers as soon as it has its sentiment (it already has its department)
+        emit = _email_writer()
+        pending = []
         for email_obj in emails:
-            email_body = email_obj.get("body", "")
-            email_subject = email_obj.get("subject", "")
+            if "sentiment_analysis" in email_obj:
+                emit(email_obj)
+            else:
+                pending.append(email_obj)
+        to_analyse = []
+        for email_obj in pending:
+            email_body = email_obj.get("body", "") or ""
+            email_subject = email_obj.get("subject", "") or ""
+            if not email_body.strip() and not email_subject.strip():
+                email_obj["sentiment_analysis"] = "Neutral"
+                email_obj["sentiment_source"] = "default"
+                emit(email_obj)
+            else:
+                to_analyse.append(email_obj)
+
+        # The local model answers the emails it is confident about; only the rest cost an LLM call
+        to_llm = to_analyse
+        local_version = None
+        if sentiment_model_service.registry is not None and to_analyse:
             try:
-                if not email_body.strip() and not email_subject.strip():
-                    email_obj["sentiment_analysis"] = "Neutral"
-                    continue
-
-                # Combine subject and body for sentiment analysis
-                prompt_text = f"Subject: {email_subject}\nBody: {email_body}"
-                response = llm.invoke([
-                    SystemMessage(content=sentiment_system_prompt),
-                    HumanMessage(content=prompt_text)
-                ])
-
-                if hasattr(response, 'content'):
-                    content = response.content
-                    if isinstance(content, str):
-                        sentiment = content.strip()
-                    elif isinstance(content, list):
-                        sentiment = " ".join(str(item) for item in content).strip()
+                predictions = sentiment_model_service.predict_sentiments(
+                    [email_text(e.get("subject", ""), e.get("body", "")) for e in to_analyse])
+            except Exception as e:
+                print(f"Error in local sentiment model: {e}")
+                predictions = []
+            if predictions:
+                local_version = predictions[0]["model_version"]
+                to_llm = []
+                for email_obj, prediction in zip(to_analyse, predictions):
+                    if prediction["confidence"] >= settings.SENTIMENT_LOCAL_THRESHOLD:
+                        email_obj["sentiment_analysis"] = prediction["sentiment"]
+                        email_obj["sentiment_source"] = "local"
+                        emit(email_obj)
                     else:
-                        sentiment = str(content).strip()
-                else:
-                    sentiment = str(response).strip()
-                email_obj["sentiment_analysis"] = sentiment
+                        to_llm.append(email_obj)
+
+        for email_obj in to_llm:
+            email_obj["sentiment_source"] = "llm"
+        if settings.SENTIMENT_MODE == "packed":
+            _analyse_packed(to_llm, emit)
+        else:
+            _analyse_single(to_llm, emit)
+        if pending and state.get("orgId"):
+            try:
+                save_sentiments(int(state["orgId"]), pending, sentiment_prompt_version(), local_version)
             except Exception as e:
-                email_obj["sentiment_analysis"] = {"error": str(e)}
-    else:
+                print(f"Error storing sentiments: {e}")
+    elif state.get("error"):
         state["emails"] = [{"sentiment_analysis": {"error": "No email body available for sentiment analysis."}}]
+    else:
+        state["emails"] = []
+    return state
+
+
+# Per-email fan-out: each email runs its own subgraph, department and sentiment side by side
+def route_emails(state: State):
+    emails = state.get("emails")
+    # Packed sentiment needs the whole page in one place, so it keeps the page-wide chain (as do empty pages)
+    if not emails or not isinstance(emails, list) or settings.SENTIMENT_MODE == "packed":
+        return "custom_model_classification"
+    return [Send("analyse_email", {"email": email_obj, "index": i}) for i, email_obj in enumerate(emails)]
+
+
+def classify_department(state: EmailState):
+    # Stored predictions from the current model are not scored again
+    if "classification_report" in state["email"]:
+        return {}
+    try:
+        report = classify_emails_offloaded([state["email"].get("body", "")])[0]
+    except Exception as e:
+        report = {"error": str(e)}
+    return {"classification_report": report}
+
+
+async def aclassify_department(state: EmailState):
+    if "classification_report" in state["email"]:
+        return {}
+    try:
+        # Coalesced with other emails' calls into batches when the process pool is on
+        report = await classify_email_async(state["email"].get("body", ""))
+    except Exception as e:
+        report = {"error": str(e)}
+    return {"classification_report": report}
+
+
+def _sentiment_without_llm(email_obj: dict) -> Optional[dict]:
+    """Blank emails are Neutral; otherwise the local model's answer when it is confident enough."""
+    if not (email_obj.get("body", "") or "").strip() and not (email_obj.get("subject", "") or "").strip():
+        return {"sentiment_analysis": "Neutral", "sentiment_source": "default"}
+    try:
+        predictions = sentiment_model_service.predict_sentiments(
+            [email_text(email_obj.get("subject", ""), email_obj.get("body", ""))])
+    except Exception as e:
+        print(f"Error in local sentiment model: {e}")
+        predictions = []
+    if predictions and predictions[0]["confidence"] >= settings.SENTIMENT_LOCAL_THRESHOLD:
+        return {"sentiment_analysis": predictions[0]["sentiment"], "sentiment_source": "local",
+                "local_version": predictions[0]["model_version"]}
+    return None
+
+
+def email_sentiment(state: EmailState):
+    if "sentiment_analysis" in state["email"]:
+        return {}
+    sentiment = _sentiment_without_llm(state["email"])
+    if sentiment is None:
+        try:
+            answer = _response_text(llm.invoke(_sentiment_prompt(state["email"])))
+        except Exception as e:
+            answer = {"error": str(e)}
+        sentiment = {"sentiment_analysis": answer, "sentiment_source": "llm"}
+    return {"sentiment": sentiment}
+
+
+async def aemail_sentiment(state: EmailState):
+    if "sentiment_analysis" in state["email"]:
+        return {}
+    # The local model's predict is CPU work: off the event loop, like the classifier
+    sentiment = await asyncio.to_thread(_sentiment_without_llm, state["email"])
+    if sentiment is None:
+        try:
+            answer = _response_text(await llm.ainvoke(_sentiment_prompt(state["email"])))
+        except Exception as e:
+            answer = {"error": str(e)}
+        sentiment = {"sentiment_analysis": answer, "sentiment_source": "llm"}
+    return {"sentiment": sentiment}
+
+
+def finish_email(state: EmailState):
+    email_obj = dict(state["email"])
+    if "classification_report" in state:
+        email_obj["classification_report"] = state["classification_report"]
+    sentiment = state.get("sentiment") or {}
+    email_obj.update((key, value) for key, value in sentiment.items() if key != "local_version")
+    _email_writer()(email_obj)
+    # Which results are new decides what store_results writes back
+    return {"analysed": [{"index": state["index"], "email": email_obj,
+                          "classified": "classification_report" in state, "sentiment": sentiment}]}
+
+
+def store_results(state: GraphState):
+    analysed = sorted(state.get("analysed") or [], key=lambda entry: entry["index"])
+    emails = [entry["email"] for entry in analysed]
+    org_id = state.get("orgId")
+    if org_id:
+        try:
+            save_classifications(int(org_id), [entry["email"] for entry in analysed if entry["classified"]])
+        except Exception as e:
+            print(f"Error storing classifications: {e}")
+        analysed_sentiments = [entry for entry in analysed if entry["sentiment"]]
+        local_version = next((entry["sentiment"]["local_version"] for entry in analysed_sentiments
+                              if "local_version" in entry["sentiment"]), None)
+        try:
+            save_sentiments(int(org_id), [entry["email"] for entry in analysed_sentiments],
+                            sentiment_prompt_version(), local_version)
+        except Exception as e:
+            print(f"Error storing sentiments: {e}")
+    return {"emails": emails}
+
+
+def _has_error(email_obj: dict) -> bool:
+    return any(isinstance(email_obj.get(key), dict) and "error" in email_obj[key]
+               for key in ("classification_report", "sentiment_analysis"))
+
+
+def _capped_sync(state: State) -> dict:
+    """
+    The sync position to store: errors are not stored, so the mark stops just below the first email
+    with a failed classification or sentiment and the next incremental run picks it up again.
+    """
+    sync = dict(state["sync"])
+    failed = [email_obj["uid"] for email_obj in state.get("emails") or []
+              if isinstance(email_obj.get("uid"), int) and _has_error(email_obj)]
+    if failed:
+        sync["last_uid"] = min(sync["last_uid"], min(failed) - 1)
+    return sync
+
+
+def update_sync_state(state: State):
+    # The high-water mark only moves once the page has been through every step
+    org_id = state.get("orgId")
+    if state.get("sync") and org_id and not state.get("error"):
+        state["sync"] = _capped_sync(state)
+        save_mailbox_state(int(org_id), state["sync"]["uidvalidity"], state["sync"]["last_uid"])
+    return state
+
+
+async def aupdate_sync_state(state: State):
+    org_id = state.get("orgId")
+    if state.get("sync") and org_id and not state.get("error"):
+        state["sync"] = _capped_sync(state)
+        await save_mailbox_state_async(int(org_id), state["sync"]["uidvalidity"], state["sync"]["last_uid"])
     return state
 
 
 # 3. Build graph
-workflow = StateGraph(State)
+email_workflow = StateGraph(EmailState, output_schema=EmailResult)
+
+email_workflow.add_node("classify_department", RunnableLambda(classify_department, afunc=aclassify_department))
+email_workflow.add_node("email_sentiment", RunnableLambda(email_sentiment, afunc=aemail_sentiment))
+email_workflow.add_node("finish_email", finish_email)
+
+# Both branches start together; finish_email waits for the two of them
+email_workflow.add_edge(START, "classify_department")
+email_workflow.add_edge(START, "email_sentiment")
+email_workflow.add_edge(["classify_department", "email_sentiment"], "finish_email")
+email_workflow.add_edge("finish_email", END)
+
+workflow = StateGraph(GraphState, input_schema=State, output_schema=State)
 
-workflow.add_node("fetch_emails", fetch_emails)
+# graph.invoke runs the sync variants (scripts), graph.ainvoke / astream the async ones (request handlers);
+# under ainvoke, nodes with no async variant run in a worker thread
+workflow.add_node("fetch_emails", RunnableLambda(fetch_emails, afunc=afetch_emails))
+workflow.add_node("analyse_email", email_workflow.compile())
+workflow.add_node("store_results", store_results)
 workflow.add_node("custom_model_classification", custom_model_classification)
 workflow.add_node("sentiment_analysis", sentiment_analysis)
+workflow.add_node("update_sync_state", RunnableLambda(update_sync_state, afunc=aupdate_sync_state))
 
 workflow.set_entry_point("fetch_emails")
-workflow.add_edge("fetch_emails", "custom_model_classification")
+workflow.add_conditional_edges("fetch_emails", route_emails, ["analyse_email", "custom_model_classification"])
+workflow.add_edge("analyse_email", "store_results")
+workflow.add_edge("store_results", "update_sync_state")
 workflow.add_edge("custom_model_classification", "sentiment_analysis")
-workflow.add_edge("sentiment_analysis", END)
+workflow.add_edge("sentiment_analysis", "update_sync_state")
+workflow.add_edge("update_sync_state", END)
 
-# 4. Compile
-graph = workflow.compile()
+# 4. Compile; at most EMAIL_GRAPH_CONCURRENCY emails are in their subgraphs at once
+graph = workflow.compile().with_config(max_concurrency=settings.EMAIL_GRAPH_CONCURRENCY)
 
 
 # if __name__ == "__main__":
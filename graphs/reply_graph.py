@@ -1,16 +1,15 @@
-from typing import Optional, TypedDict, Any
+from typing import AsyncIterator, Optional, TypedDict, Any
 from langgraph.graph import StateGraph, END
-from langchain.chat_models import init_chat_model
 from langchain_core.tools import tool
 from langchain.agents import create_openai_functions_agent, AgentExecutor
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableLambda
 from dotenv import load_dotenv
 import os
-from services.generate_email_from_db import generate_select_query
-from services.rag_retrieval import retrieve_from_pgvector
-from core import settings
+from services.generate_email_from_db import generate_select_query, generate_select_query_async
+from services.rag_retrieval import retrieve_from_pgvector, retrieve_from_pgvector_async
+from services.llm_gateway import get_chat_model
 from langchain_core.tools import tool
-from langchain.chat_models import init_chat_model
 import re
 load_dotenv()
 
@@ -28,11 +27,7 @@ class State(TypedDict, total=False):
     
 # 3. Create LLM
 
-llm = init_chat_model(
-    model="gpt-4o-mini",
-    temperature=0,
-    api_key=settings.OPENAI_API_KEY
-)   
+llm = get_chat_model("reply_graph")   
 
 # 2. Define some tools
 @tool
@@ -46,7 +41,10 @@ def organization_rag_fetcher(query: str , collection_name: str = "hr_documents")
     Usage:
     - If tool_instructions is 'rag' and a collection_name is provided, this tool will be invoked to fetch relevant documents and generate a context-aware answer using the specified collection.
     """
-    result = retrieve_from_pgvector(query, collection_name, k=3)
+    return _rag_tool_output(query, retrieve_from_pgvector(query, collection_name, k=3))
+
+
+def _rag_tool_output(query: str, result: dict) -> dict:
     # Format output for the tool
     source_docs = []
     for doc in result["results"]:
@@ -89,6 +87,25 @@ def generic_email_generator(email_text: str) -> str:
     return response.content if isinstance(response.content, str) else str(response.content)
 
 
+async def _aorganization_rag_fetcher(query: str, collection_name: str = "hr_documents") -> dict:
+    return _rag_tool_output(query, await retrieve_from_pgvector_async(query, collection_name, k=3))
+
+async def _adb_query_generator(input: str) -> Any:
+    return await generate_select_query_async(input)
+
+async def _ageneric_email_generator(email_text: str) -> str:
+    prompt = ChatPromptTemplate.from_messages([
+        ("human", f"Email received:\n\n{email_text}\n\nWrite a relevant reply:")
+    ])
+    response = await (prompt | llm).ainvoke({})
+    return response.content if isinstance(response.content, str) else str(response.content)
+
+# The agent's ainvoke (graph.ainvoke / astream) awaits these; invoke still runs the functions above
+organization_rag_fetcher.coroutine = _aorganization_rag_fetcher
+db_query_generator.coroutine = _adb_query_generator
+generic_email_generator.coroutine = _ageneric_email_generator
+
+
 tools = [organization_rag_fetcher, db_query_generator, generic_email_generator]
 
 # 4. Create a default prompt for the agent (must include agent_scratchpad)
@@ -141,20 +158,39 @@ def tool_execution(state: State):
     state["tool_outputs"] = response.get("output")
     return state
 
+async def atool_execution(state: State):
+    response = await agent_executor.ainvoke({
+        "input": state.get("input"),
+        "collection_name": state.get("collection_name")
+    })
+    state["tool_outputs"] = response.get("output")
+    return state
+
+
+def _format_prompt(tool_outputs) -> str:
+    return (
+        "Format the following content as a professional, polite, and context-aware email reply. "
+        "Ensure proper greeting, body, and closing.\n\nContent to format:\n" + str(tool_outputs)
+    )
+
+def _response_text(response) -> str:
+    if hasattr(response, "content"):
+        return response.content if isinstance(response.content, str) else str(response.content)
+    return str(response)
 
 def final_response(state: State):
     tool_outputs = state.get("tool_outputs")
     # Use LLM to format the final response as a professional email
     if tool_outputs:
-        format_prompt = (
-            "Format the following content as a professional, polite, and context-aware email reply. "
-            "Ensure proper greeting, body, and closing.\n\nContent to format:\n" + str(tool_outputs)
-        )
-        response = llm.invoke(format_prompt)
-        if hasattr(response, "content"):
-            state["final_response"] = response.content if isinstance(response.content, str) else str(response.content)
-        else:
-            state["final_response"] = str(response)
+        state["final_response"] = _response_text(llm.invoke(_format_prompt(tool_outputs)))
+    else:
+        state["final_response"] = "No reply could be generated."
+    return state
+
+async def afinal_response(state: State):
+    tool_outputs = state.get("tool_outputs")
+    if tool_outputs:
+        state["final_response"] = _response_text(await llm.ainvoke(_format_prompt(tool_outputs)))
     else:
         state["final_response"] = "No reply could be generated."
     return state
@@ -164,8 +200,10 @@ def final_response(state: State):
 workflow = StateGraph(State)
 
 workflow.add_node("prepare_input", prepare_input)
-workflow.add_node("tool_execution", tool_execution)
-workflow.add_node("final_response", final_response)
+# Sync and async variants: graph.invoke runs the former, graph.astream the latter, so a
+# cancelled stream cancels the model request instead of leaving it running in a thread
+workflow.add_node("tool_execution", RunnableLambda(tool_execution, afunc=atool_execution))
+workflow.add_node("final_response", RunnableLambda(final_response, afunc=afinal_response))
 
 workflow.set_entry_point("prepare_input")
 workflow.add_edge("prepare_input", "tool_execution")
@@ -174,3 +212,23 @@ workflow.add_edge("final_response", END)
 
 # 8. Compile graph
 graph = workflow.compile()
+
+
+async def astream_reply(state: State) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Run the graph, yielding ("step", {"node"}) as each node finishes, ("token", {"text"}) for
+    each chunk of the final_response node's reply and ("done", {"final_response"}) at the end.
+    """
+    final = ""
+    async for mode, payload in graph.astream(state, stream_mode=["updates", "messages"]):
+        if mode == "updates":
+            for node, update in payload.items():
+                yield "step", {"node": node}
+                if node == "final_response":
+                    final = (update or {}).get("final_response") or final
+            continue
+        message, metadata = payload
+        # Only the reply itself: the agent's and the tools' own LLM calls stream through here too
+        if metadata.get("langgraph_node") == "final_response" and message.content:
+            yield "token", {"text": _response_text(message)}
+    yield "done", {"final_response": final}
@@ -1,7 +1,8 @@
 from fastapi import FastAPI, Depends
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from contextlib import asynccontextmanager
-from core.database import init_db
+from core.database import async_engine, init_db
+from core import settings
 from api import desc
 from api.v1 import classify_email_api
 import secrets
@@ -14,6 +15,14 @@ from api.v1.reply_graph_api import router as reply_graph_router
 from api.v1.rag_retrieval_api import router as rag_router
 from api.v1.email_replyer_api import router as generic_email_replyer_router
 from api.v1.retreive_data_db import router as db_query_router
+from api.v1.admin_api import router as admin_router
+import services.classify_email as classify_email_service
+import services.sentiment_model as sentiment_model_service
+from services.classification_executor import start_executor, shutdown_executor
+from services.imap_pool import imap_pool
+from services.email_body import shutdown_pool as shutdown_body_pool
+from services import llm_gateway
+import asyncio
 from dotenv import load_dotenv
 load_dotenv()
 from langsmith import Client
@@ -33,7 +42,33 @@ def basic_auth(credentials: HTTPBasicCredentials = Depends(security)):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
-    yield 
+    # Warm up the classifier before the first request instead of on it
+    try:
+        await asyncio.to_thread(classify_email_service.load_model)
+    except Exception as e:
+        print(f"Error loading model: {e}")
+    if sentiment_model_service.registry is not None:
+        try:
+            await asyncio.to_thread(sentiment_model_service.registry.load)
+        except Exception as e:
+            print(f"Error loading sentiment model: {e}")
+    await asyncio.to_thread(start_executor)
+    watchers = []
+    if settings.MODEL_WATCH_INTERVAL > 0:
+        watchers.append(asyncio.create_task(classify_email_service.registry.watch(settings.MODEL_WATCH_INTERVAL)))
+        if sentiment_model_service.registry is not None:
+            watchers.append(asyncio.create_task(sentiment_model_service.registry.watch(settings.MODEL_WATCH_INTERVAL)))
+    # Log out of org mailboxes nobody has polled for a while
+    imap_reaper = asyncio.create_task(imap_pool.evict_periodically(max(settings.IMAP_POOL_IDLE_TIMEOUT / 2, 1.0)))
+    yield
+    for watcher in watchers:
+        watcher.cancel()
+    imap_reaper.cancel()
+    await asyncio.to_thread(imap_pool.close_all)
+    shutdown_executor()
+    shutdown_body_pool()
+    await llm_gateway.close()
+    await async_engine.dispose()
 
 app = FastAPI(title="Email Classification API", lifespan=lifespan, docs_url=None, redoc_url=None)
 
@@ -47,6 +82,7 @@ app.include_router(reply_graph_router, dependencies=[Depends(basic_auth)])
 app.include_router(rag_router, dependencies=[Depends(basic_auth)])
 app.include_router(generic_email_replyer_router, dependencies=[Depends(basic_auth)])
 app.include_router(db_query_router, dependencies=[Depends(basic_auth)])
+app.include_router(admin_router, dependencies=[Depends(basic_auth)])
 
 
 # Update the Swagger UI documentation endpoint with basic authentication
@@ -1 +1 @@
-from .schema import Org
+from .schema import Org, OrgMailboxState, EmailRecord
\ No newline at end of file
@@ -1,7 +1,8 @@
-from typing import  Literal,Dict, Optional
+from typing import  Literal,Dict, List, Optional
 from fastapi import UploadFile
 from sqlmodel import SQLModel, Field
 from pydantic import BaseModel, EmailStr
+from core import settings
 
 # Request schema (no id, required for create)
 class OrgCreate(SQLModel):
@@ -27,6 +28,15 @@ class EmailClassificationResponse(BaseModel):
     predicted_department: str
     confidence: float
     all_probabilities: Dict[str, float]
+    model_version: str
+
+# Batch of emails to classify in one call, at most CLASSIFY_MAX_BATCH of them
+class EmailBatchClassificationRequest(BaseModel):
+    email_contents: List[str] = Field(..., min_length=1, max_length=settings.CLASSIFY_MAX_BATCH)
+
+# Response for a batch, results are in the same order as the request
+class EmailBatchClassificationResponse(BaseModel):
+    results: List[EmailClassificationResponse]
     
     
 # Store PDF file
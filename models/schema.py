@@ -1,5 +1,7 @@
+from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional
+from sqlalchemy import JSON, Column
 from sqlmodel import SQLModel, Field
 from pydantic import EmailStr
 
@@ -14,4 +16,30 @@ class Org(SQLModel, table=True):
     userId: int = Field(index=True)
     email: EmailStr
     password: str
-    provider: ProviderEnum
\ No newline at end of file
+    provider: ProviderEnum
+
+class OrgMailboxState(SQLModel, table=True):
+    """Sync position of an org's INBOX: mail up to last_uid is processed, valid while UIDVALIDITY holds."""
+    org_id: int = Field(primary_key=True, foreign_key="org.id")
+    uidvalidity: int
+    last_uid: int = 0
+
+
+class EmailRecord(SQLModel, table=True):
+    """A fetched email and its results, so graph re-runs skip what was already fetched or scored."""
+    org_id: int = Field(primary_key=True, foreign_key="org.id")
+    uidvalidity: int = Field(primary_key=True)
+    uid: int = Field(primary_key=True)
+    subject: Optional[str] = None
+    sender: Optional[str] = None
+    date: Optional[str] = None
+    body: str = ""
+    attachments: list = Field(default_factory=list, sa_column=Column(JSON))
+    fetched_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Results are only reused while the model/prompt that produced them is still current
+    classification: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    model_version: Optional[str] = None
+    sentiment: Optional[str] = None
+    # "llm" (prompt_version is the prompt's) or "local" (prompt_version is the sentiment model's)
+    sentiment_source: Optional[str] = None
+    prompt_version: Optional[str] = None
@@ -1,5 +1,118 @@
+"""
+Training CLI for the department classifier.
+
+    uv run python scikit-learn/main.py train pkl_files/email_dataset_long.csv --out pkl_files/email_dataset_stream.pkl
+    uv run python scikit-learn/main.py update pkl_files/email_dataset_stream.pkl new_labelled_mail.jsonl
+    uv run python scikit-learn/main.py select pkl_files/email_dataset_long.csv --out pkl_files/email_dataset_selected.pkl --max-latency-ms 1
+
+Local sentiment classifier, distilled from the LLM sentiments stored by the graph:
+
+    uv run python scikit-learn/main.py sentiment-export --out sentiment_labels.csv
+    uv run python scikit-learn/main.py sentiment-eval sentiment_labels.csv
+    uv run python scikit-learn/main.py train sentiment_labels.csv --label-column sentiment --stop-words none --epochs 5 --out pkl_files/sentiment_model.pkl
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Share services/ (preprocessing) with the API
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import model_selection
+import sentiment
+import streaming_train
+
+
 def main():
-    print("Hello from scikit-learn!")
+    parser = argparse.ArgumentParser(description="Train the department classifier.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train = commands.add_parser("train", help="stream a CSV/JSONL corpus into a new artifact")
+    train.add_argument("data", help=".csv or .jsonl file of labelled emails")
+    train.add_argument("--out", required=True, help="artifact path (.pkl)")
+    train.add_argument("--epochs", type=int, default=1)
+    train.add_argument("--n-features", type=int, default=2 ** 20)
+    train.add_argument("--ngram-max", type=int, default=2)
+    train.add_argument("--alpha", type=float, default=1e-5)
+    train.add_argument("--stop-words", choices=["english", "none"], default="english",
+                       help="'none' keeps words like 'not' (use it for sentiment)")
+
+    update = commands.add_parser("update", help="continue training an artifact on newly labelled mail")
+    update.add_argument("artifact", help="artifact produced by 'train'")
+    update.add_argument("data", help=".csv or .jsonl file of labelled emails")
+    update.add_argument("--out", help="write here instead of overwriting the artifact")
+
+    select = commands.add_parser("select", help="cross-validate candidate pipelines and export a Pareto-optimal one")
+    select.add_argument("data", help=".csv file of labelled emails")
+    select.add_argument("--out", required=True, help="artifact path (.pkl) for the chosen candidate")
+    select.add_argument("--report", help="write every candidate's metrics and the Pareto front here (JSON)")
+    select.add_argument("--folds", type=int, default=5)
+    select.add_argument("--n-jobs", type=int, default=-1, help="parallel jobs for folds x candidates (-1 = all cores)")
+    select.add_argument("--batch-size", type=int, default=256, help="batch used for the per-email batch latency")
+    select.add_argument("--classifiers", nargs="+", choices=list(model_selection.CLASSIFIERS))
+    select.add_argument("--max-latency-ms", type=float, help="single-email latency budget for the chosen candidate")
+    select.add_argument("--min-accuracy", type=float)
+
+    sentiment_export = commands.add_parser("sentiment-export", help="dump stored LLM sentiments as training data")
+    sentiment_export.add_argument("--out", required=True, help=".csv file to write")
+    sentiment_export.add_argument("--prompt-version", help="only sentiments produced with this prompt version")
+
+    sentiment_eval = commands.add_parser("sentiment-eval",
+                                         help="LLM call rate and agreement with LLM labels per confidence threshold")
+    sentiment_eval.add_argument("data", help=".csv file from sentiment-export")
+    sentiment_eval.add_argument("--thresholds", type=float, nargs="+", default=sentiment.THRESHOLDS)
+    sentiment_eval.add_argument("--folds", type=int, default=5)
+    sentiment_eval.add_argument("--epochs", type=int, default=5)
+    sentiment_eval.add_argument("--text-column", default="email_text")
+    sentiment_eval.add_argument("--label-column", default="sentiment")
+
+    for command in (train, update, select):
+        command.add_argument("--text-column", default="email_text")
+        command.add_argument("--label-column", default="department")
+    for command in (train, update):
+        command.add_argument("--chunk-size", type=int, default=10000)
+
+    args = parser.parse_args()
+    if args.command == "sentiment-export":
+        print(f"Wrote {sentiment.export_labels(args.out, args.prompt_version)} labelled emails to {args.out}")
+        return
+    if args.command == "sentiment-eval":
+        report = sentiment.evaluate(args.data, args.text_column, args.label_column, args.thresholds,
+                                    args.folds, args.epochs)
+        print(f"{report['emails']} emails {report['labels']}, {report['folds']}-fold out-of-fold predictions")
+        print(f"{'threshold':>9} {'LLM calls':>9} {'local agreement':>15} {'overall agreement':>17}")
+        for r in report["thresholds"]:
+            local = f"{r['local_agreement']:.4f}" if r["local_agreement"] is not None else "-"
+            print(f"{r['threshold']:>9.2f} {r['llm_call_rate']:>9.1%} {local:>15} {r['overall_agreement']:>17.4f}")
+        return
+    if args.command == "select":
+        report = model_selection.run(
+            args.data, args.out, args.text_column, args.label_column, args.folds, args.n_jobs,
+            args.batch_size, args.classifiers, args.max_latency_ms, args.min_accuracy,
+        )
+        print(f"{'candidate':<48} {'accuracy':>8} {'1 email ms':>10} {'batch ms':>9} {'size KB':>9} {'load KB':>9}")
+        for name in report["pareto_front"]:
+            r = report["candidates"][name]
+            marker = "*" if name == report["chosen"] else " "
+            print(f"{marker}{name:<47} {r['accuracy']:>8.4f} {r['single_latency_ms']:>10.3f} "
+                  f"{r['batch_latency_ms']:>9.4f} {r['artifact_bytes'] / 1024:>9.1f} {r['load_memory_bytes'] / 1024:>9.1f}")
+        print(f"Exported {report['chosen']} to {args.out}")
+        if args.report:
+            with open(args.report, "w") as f:
+                json.dump(report, f, indent=2)
+        return
+    if args.command == "train":
+        metrics = streaming_train.train(
+            args.data, args.out, args.text_column, args.label_column, args.chunk_size,
+            args.epochs, args.n_features, args.ngram_max, args.alpha,
+            None if args.stop_words == "none" else args.stop_words,
+        )
+    else:
+        metrics = streaming_train.update(
+            args.artifact, args.data, args.out, args.text_column, args.label_column, args.chunk_size,
+        )
+    print(json.dumps(metrics, indent=2))
 
 
 if __name__ == "__main__":
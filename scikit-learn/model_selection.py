@@ -0,0 +1,153 @@
+"""
+Latency/accuracy model selection for the department classifier.
+
+Trains a grid of candidate pipelines (vectorizer n-gram range, max_features,
+classifier type) on a labelled CSV, cross-validating folds and candidates in
+parallel across cores. For each candidate it records accuracy, single-email
+and batch latency, artifact size and load memory, reports the Pareto front
+and exports the chosen candidate in the {'pipeline', 'label_encoder'} format
+services/classify_email.load_model consumes.
+"""
+import itertools
+import pickle
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.model_selection import StratifiedKFold
+from sklearn.naive_bayes import ComplementNB, MultinomialNB
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder
+
+from services.text_normalizer import normalize_texts
+from streaming_train import save_artifact
+
+CLASSIFIERS = {
+    "naive_bayes": lambda: MultinomialNB(),
+    "complement_nb": lambda: ComplementNB(),
+    "logistic_regression": lambda: LogisticRegression(max_iter=1000),
+    "sgd_log_loss": lambda: SGDClassifier(loss="log_loss", alpha=1e-5, random_state=42),
+}
+NGRAM_RANGES = [(1, 1), (1, 2), (1, 3)]
+MAX_FEATURES = [None, 20000, 5000]
+# Objectives: accuracy is maximized, the rest minimized
+COSTS = ("single_latency_ms", "batch_latency_ms", "artifact_bytes", "load_memory_bytes")
+
+
+def build_candidates(classifiers=None) -> dict[str, Pipeline]:
+    candidates = {}
+    for (clf_name, make_clf), ngram_range, max_features in itertools.product(
+        CLASSIFIERS.items() if classifiers is None else [(c, CLASSIFIERS[c]) for c in classifiers],
+        NGRAM_RANGES,
+        MAX_FEATURES,
+    ):
+        name = f"{clf_name}-ngram{ngram_range[0]}{ngram_range[1]}-features{max_features or 'all'}"
+        candidates[name] = Pipeline([
+            ("tfidf", TfidfVectorizer(ngram_range=ngram_range, max_features=max_features, stop_words="english")),
+            ("classifier", make_clf()),
+        ])
+    return candidates
+
+
+def _fold_accuracy(pipeline: Pipeline, texts: np.ndarray, y: np.ndarray, train_idx, test_idx) -> float:
+    model = clone(pipeline).fit(texts[train_idx], y[train_idx])
+    return float((model.predict(texts[test_idx]) == y[test_idx]).mean())
+
+
+def _fit(pipeline: Pipeline, texts: np.ndarray, y: np.ndarray) -> Pipeline:
+    model = clone(pipeline).fit(texts, y)
+    # Terms dropped by max_features are kept only for introspection; they'd dominate the pickle
+    model.named_steps["tfidf"].stop_words_ = None
+    return model
+
+
+def _latency_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def _measure(model: Pipeline, label_encoder: LabelEncoder, texts: np.ndarray, batch_size: int) -> dict:
+    single = texts[:1].tolist()
+    batch = np.resize(texts, batch_size).tolist()
+    raw = pickle.dumps({"pipeline": model, "label_encoder": label_encoder})
+    tracemalloc.start()
+    pickle.loads(raw)
+    load_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "single_latency_ms": _latency_ms(lambda: model.predict_proba(single), repeat=200),
+        # Per email, inside a batch
+        "batch_latency_ms": _latency_ms(lambda: model.predict_proba(batch), repeat=10) / batch_size,
+        "artifact_bytes": len(raw),
+        "load_memory_bytes": load_memory,
+    }
+
+
+def pareto_front(results: dict[str, dict]) -> list[str]:
+    def dominates(a: dict, b: dict) -> bool:
+        no_worse = a["accuracy"] >= b["accuracy"] and all(a[c] <= b[c] for c in COSTS)
+        better = a["accuracy"] > b["accuracy"] or any(a[c] < b[c] for c in COSTS)
+        return no_worse and better
+
+    return sorted(
+        (name for name, r in results.items()
+         if not any(dominates(other, r) for other_name, other in results.items() if other_name != name)),
+        key=lambda name: (-results[name]["accuracy"], results[name]["single_latency_ms"]),
+    )
+
+
+def choose(results: dict[str, dict], front: list[str], max_latency_ms: float | None, min_accuracy: float | None) -> str:
+    """Most accurate front member within the latency budget; among near-ties, the fastest."""
+    eligible = [
+        name for name in front
+        if (max_latency_ms is None or results[name]["single_latency_ms"] <= max_latency_ms)
+        and (min_accuracy is None or results[name]["accuracy"] >= min_accuracy)
+    ]
+    if not eligible:
+        raise ValueError("No candidate on the Pareto front meets the latency/accuracy constraints.")
+    best_accuracy = max(results[name]["accuracy"] for name in eligible)
+    tied = [name for name in eligible if results[name]["accuracy"] >= best_accuracy - 0.005]
+    return min(tied, key=lambda name: results[name]["single_latency_ms"])
+
+
+def run(path: str, out: str, text_column: str = "email_text", label_column: str = "department",
+        folds: int = 5, n_jobs: int = -1, batch_size: int = 256, classifiers=None,
+        max_latency_ms: float | None = None, min_accuracy: float | None = None) -> dict:
+    data = pd.read_csv(path, usecols=[text_column, label_column], dtype=str, keep_default_na=False)
+    texts = np.array(normalize_texts(data[text_column].tolist()), dtype=object)
+    label_encoder = LabelEncoder().fit(data[label_column])
+    y = label_encoder.transform(data[label_column])
+    candidates = build_candidates(classifiers)
+    names = list(candidates)
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=42).split(texts, y))
+
+    # Every (candidate, fold) pair is an independent job
+    scores = Parallel(n_jobs=n_jobs)(
+        delayed(_fold_accuracy)(candidates[name], texts, y, train_idx, test_idx)
+        for name in names for train_idx, test_idx in splits
+    )
+    fitted = Parallel(n_jobs=n_jobs)(delayed(_fit)(candidates[name], texts, y) for name in names)
+
+    results = {}
+    for i, name in enumerate(names):
+        fold_scores = scores[i * folds:(i + 1) * folds]
+        # Latency is measured here, one candidate at a time, so parallel jobs don't skew it
+        results[name] = {
+            "accuracy": statistics.mean(fold_scores),
+            "accuracy_std": statistics.pstdev(fold_scores),
+            **_measure(fitted[i], label_encoder, texts, batch_size),
+        }
+    front = pareto_front(results)
+    chosen = choose(results, front, max_latency_ms, min_accuracy)
+    save_artifact(out, fitted[names.index(chosen)], label_encoder, {chosen: results[chosen]})
+    return {"chosen": chosen, "pareto_front": front, "candidates": results}
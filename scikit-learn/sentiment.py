@@ -0,0 +1,94 @@
+"""
+Training data and offline evaluation for the local sentiment classifier.
+
+Labels come from the LLM: export_labels dumps the sentiments the graph stored
+for LLM-answered emails, with the exact text the local model will see. The
+model itself is trained by streaming_train (main.py train --label-column
+sentiment --stop-words none; negations matter for sentiment), so it has the
+artifact format services/sentiment_model.py serves.
+
+evaluate cross-validates that same pipeline and, for each confidence threshold,
+reports how many emails would still go to the LLM and how often the answers
+agree with the LLM labels.
+"""
+import csv
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import LabelEncoder
+from sqlmodel import Session, select
+
+from services.sentiment_packing import SENTIMENTS, email_text
+from services.text_normalizer import normalize_texts
+from streaming_train import build_pipeline
+
+THRESHOLDS = [0.0, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99]
+
+
+def export_labels(out: str, prompt_version: str | None = None) -> int:
+    """Write (email_text, sentiment) rows for every stored LLM sentiment; returns the row count."""
+    from core.database import engine
+    from models.schema import EmailRecord
+
+    statement = select(EmailRecord).where(
+        EmailRecord.sentiment.in_(SENTIMENTS),
+        (EmailRecord.sentiment_source == "llm") | (EmailRecord.sentiment_source.is_(None)),
+    )
+    if prompt_version:
+        statement = statement.where(EmailRecord.prompt_version == prompt_version)
+    rows = 0
+    with Session(engine) as session, open(out, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["email_text", "sentiment"])
+        for record in session.exec(statement.execution_options(yield_per=1000)):
+            writer.writerow([email_text(record.subject, record.body), record.sentiment])
+            rows += 1
+    return rows
+
+
+def _out_of_fold_proba(texts: list[str], y: np.ndarray, n_classes: int, folds: int, epochs: int,
+                       n_features: int, ngram_max: int, alpha: float) -> np.ndarray:
+    proba = np.zeros((len(texts), n_classes))
+    classes = np.arange(n_classes)
+    for train_idx, test_idx in StratifiedKFold(folds, shuffle=True, random_state=42).split(texts, y):
+        pipeline = build_pipeline(n_features, ngram_max, alpha, stop_words=None)
+        vectorizer, classifier = pipeline.named_steps["hashing"], pipeline.steps[-1][1]
+        X = vectorizer.transform(texts)
+        # Same partial_fit passes as a streaming 'train' run
+        for _ in range(epochs):
+            classifier.partial_fit(X[train_idx], y[train_idx], classes=classes)
+        proba[test_idx] = pipeline.predict_proba([texts[i] for i in test_idx])
+    return proba
+
+
+def evaluate(path: str, text_column: str = "email_text", label_column: str = "sentiment",
+             thresholds: list[float] | None = None, folds: int = 5, epochs: int = 5,
+             n_features: int = 2 ** 20, ngram_max: int = 2, alpha: float = 1e-5) -> dict:
+    df = pd.read_csv(path, usecols=[text_column, label_column], dtype=str, keep_default_na=False)
+    df = df[df[label_column].str.strip() != ""]
+    texts = normalize_texts(df[text_column].tolist())
+    label_encoder = LabelEncoder().fit(df[label_column].str.strip())
+    y = label_encoder.transform(df[label_column].str.strip())
+
+    proba = _out_of_fold_proba(texts, y, len(label_encoder.classes_), folds, epochs, n_features, ngram_max, alpha)
+    confidence = proba.max(axis=1)
+    agrees = proba.argmax(axis=1) == y
+
+    results = []
+    for threshold in thresholds or THRESHOLDS:
+        local = confidence >= threshold
+        results.append({
+            "threshold": threshold,
+            "llm_call_rate": float(1 - local.mean()),
+            # Agreement of the local answers alone, and of the whole pipeline (LLM answers agree by definition)
+            "local_agreement": float(agrees[local].mean()) if local.any() else None,
+            "overall_agreement": float((agrees & local).sum() + (~local).sum()) / len(y),
+        })
+    return {
+        "emails": len(y),
+        "labels": {str(label): int((y == i).sum()) for i, label in enumerate(label_encoder.classes_)},
+        "folds": folds,
+        "epochs": epochs,
+        "thresholds": results,
+    }
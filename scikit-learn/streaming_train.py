@@ -0,0 +1,138 @@
+"""
+Out-of-core training of the department classifier.
+
+The labelled corpus is streamed from CSV or JSONL in chunks, normalized with
+the same preprocessing the API applies at inference time, hashed into a fixed
+feature space and fed to a linear model with partial_fit, so memory stays
+bounded by the chunk size no matter how large the corpus is.
+
+The artifact has the {'pipeline', 'label_encoder'} shape that
+services/classify_email.load_model expects, and can later be updated in place
+with newly labelled mail without retraining from scratch.
+"""
+import os
+import pickle
+import time
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder
+
+from services.text_normalizer import normalize_texts
+
+
+def iter_chunks(path: str, text_column: str, label_column: str, chunk_size: int) -> Iterator[tuple[list[str], list[str]]]:
+    """Yield (texts, labels) chunks from a .csv or .jsonl/.ndjson file without loading it whole."""
+    if path.endswith((".jsonl", ".ndjson")):
+        reader = pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False)
+    else:
+        reader = pd.read_csv(path, chunksize=chunk_size, usecols=[text_column, label_column],
+                             dtype=str, keep_default_na=False)
+    with reader:
+        for chunk in reader:
+            chunk = chunk[[text_column, label_column]].dropna()
+            labels = chunk[label_column].astype(str).str.strip()
+            keep = labels != ""
+            yield chunk[text_column][keep].astype(str).tolist(), labels[keep].tolist()
+
+
+def scan_labels(path: str, text_column: str, label_column: str, chunk_size: int) -> list[str]:
+    """First pass over the file: the set of labels, needed up front by partial_fit."""
+    labels = set()
+    for _, chunk_labels in iter_chunks(path, text_column, label_column, chunk_size):
+        labels.update(chunk_labels)
+    return sorted(labels)
+
+
+def build_pipeline(n_features: int, ngram_max: int, alpha: float, stop_words: str | None = "english") -> Pipeline:
+    return Pipeline([
+        ("hashing", HashingVectorizer(
+            n_features=n_features,
+            ngram_range=(1, ngram_max),
+            stop_words=stop_words,
+            alternate_sign=False,
+            norm="l2",
+        )),
+        ("classifier", SGDClassifier(loss="log_loss", alpha=alpha, random_state=42)),
+    ])
+
+
+def _fit_stream(pipeline: Pipeline, label_encoder: LabelEncoder, path: str, text_column: str,
+                label_column: str, chunk_size: int, epochs: int) -> dict:
+    """
+    Test-then-train over the stream: each chunk is scored before the model learns from it
+    (progressive validation), so accuracy is measured on unseen mail without a held-out copy.
+    """
+    vectorizer = pipeline.named_steps["hashing"]
+    classifier = pipeline.steps[-1][1]
+    classes = np.arange(len(label_encoder.classes_))
+    known = set(label_encoder.classes_)
+    seen = correct = evaluated = 0
+    for epoch in range(epochs):
+        for texts, labels in iter_chunks(path, text_column, label_column, chunk_size):
+            unknown = set(labels) - known
+            if unknown:
+                raise ValueError(f"Labels not in the model: {sorted(unknown)}. Retrain to add departments.")
+            X = vectorizer.transform(normalize_texts(texts))
+            y = label_encoder.transform(labels)
+            if epoch == 0 and hasattr(classifier, "classes_"):
+                correct += int((classifier.predict(X) == y).sum())
+                evaluated += len(y)
+            classifier.partial_fit(X, y, classes=classes)
+            seen += len(y)
+            print(f"epoch {epoch + 1}/{epochs}: {seen} emails")
+    return {
+        "emails_seen": seen,
+        "progressive_accuracy": correct / evaluated if evaluated else None,
+    }
+
+
+def save_artifact(path: str, pipeline: Pipeline, label_encoder: LabelEncoder, metrics: dict):
+    # Written to a temp file and renamed so a watching model registry never reads a partial pickle
+    model_data = {
+        "pipeline": pipeline,
+        "label_encoder": label_encoder,
+        "classes": list(label_encoder.classes_),
+        "performance_metrics": metrics,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(model_data, f)
+    os.replace(tmp_path, path)
+
+
+def train(path: str, out: str, text_column: str = "email_text", label_column: str = "department",
+          chunk_size: int = 10000, epochs: int = 1, n_features: int = 2 ** 20, ngram_max: int = 2,
+          alpha: float = 1e-5, stop_words: str | None = "english") -> dict:
+    label_encoder = LabelEncoder().fit(scan_labels(path, text_column, label_column, chunk_size))
+    pipeline = build_pipeline(n_features, ngram_max, alpha, stop_words)
+    start = time.perf_counter()
+    metrics = _fit_stream(pipeline, label_encoder, path, text_column, label_column, chunk_size, epochs)
+    metrics.update(trained_on=path, training_seconds=time.perf_counter() - start, updates=0)
+    save_artifact(out, pipeline, label_encoder, {"Streaming SGD": metrics})
+    return metrics
+
+
+def update(artifact: str, path: str, out: str | None = None, text_column: str = "email_text",
+           label_column: str = "department", chunk_size: int = 10000) -> dict:
+    """Continue training an existing streaming artifact on newly labelled mail."""
+    with open(artifact, "rb") as f:
+        model_data = pickle.load(f)
+    pipeline, label_encoder = model_data["pipeline"], model_data["label_encoder"]
+    if "hashing" not in pipeline.named_steps or not hasattr(pipeline.steps[-1][1], "partial_fit"):
+        raise ValueError("Only artifacts produced by 'train' (hashing + partial_fit model) can be updated.")
+    start = time.perf_counter()
+    metrics = _fit_stream(pipeline, label_encoder, path, text_column, label_column, chunk_size, epochs=1)
+    previous = model_data.get("performance_metrics", {}).get("Streaming SGD", {})
+    metrics.update(
+        trained_on=path,
+        training_seconds=time.perf_counter() - start,
+        emails_seen_total=previous.get("emails_seen_total", previous.get("emails_seen", 0)) + metrics["emails_seen"],
+        updates=previous.get("updates", 0) + 1,
+    )
+    save_artifact(out or artifact, pipeline, label_encoder, {"Streaming SGD": metrics})
+    return metrics
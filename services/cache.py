@@ -0,0 +1,198 @@
+import copy
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+def content_key(*parts: str) -> str:
+    """Stable cache key: sha256 over the parts, NUL separated."""
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class TTLCache:
+    """Bounded in-process cache with LRU eviction and a per-entry time to live."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    """
+    Cache tier stored in a SQLite file. Every process that opens the same path
+    (e.g. several uvicorn workers on one host) shares its entries.
+    Values are JSON; each entry carries a tag (such as a model version) so
+    stale generations can be dropped in one statement.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str, table: str, max_entries: int, ttl: float):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, tag TEXT, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connect().execute(
+            f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, tag: str = ""):
+        conn = self._connect()
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, tag, value, expires_at) VALUES (?, ?, ?, ?)",
+            (key, tag, json.dumps(value), time.time() + self.ttl),
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """Drop expired rows, then the oldest rows beyond max_entries."""
+        conn = self._connect()
+        conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (time.time(),))
+        conn.execute(
+            f"DELETE FROM {self.table} WHERE rowid IN ("
+            f"SELECT rowid FROM {self.table} ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self, keep_tag: Optional[str] = None):
+        conn = self._connect()
+        if keep_tag is None:
+            conn.execute(f"DELETE FROM {self.table}")
+        else:
+            conn.execute(f"DELETE FROM {self.table} WHERE tag IS NOT ?", (keep_tag,))
+
+
+class TieredCache:
+    """
+    In-memory TTLCache in front of an optional shared backend.
+    Counts local hits, shared hits and misses; values handed out are copies.
+    """
+
+    def __init__(self, local: TTLCache, shared: Optional[SQLiteCacheBackend] = None):
+        self.local = local
+        self.shared = shared
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.local.max_entries > 0 or self.shared is not None
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return copy.deepcopy(value)
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except sqlite3.Error as e:
+                print(f"Shared cache lookup failed: {e}")
+                value = None
+            if value is not None:
+                self.local.set(key, value)
+                with self._lock:
+                    self.shared_hits += 1
+                return copy.deepcopy(value)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any, tag: str = ""):
+        self.local.set(key, copy.deepcopy(value))
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, tag)
+            except sqlite3.Error as e:
+                print(f"Shared cache write failed: {e}")
+
+    def clear(self, keep_tag: Optional[str] = None):
+        """Empty the local tier and drop shared entries whose tag differs from keep_tag."""
+        self.local.clear()
+        if self.shared is not None:
+            try:
+                self.shared.clear(keep_tag)
+            except sqlite3.Error as e:
+                print(f"Shared cache clear failed: {e}")
+
+    def counters(self) -> tuple[int, int, int]:
+        with self._lock:
+            return self.hits, self.shared_hits, self.misses
+
+    def add_counters(self, hits: int, shared_hits: int, misses: int):
+        """Fold in lookups counted by another process's copy of this cache (the classifier workers)."""
+        with self._lock:
+            self.hits += hits
+            self.shared_hits += shared_hits
+            self.misses += misses
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+            "local_entries": len(self.local),
+            "shared_backend": self.shared.path if self.shared is not None else None,
+        }
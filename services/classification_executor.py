@@ -0,0 +1,183 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+from core import settings
+import services.classify_email as classify_email_service
+
+
+# Runs inside the worker processes
+def _init_worker():
+    # Each worker unpickles the pipeline once, at start-up
+    classify_email_service.load_model()
+
+def _ping():
+    return os.getpid()
+
+def _classify_in_worker(email_contents: list[str]) -> tuple[list[dict], tuple[int, int, int]]:
+    # A worker runs one task at a time, so the counter difference is this batch's cache lookups
+    before = classify_email_service.prediction_cache.counters()
+    results = classify_email_service.classify_emails(email_contents)
+    after = classify_email_service.prediction_cache.counters()
+    return results, tuple(a - b for a, b in zip(after, before))
+
+
+# Runs in the serving process
+def _record(outcome: tuple[list[dict], tuple[int, int, int]]) -> list[dict]:
+    """Count a worker's predictions and cache lookups where /v1/admin/model and /v1/admin/cache read them."""
+    results, cache_counters = outcome
+    for version, count in Counter(result["model_version"] for result in results).items():
+        classify_email_service.registry.record_predictions(version, count)
+    classify_email_service.prediction_cache.add_counters(*cache_counters)
+    return results
+
+
+class ClassificationExecutor:
+    """
+    Process pool that runs department classification off the event loop and outside the GIL.
+
+    Single-email requests from async callers are queued and sent to a worker in
+    micro-batches: a batch is dispatched once it holds max_batch_size emails or
+    max_wait_ms after its first email arrived, whichever comes first.
+    """
+
+    def __init__(self, workers: int, max_batch_size: int, max_wait_ms: float):
+        self.workers = workers
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Held while submitting and while restart() swaps pools, so nothing is sent to a pool being shut down
+        self._pool_lock = threading.Lock()
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # The event loop keeps only weak references to tasks
+        self._batches: set[asyncio.Task] = set()
+
+    def start(self):
+        self._pool = self._new_pool()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn: forking a process that already runs threads (uvicorn, the model watcher) is unsafe
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        # Bring every worker up now so no request pays for the model load
+        for future in [pool.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+        return pool
+
+    def restart(self):
+        """Replace the pool with workers that load the current artifact; queued work finishes on the old one."""
+        new_pool = self._new_pool()
+        with self._pool_lock:
+            old_pool, self._pool = self._pool, new_pool
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _submit(self, email_contents: list[str]) -> Future:
+        with self._pool_lock:
+            return self._pool.submit(_classify_in_worker, email_contents)
+
+    async def classify(self, email_content: str) -> dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((email_content, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, asyncio.Future]]):
+        try:
+            results = _record(await asyncio.wrap_future(self._submit([text for text, _ in batch])))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _chunks(self, email_contents: list[str]) -> list[list[str]]:
+        # Spread a large batch over all workers, but never above max_batch_size per task
+        size = max(1, min(self.max_batch_size, -(-len(email_contents) // self.workers)))
+        return [email_contents[i:i + size] for i in range(0, len(email_contents), size)]
+
+    async def classify_many(self, email_contents: list[str]) -> list[dict]:
+        parts = await asyncio.gather(*(
+            asyncio.wrap_future(self._submit(chunk)) for chunk in self._chunks(email_contents)
+        ))
+        return [result for part in parts for result in _record(part)]
+
+    def classify_many_sync(self, email_contents: list[str]) -> list[dict]:
+        futures = [self._submit(chunk) for chunk in self._chunks(email_contents)]
+        return [result for future in futures for result in _record(future.result())]
+
+
+executor: Optional[ClassificationExecutor] = None
+
+def start_executor():
+    """Start the process pool when CLASSIFIER_BACKEND is 'process'; the inline backend needs nothing."""
+    global executor
+    if settings.CLASSIFIER_BACKEND != "process" or executor is not None:
+        return
+    executor = ClassificationExecutor(
+        workers=settings.CLASSIFIER_WORKERS or os.cpu_count() or 1,
+        max_batch_size=settings.CLASSIFIER_MAX_BATCH,
+        max_wait_ms=settings.CLASSIFIER_MAX_WAIT_MS,
+    )
+    executor.start()
+    # Workers hold their own copy of the model, so a reload in this process restarts them
+    classify_email_service.registry.add_listener(
+        lambda previous, model: executor.restart() if previous is not None and executor is not None else None
+    )
+
+def shutdown_executor():
+    global executor
+    if executor is not None:
+        executor.shutdown()
+        executor = None
+
+async def classify_email_async(email_content: str) -> dict:
+    if executor is not None:
+        return await executor.classify(email_content)
+    return await asyncio.to_thread(classify_email_service.classify_email, email_content)
+
+async def classify_emails_async(email_contents: list[str]) -> list[dict]:
+    if not email_contents:
+        return []
+    if executor is not None:
+        return await executor.classify_many(email_contents)
+    return await asyncio.to_thread(classify_email_service.classify_emails, email_contents)
+
+def classify_emails_offloaded(email_contents: list[str]) -> list[dict]:
+    """Blocking variant for sync callers such as graph nodes."""
+    if not email_contents:
+        return []
+    if executor is not None:
+        return executor.classify_many_sync(email_contents)
+    return classify_email_service.classify_emails(email_contents)
@@ -1,57 +1,76 @@
-import pickle
 import os
-import re
 from langsmith import traceable
+from core import settings
+from services.model_registry import ModelRegistry
+from services.text_normalizer import normalize_text, normalize_texts
+from services.cache import TTLCache, SQLiteCacheBackend, TieredCache, content_key
 
-MODEL_PATH = 'pkl_files/email_dataset_long.pkl'
+MODEL_PATH = settings.MODEL_PATH
 
-classifier = None
-label_encoder = None
+if settings.CLASSIFIER_RUNTIME == "numpy":
+    # Exported by services.numpy_runtime; scikit-learn is never imported on this path
+    from services.numpy_runtime import load_numpy_artifact
+    registry = ModelRegistry(os.path.join(settings.NUMPY_MODEL_DIR, "meta.json"), loader=load_numpy_artifact)
+else:
+    registry = ModelRegistry(MODEL_PATH)
+
+# Predictions keyed by hash(model version, preprocessed text)
+prediction_cache = TieredCache(
+    TTLCache(settings.PREDICTION_CACHE_SIZE, settings.PREDICTION_CACHE_TTL),
+    SQLiteCacheBackend(
+        settings.PREDICTION_CACHE_SHARED_PATH,
+        "prediction_cache",
+        settings.PREDICTION_CACHE_SHARED_SIZE,
+        settings.PREDICTION_CACHE_TTL,
+    ) if settings.PREDICTION_CACHE_SHARED_PATH else None,
+)
+
+# A new model version makes every cached prediction stale
+registry.add_listener(lambda previous, model: prediction_cache.clear(keep_tag=model.version))
 
 def load_model():
-    global classifier, label_encoder
-    try:
-        with open(MODEL_PATH, 'rb') as f:
-            model_data = pickle.load(f)
-        classifier = model_data['pipeline']
-        label_encoder = model_data['label_encoder']
-        print("Email classification model loaded successfully!")
-    except FileNotFoundError:
-        print(f"Error: Model file '{MODEL_PATH}' not found.")
-        print("Please ensure the model is saved in the correct directory.")
-        classifier = None
-        label_encoder = None
-    except Exception as e:
-        print(f"Error loading model: {e}")
-        classifier = None
-        label_encoder = None
+    """Load the classifier artifact into the registry, replacing any loaded version."""
+    return registry.load(force=True)
 
 def preprocess_text_simple(text):
-    if text is None:
-        return ""
-    text = text.lower()
-    text = re.sub(r'\S+@\S+', ' email_address ', text)
-    text = re.sub(r'http\S+|www\S+', ' url_link ', text)
-    text = re.sub(r'\b\d+\b', ' number ', text)
-    text = re.sub(r'[^\w\s\?\!]', ' ', text)
-    text = ' '.join(text.split())
-    return text
+    return normalize_text(text)
 
 # @traceable(name="classify_email")
 def classify_email(email_content: str):
-    global classifier, label_encoder
-    if classifier is None or label_encoder is None:
-        load_model()
-    print(f"Classifier: {classifier}, Label Encoder: {label_encoder}")
-    if classifier is None or label_encoder is None:
-        raise RuntimeError("Email classification model or label encoder not loaded.")
-    processed_text = preprocess_text_simple(email_content)
-    prediction_encoded = classifier.predict([processed_text])[0]
-    probabilities = classifier.predict_proba([processed_text])[0]
-    predicted_department = label_encoder.inverse_transform([prediction_encoded])[0]
-    dept_probs = {dept: probabilities[i] for i, dept in enumerate(label_encoder.classes_)}
-    return {
-        "predicted_department": predicted_department,
-        "confidence": float(max(probabilities)),
-        "all_probabilities": {k: float(v) for k, v in dept_probs.items()}
-    }
+    return classify_emails([email_content])[0]
+
+def classify_emails(email_contents: list[str]) -> list[dict]:
+    """
+    Classify many emails with a single predict_proba call over the whole batch.
+    Labels are taken from the argmax of the probabilities; results keep input order.
+    """
+    model = registry.get()
+    if not email_contents:
+        return []
+    processed_texts = normalize_texts(email_contents)
+    results: list = [None] * len(processed_texts)
+    # Texts missing from the cache, deduplicated, with the positions they fill
+    pending: dict[str, list[int]] = {}
+    for i, processed_text in enumerate(processed_texts):
+        cached = prediction_cache.get(content_key(model.version, processed_text)) if prediction_cache.enabled else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.setdefault(processed_text, []).append(i)
+    if pending:
+        unique_texts = list(pending)
+        probabilities = model.predict_proba(unique_texts)
+        best = probabilities.argmax(axis=1)
+        for processed_text, row, best_index in zip(unique_texts, probabilities, best):
+            result = {
+                "predicted_department": model.labels[best_index],
+                "confidence": float(row[best_index]),
+                "all_probabilities": {dept: float(p) for dept, p in zip(model.labels, row)},
+                "model_version": model.version
+            }
+            if prediction_cache.enabled:
+                prediction_cache.set(content_key(model.version, processed_text), result, tag=model.version)
+            for position in pending[processed_text]:
+                results[position] = dict(result, all_probabilities=dict(result["all_probabilities"]))
+    registry.record_predictions(model.version, len(results))
+    return results
@@ -0,0 +1,117 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+
+from core.database import engine
+from models.schema import EmailRecord
+
+
+def _text(value) -> Optional[str]:
+    # Postgres text can't hold NUL characters, which do turn up in mail
+    return None if value is None else str(value).replace("\x00", "")
+
+
+# 1. Get stored emails of an org by UID
+def get_records(org_id: int, uidvalidity: int, uids: list[int]) -> dict[int, EmailRecord]:
+    if not uids:
+        return {}
+    with Session(engine) as session:
+        statement = select(EmailRecord).where(
+            EmailRecord.org_id == org_id,
+            EmailRecord.uidvalidity == uidvalidity,
+            EmailRecord.uid.in_(uids),
+        )
+        return {record.uid: record for record in session.exec(statement).all()}
+
+
+# 2. Store freshly fetched emails (re-fetched ones are overwritten, their results kept)
+def save_fetched(org_id: int, emails: list[dict]):
+    rows = [
+        {
+            "org_id": org_id,
+            "uidvalidity": email_obj["uidvalidity"],
+            "uid": email_obj["uid"],
+            "subject": _text(email_obj.get("subject")),
+            "sender": _text(email_obj.get("from")),
+            "date": _text(email_obj.get("date")),
+            "body": _text(email_obj.get("body")) or "",
+            "attachments": email_obj.get("attachments", []),
+            "fetched_at": datetime.now(timezone.utc),
+        }
+        for email_obj in emails if "uid" in email_obj
+    ]
+    if not rows:
+        return
+    statement = insert(EmailRecord).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["org_id", "uidvalidity", "uid"],
+        set_={column: statement.excluded[column]
+              for column in ("subject", "sender", "date", "body", "attachments", "fetched_at")},
+    )
+    with Session(engine) as session:
+        session.execute(statement)
+        session.commit()
+
+
+def _save_results(org_id: int, rows: list[dict]):
+    if not rows:
+        return
+    for row in rows:
+        row["org_id"] = org_id
+    with Session(engine) as session:
+        # Bulk UPDATE by primary key: one executemany for the whole page
+        session.execute(update(EmailRecord), rows)
+        session.commit()
+
+
+# 3. Store department predictions, tagged with the model version that made them
+def save_classifications(org_id: int, emails: list[dict]):
+    _save_results(org_id, [
+        {"uidvalidity": e["uidvalidity"], "uid": e["uid"],
+         "classification": e["classification_report"], "model_version": e["classification_report"]["model_version"]}
+        for e in emails
+        if "uid" in e and "model_version" in e.get("classification_report", {})
+    ])
+
+
+# 4. Store sentiments, tagged with the LLM prompt version or the local model version that produced them
+def save_sentiments(org_id: int, emails: list[dict], prompt_version: str, local_version: Optional[str] = None):
+    _save_results(org_id, [
+        {"uidvalidity": e["uidvalidity"], "uid": e["uid"],
+         "sentiment": e["sentiment_analysis"], "sentiment_source": e.get("sentiment_source", "llm"),
+         "prompt_version": local_version if e.get("sentiment_source") == "local" else prompt_version}
+        for e in emails
+        if "uid" in e and isinstance(e.get("sentiment_analysis"), str)
+    ])
+
+
+# 5. Drop an org's emails stored under another UIDVALIDITY: those UIDs mean nothing any more
+def delete_stale_records(org_id: int, uidvalidity: int):
+    with Session(engine) as session:
+        session.execute(delete(EmailRecord).where(EmailRecord.org_id == org_id, EmailRecord.uidvalidity != uidvalidity))
+        session.commit()
+
+
+def to_email(record: EmailRecord, model_version: Optional[str], prompt_version: Optional[str],
+             local_version: Optional[str] = None) -> dict:
+    """The email dict fetch_emails produces, with the stored results that are still fresh."""
+    email_obj = {
+        "email_id": str(record.uid),
+        "subject": record.subject,
+        "from": record.sender,
+        "date": record.date,
+        "body": record.body,
+        "attachments": record.attachments or [],
+        "uid": record.uid,
+        "uidvalidity": record.uidvalidity,
+    }
+    if record.classification is not None and record.model_version == model_version:
+        email_obj["classification_report"] = record.classification
+    sentiment_version = local_version if record.sentiment_source == "local" else prompt_version
+    if record.sentiment is not None and sentiment_version is not None and record.prompt_version == sentiment_version:
+        email_obj["sentiment_analysis"] = record.sentiment
+        email_obj["sentiment_source"] = record.sentiment_source or "llm"
+    return email_obj
@@ -1,17 +1,13 @@
 from typing import Any
-from langchain.chat_models import init_chat_model
 from core import settings
+from core.database import async_engine
+from services.llm_gateway import get_chat_model
 from langchain_core.tools import tool
-from langchain.chat_models import init_chat_model
 from langchain.schema import HumanMessage, SystemMessage
 import re
 
 
-llm = init_chat_model(
-    model="gpt-4o-mini",
-    temperature=0,
-    api_key=settings.OPENAI_API_KEY
-)
+llm = get_chat_model("sql_query")
 
 
 db_system_prompt = """
@@ -138,4 +134,38 @@ def generate_select_query(user_request: str) -> dict:
     
     # print(f"Generated SQL: {sql_query}")
     enforce_query =  enforce_select_only(sql_query)
-    return execute_query(enforce_query)
\ No newline at end of file
+    return execute_query(enforce_query)
+
+
+async def execute_query_async(sql: str) -> dict:
+    """execute_query on the async engine's pooled connections; same result shape."""
+    async with async_engine.connect() as conn:
+        try:
+            # no_parameters: the SQL goes to psycopg with no parameters at all, so a "%" (LIKE '%lap%')
+            # is sent as written instead of being read as a placeholder, as the psycopg2 path does
+            result = await conn.execution_options(no_parameters=True).exec_driver_sql(sql)
+            if result.returns_rows:
+                results = [dict(row) for row in result.mappings().all()]
+                return {
+                    "data": results,
+                    "message": "Query executed successfully."
+                    if results
+                    else "Query executed successfully, but no data found."
+                }
+            else:
+                return {
+                    "data": [],
+                    "message": "Query executed successfully, no results to return."
+                }
+        except Exception as e:
+            return {"error": str(e), "data": [], "message": "Error executing query."}
+
+
+async def generate_select_query_async(user_request: str) -> dict:
+    response = await llm.ainvoke([
+        SystemMessage(content=db_system_prompt),
+        HumanMessage(content=user_request)
+    ])
+    sql_query = normalize_content(response.content).strip()
+    enforce_query = enforce_select_only(sql_query)
+    return await execute_query_async(enforce_query)
\ No newline at end of file
@@ -1,16 +1,10 @@
-from langchain.chat_models import init_chat_model
-from langchain.prompts import ChatPromptTemplate
-from core import settings
-from services.rag_retrieval import retrieve_from_pgvector
+from typing import AsyncIterator
 
-def generate_email_with_rag(email_text: str, collection_name: str, k: int = 3) -> str:
-	"""
-	Generate an email reply using RAG: retrieve context from PGVector and use LLM to answer.
-	"""
-	result = retrieve_from_pgvector(email_text, collection_name, k)
-	context = "\n\n".join([doc.page_content for doc in result["results"]])
+from langchain.prompts import ChatPromptTemplate
+from services.llm_gateway import get_chat_model
+from services.rag_retrieval import retrieve_documents, retrieve_documents_async
 
-	system_prompt = """
+system_prompt = """
 	You are an assistant that generates polite, professional, and context-aware email replies.
 	Rules:
 	1. Reply in a formal and concise tone.
@@ -19,18 +13,18 @@ def generate_email_with_rag(email_text: str, collection_name: str, k: int = 3) -
 	4. End with a professional closing.
 	"""
 
-	llm = init_chat_model(
-		model="gpt-4o-mini",
-		temperature=0,
-		api_key=settings.OPENAI_API_KEY
-	)
+def _rag_reply_chain(email_text: str, documents):
+	context = "\n\n".join([doc.page_content for doc in documents or []])
+	# Shared client: keeps its pooled connections between requests
+	llm = get_chat_model("rag_reply")
 
 	prompt = ChatPromptTemplate.from_messages([
 		("system", system_prompt),
 		("human", f"Context:\n{context}\n\nEmail received:\n{email_text}\n\nWrite a professional reply:")
 	])
-	chain = prompt | llm
-	response = chain.invoke({})
+	return prompt | llm
+
+def _reply_text(response) -> str:
 	if hasattr(response, "content"):
 		content = response.content
 		if isinstance(content, str):
@@ -43,3 +37,30 @@ def generate_email_with_rag(email_text: str, collection_name: str, k: int = 3) -
 		else:
 			return str(content)
 	return str(response)
+
+def generate_email_with_rag(email_text: str, collection_name: str, k: int = 3) -> str:
+	"""
+	Generate an email reply using RAG: retrieve context from PGVector and use LLM to answer.
+	"""
+	# Only the documents are needed: retrieve_from_pgvector would also ask the LLM for an answer we don't use
+	documents = retrieve_documents(email_text, collection_name, k)
+	chain = _rag_reply_chain(email_text, documents)
+	response = chain.invoke({})
+	return _reply_text(response)
+
+async def generate_email_with_rag_async(email_text: str, collection_name: str, k: int = 3) -> str:
+	"""
+	generate_email_with_rag with async retrieval and model call.
+	"""
+	documents = await retrieve_documents_async(email_text, collection_name, k)
+	response = await _rag_reply_chain(email_text, documents).ainvoke({})
+	return _reply_text(response)
+
+async def stream_email_with_rag(email_text: str, collection_name: str, k: int = 3) -> AsyncIterator[str]:
+	"""
+	Yield the RAG reply's text as the model generates it.
+	"""
+	documents = await retrieve_documents_async(email_text, collection_name, k)
+	async for chunk in _rag_reply_chain(email_text, documents).astream({}):
+		if chunk.content:
+			yield chunk.content if isinstance(chunk.content, str) else str(chunk.content)
@@ -1,13 +1,10 @@
-from langchain.chat_models import init_chat_model
+from typing import AsyncIterator
+
 from langchain.prompts import ChatPromptTemplate
-from core import settings
+from services.llm_gateway import get_chat_model
 
 # Initialize the model
-llm = init_chat_model(
-    model="gpt-4o-mini",
-    temperature=0,  
-    api_key=settings.OPENAI_API_KEY
-)
+llm = get_chat_model("email_reply")
 
 # System prompt to guide the reply style
 system_prompt = """
@@ -19,14 +16,16 @@ Rules:
 4. End with a professional closing.
 """
 
-# Function to generate reply
-def generate_email_reply(email_text: str) -> str:
+def _reply_chain(email_text: str):
     prompt = ChatPromptTemplate.from_messages([
         ("system", system_prompt),
         ("human", f"Email received:\n\n{email_text}\n\nWrite a professional reply:")
     ])
-    
-    chain = prompt | llm
+    return prompt | llm
+
+# Function to generate reply
+def generate_email_reply(email_text: str) -> str:
+    chain = _reply_chain(email_text)
     response = chain.invoke({})
     # Ensure the return value is always a string
     if isinstance(response.content, str):
@@ -34,6 +33,16 @@ def generate_email_reply(email_text: str) -> str:
     else:
         return str(response.content)
 
+async def generate_email_reply_async(email_text: str) -> str:
+    response = await _reply_chain(email_text).ainvoke({})
+    return response.content if isinstance(response.content, str) else str(response.content)
+
+async def stream_email_reply(email_text: str) -> AsyncIterator[str]:
+    """Yield the reply's text as the model generates it."""
+    async for chunk in _reply_chain(email_text).astream({}):
+        if chunk.content:
+            yield chunk.content if isinstance(chunk.content, str) else str(chunk.content)
+
 # Example usage
 email = """
 Hello, 
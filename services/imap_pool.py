@@ -0,0 +1,163 @@
+import asyncio
+import imaplib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from core import settings
+from services.mailbox import connect
+
+# Failures that mean the session itself is gone (server timeout, dropped socket)
+_SESSION_ERRORS = (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError, EOFError)
+
+
+def _close(mail: imaplib.IMAP4):
+    try:
+        mail.logout()
+    except Exception:
+        try:
+            mail.shutdown()
+        except Exception:
+            pass
+
+
+class ImapPool:
+    """
+    Logged-in IMAP sessions reused across graph runs, keyed by org.
+
+    At most max_per_org sessions exist per org; borrowers beyond that wait up to
+    acquire_timeout. An idle session is checked with NOOP before it is handed out
+    and replaced by a fresh login if the server has dropped it. Sessions idle for
+    longer than idle_timeout are logged out. A session that raised while borrowed
+    is discarded rather than returned.
+    """
+
+    def __init__(self, max_per_org: int, idle_timeout: float, acquire_timeout: float,
+                 connector: Callable[[str, str], imaplib.IMAP4] = connect):
+        self.max_per_org = max_per_org
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self._connect = connector
+        self._condition = threading.Condition()
+        self._idle: dict[tuple, list[tuple[imaplib.IMAP4, float]]] = {}
+        self._open: dict[tuple, int] = {}
+        self._counters = {"logins": 0, "reused": 0, "reconnects": 0, "evicted": 0, "discarded": 0}
+
+    def _acquire(self, key: tuple) -> tuple[imaplib.IMAP4 | None, bool]:
+        """An idle session for key (None if a new one may be opened) and whether it needs a NOOP check."""
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._condition:
+            while True:
+                idle = self._idle.get(key)
+                while idle:
+                    mail, last_used = idle.pop()
+                    if time.monotonic() - last_used <= self.idle_timeout:
+                        return mail, True
+                    # Past the idle timeout: the server has most likely dropped it already
+                    self._open[key] -= 1
+                    self._counters["evicted"] += 1
+                    threading.Thread(target=_close, args=(mail,), daemon=True).start()
+                if self._open.get(key, 0) < self.max_per_org:
+                    self._open[key] = self._open.get(key, 0) + 1
+                    return None, False
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No IMAP session for org {key[0]} within {self.acquire_timeout}s")
+                self._condition.wait(remaining)
+
+    def _release(self, key: tuple, mail: imaplib.IMAP4 | None):
+        with self._condition:
+            if mail is None:
+                self._open[key] -= 1
+            else:
+                self._idle.setdefault(key, []).append((mail, time.monotonic()))
+            self._condition.notify()
+
+    def _login(self, user: str, password: str) -> imaplib.IMAP4:
+        mail = self._connect(user, password)
+        with self._condition:
+            self._counters["logins"] += 1
+        return mail
+
+    @contextmanager
+    def session(self, org_id, user: str, password: str) -> Iterator[imaplib.IMAP4]:
+        """Borrow a logged-in session for this org's mailbox; it goes back to the pool afterwards."""
+        key = (str(org_id), user)
+        mail, check = self._acquire(key)
+        try:
+            if mail is not None and check:
+                try:
+                    mail.noop()
+                    with self._condition:
+                        self._counters["reused"] += 1
+                except _SESSION_ERRORS:
+                    _close(mail)
+                    mail = None
+                    with self._condition:
+                        self._counters["reconnects"] += 1
+            if mail is None:
+                mail = self._login(user, password)
+        except BaseException:
+            if mail is not None:
+                _close(mail)
+            self._release(key, None)
+            raise
+        try:
+            yield mail
+        except BaseException:
+            _close(mail)
+            with self._condition:
+                self._counters["discarded"] += 1
+            self._release(key, None)
+            raise
+        self._release(key, mail)
+
+    def evict_idle(self) -> int:
+        """Log out every session idle for longer than idle_timeout; returns how many."""
+        now = time.monotonic()
+        expired = []
+        with self._condition:
+            for key, idle in self._idle.items():
+                keep = [(mail, last_used) for mail, last_used in idle if now - last_used <= self.idle_timeout]
+                expired.extend(mail for mail, last_used in idle if now - last_used > self.idle_timeout)
+                self._open[key] -= len(idle) - len(keep)
+                idle[:] = keep
+            self._counters["evicted"] += len(expired)
+            self._condition.notify_all()
+        for mail in expired:
+            _close(mail)
+        return len(expired)
+
+    async def evict_periodically(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.evict_idle)
+            except Exception as e:
+                print(f"IMAP pool eviction failed: {e}")
+
+    def close_all(self):
+        with self._condition:
+            sessions = [mail for idle in self._idle.values() for mail, _ in idle]
+            for key, idle in self._idle.items():
+                self._open[key] -= len(idle)
+            self._idle.clear()
+        for mail in sessions:
+            _close(mail)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                **self._counters,
+                "open": sum(self._open.values()),
+                "idle": sum(len(idle) for idle in self._idle.values()),
+                "orgs": len([key for key, count in self._open.items() if count]),
+            }
+
+
+imap_pool = ImapPool(
+    max_per_org=settings.IMAP_POOL_MAX_PER_ORG,
+    idle_timeout=settings.IMAP_POOL_IDLE_TIMEOUT,
+    acquire_timeout=settings.IMAP_POOL_ACQUIRE_TIMEOUT,
+)
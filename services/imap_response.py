@@ -0,0 +1,90 @@
+"""
+Parser for IMAP FETCH responses as returned by imaplib.
+
+imaplib hands back FETCH data as a flat list in which every literal is split
+out: (b'12 (UID 40 BODY[1] {5}', b'hello') tuples followed by the rest of the
+line as bytes. parse_fetch_response turns that back into one dict per message,
+keyed by upper-cased item name:
+
+    {"UID": 40, "BODYSTRUCTURE": [...], "BODY[1]<0>": b"hello"}
+
+Atoms that are all digits become ints, NIL becomes None, quoted strings become
+str, literals stay bytes and parenthesized lists become Python lists.
+"""
+import re
+from typing import Iterator, Union
+
+Value = Union[None, int, str, bytes, list]
+
+_TOKEN = re.compile(
+    rb'\s*(?:'
+    rb'(?P<open>\()|(?P<close>\))'
+    rb'|"(?P<quoted>(?:[^"\\]|\\.)*)"'
+    rb'|\{(?P<literal>\d+)\}\s*$'
+    # Atoms, including section specs such as BODY[HEADER.FIELDS (SUBJECT)]<0>
+    rb'|(?P<atom>[^\s()"{}\[\]]+(?:\[[^\]]*\])?(?:<[\d.]+>)?)'
+    rb')'
+)
+_ESCAPE = re.compile(rb'\\(.)')
+
+_OPEN, _CLOSE, _VALUE = object(), object(), object()
+
+
+def _lex(segment: bytes) -> Iterator[tuple]:
+    pos = 0
+    end = len(segment.rstrip())
+    while pos < end:
+        match = _TOKEN.match(segment, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Unparsable IMAP response at {segment[pos:pos + 40]!r}")
+        pos = match.end()
+        if match.group("open"):
+            yield _OPEN, None
+        elif match.group("close"):
+            yield _CLOSE, None
+        elif match.group("quoted") is not None:
+            yield _VALUE, _ESCAPE.sub(rb"\1", match.group("quoted")).decode("utf-8", errors="replace")
+        elif match.group("atom"):
+            atom = match.group("atom")
+            if atom.isdigit():
+                yield _VALUE, int(atom)
+            elif atom.upper() == b"NIL":
+                yield _VALUE, None
+            else:
+                yield _VALUE, atom.decode("ascii", errors="replace")
+        # A literal marker: the literal itself is the next item imaplib returned
+
+
+def _tokens(data: list) -> Iterator[tuple]:
+    for item in data:
+        if isinstance(item, tuple):
+            head, literal = item[0], item[1]
+            yield from _lex(head)
+            yield _VALUE, literal
+        elif isinstance(item, bytes):
+            yield from _lex(item)
+
+
+def _read_list(tokens: Iterator[tuple]) -> list:
+    values = []
+    for kind, value in tokens:
+        if kind is _CLOSE:
+            return values
+        values.append(_read_list(tokens) if kind is _OPEN else value)
+    raise ValueError("Unterminated list in IMAP response")
+
+
+def parse_fetch_response(data: list) -> list[dict[str, Value]]:
+    """One {item name: value} dict per message in the data of a (UID) FETCH."""
+    messages = []
+    tokens = _tokens([item for item in data if item is not None])
+    for kind, value in tokens:
+        # Each message is '<sequence number> (<name> <value> ...)'
+        if kind is not _VALUE or not isinstance(value, int):
+            raise ValueError(f"Expected a message sequence number, got {value!r}")
+        kind, _ = next(tokens, (None, None))
+        if kind is not _OPEN:
+            raise ValueError("Expected '(' after the message sequence number")
+        items = _read_list(tokens)
+        messages.append({str(name).upper(): item for name, item in zip(items[::2], items[1::2])})
+    return messages
@@ -0,0 +1,128 @@
+"""
+Response cache for the chat models, plugged in through LangChain's BaseCache.
+
+Every prompt-driven service builds its model with cache=get_llm_cache("<service>").
+Entries are keyed by the model configuration LangChain passes as llm_string
+(model name, temperature and every other request parameter, bound tools and
+response formats included) and a normalized form of the messages, and live in
+a TieredCache: an in-process LRU with a TTL in front of an optional SQLite file
+shared by the workers on a host. Services named in LLM_CACHE_EXCLUDE always
+call the model.
+"""
+import json
+import threading
+from typing import Any, Optional, Union
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+from core import settings
+from services.cache import SQLiteCacheBackend, TieredCache, TTLCache, content_key
+
+
+def _normalize(value: Any) -> Any:
+    # Drops message ids and edge whitespace, which change between runs without changing the request
+    if isinstance(value, dict):
+        kwargs = value.get("kwargs")
+        if isinstance(kwargs, dict) and value.get("type") == "constructor":
+            value = dict(value, kwargs={k: v for k, v in kwargs.items() if k != "id"})
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _to_json(generation: Generation) -> dict:
+    value = {"text": generation.text, "generation_info": generation.generation_info}
+    if isinstance(generation, ChatGeneration):
+        value["message"] = message_to_dict(generation.message)
+    return value
+
+
+def _from_json(value: dict) -> Generation:
+    if "message" in value:
+        return ChatGeneration(message=messages_from_dict([value["message"]])[0],
+                              generation_info=value["generation_info"])
+    return Generation(text=value["text"], generation_info=value["generation_info"])
+
+
+def prompt_key(prompt: str, llm_string: str) -> str:
+    try:
+        prompt = json.dumps(_normalize(json.loads(prompt)), sort_keys=True, ensure_ascii=False)
+    except ValueError:
+        prompt = prompt.strip()
+    return content_key(llm_string, prompt)
+
+
+class LLMResponseCache(BaseCache):
+    """One service's view of the shared response cache, with its own hit and miss counters."""
+
+    def __init__(self, cache: TieredCache, service: str):
+        self.cache = cache
+        self.service = service
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        value = self.cache.get(prompt_key(prompt, llm_string))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is None:
+            return None
+        try:
+            return [_from_json(generation) for generation in json.loads(value)]
+        except Exception as e:
+            print(f"Unreadable LLM cache entry for {self.service}: {e}")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        # Stored as one JSON string: the in-memory tier hands out copies, and a string copies for free
+        self.cache.set(prompt_key(prompt, llm_string), json.dumps([_to_json(generation) for generation in return_val]),
+                       tag=self.service)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+response_cache = TieredCache(
+    TTLCache(settings.LLM_CACHE_SIZE, settings.LLM_CACHE_TTL),
+    SQLiteCacheBackend(
+        settings.LLM_CACHE_SHARED_PATH,
+        "llm_cache",
+        settings.LLM_CACHE_SHARED_SIZE,
+        settings.LLM_CACHE_TTL,
+    ) if settings.LLM_CACHE_SHARED_PATH else None,
+)
+
+_service_caches: dict[str, LLMResponseCache] = {}
+_excluded = {name.strip() for name in settings.LLM_CACHE_EXCLUDE.split(",") if name.strip()}
+
+
+def get_llm_cache(service: str) -> Union[LLMResponseCache, bool]:
+    """The cache= value for a service's chat model: its cache view, or False if caching is off for it."""
+    if service in _excluded or not response_cache.enabled:
+        return False
+    cache = _service_caches.get(service)
+    if cache is None:
+        cache = _service_caches.setdefault(service, LLMResponseCache(response_cache, service))
+    return cache
+
+
+def stats() -> dict:
+    """Hit rates of the shared tiers and of every service that has used the cache."""
+    return {
+        **response_cache.stats(),
+        "excluded": sorted(_excluded),
+        "services": {name: cache.stats() for name, cache in _service_caches.items()},
+    }
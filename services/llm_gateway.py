@@ -0,0 +1,440 @@
+"""
+One gateway for every chat model and embedding client the app uses.
+
+get_chat_model(service) / get_embeddings(service) hand out one long-lived client
+per service and settings combination, all sharing:
+- a keep-alive HTTP connection pool (one for sync calls, one for async calls),
+  so requests reuse TLS connections instead of opening new ones;
+- a global limit on requests in flight (LLM_MAX_CONCURRENCY) plus optional
+  per-service limits (LLM_SERVICE_CONCURRENCY, e.g. "sentiment=8,rag_answer=2"),
+  enforced in the HTTP transport so a retry waiting out its backoff holds no slot;
+- token-bucket pacing (LLM_REQUESTS_PER_SECOND) applied after the response
+  cache, so cache hits are never paced; the OpenAI client retries 429s and
+  transient errors with exponential backoff, honouring Retry-After;
+- a usage callback counting requests, prompt and completion tokens and latency
+  per service, reported by stats() at /v1/admin/llm-gateway.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+import httpx
+from langchain.chat_models import init_chat_model
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import ChatGenerationChunk
+from langchain_core.rate_limiters import InMemoryRateLimiter
+from langchain_openai import OpenAIEmbeddings
+
+from core import settings
+from services.llm_cache import get_llm_cache
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
+def _parse_limits(spec: str) -> dict[str, int]:
+    limits = {}
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class _Limit:
+    """
+    A counting semaphore that threads and asyncio tasks can both wait on. A slot is handed
+    straight to the oldest waiter on release; an async waiter cancelled before it runs (a
+    client disconnect, a timeout) gives a slot it was handed back instead of keeping it.
+    """
+
+    def __init__(self, limit: int):
+        self._lock = threading.Lock()
+        self._free = limit
+        self._waiters: deque = deque()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return True
+            return False
+
+    def acquire(self):
+        event = threading.Event()
+        waiter = _Waiter(event.set)
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return
+            self._waiters.append(waiter)
+        event.wait()
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = _Waiter(lambda: loop.call_soon_threadsafe(_resolve, future))
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return
+            self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+            if granted:
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self._free += 1
+                return
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+        try:
+            waiter.wake()
+        except RuntimeError:
+            # The waiter's event loop is gone: nobody will use the slot, pass it on
+            self.release()
+
+
+class _Waiter:
+    __slots__ = ("wake", "granted")
+
+    def __init__(self, wake):
+        self.wake = wake
+        self.granted = False
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _Slots:
+    """Global and per-service request slots, shared by the sync and async transports."""
+
+    def __init__(self, global_limit: int, service_limits: dict[str, int]):
+        self._global = _Limit(global_limit)
+        self._services = {name: _Limit(limit) for name, limit in service_limits.items()}
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.waits = 0
+
+    def _limits(self, service: str) -> list[_Limit]:
+        service_limit = self._services.get(service)
+        # Service slot first: a service at its own limit doesn't sit on a global slot
+        return [service_limit, self._global] if service_limit else [self._global]
+
+    def _entered(self, waited: bool):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.waits += waited
+
+    def acquire(self, service: str):
+        waited = False
+        for limit in self._limits(service):
+            if not limit.try_acquire():
+                waited = True
+                limit.acquire()
+        self._entered(waited)
+
+    async def acquire_async(self, service: str):
+        waited = False
+        acquired = []
+        try:
+            for limit in self._limits(service):
+                if not limit.try_acquire():
+                    waited = True
+                    await limit.acquire_async()
+                acquired.append(limit)
+        except BaseException:
+            # Cancelled waiting for the global slot: the service slot already taken goes back
+            for limit in reversed(acquired):
+                limit.release()
+            raise
+        self._entered(waited)
+
+    def release(self, service: str):
+        with self._lock:
+            self.in_flight -= 1
+        for limit in reversed(self._limits(service)):
+            limit.release()
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    # The slot is held until the body has been read and closed, which for streamed completions is the end of the stream
+    def __init__(self, inner: httpx.SyncByteStream, release):
+        self._inner = inner
+        self._release = release
+
+    def __iter__(self):
+        yield from self._inner
+
+    def close(self):
+        try:
+            self._inner.close()
+        finally:
+            self._release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, inner: httpx.AsyncByteStream, release):
+        self._inner = inner
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._inner:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._inner.aclose()
+        finally:
+            self._release()
+
+
+class _LimitedTransport(httpx.BaseTransport):
+    def __init__(self, inner: httpx.BaseTransport, slots: _Slots, service: str):
+        self._inner = inner
+        self._slots = slots
+        self._service = service
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._slots.acquire(self._service)
+        release = _once(lambda: self._slots.release(self._service))
+        try:
+            response = self._inner.handle_request(request)
+        except BaseException:
+            release()
+            raise
+        return httpx.Response(response.status_code, headers=response.headers, extensions=response.extensions,
+                              stream=_ReleasingStream(response.stream, release))
+
+
+class _AsyncLimitedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport, slots: _Slots, service: str):
+        self._inner = inner
+        self._slots = slots
+        self._service = service
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self._slots.acquire_async(self._service)
+        release = _once(lambda: self._slots.release(self._service))
+        try:
+            response = await self._inner.handle_async_request(request)
+        except BaseException:
+            release()
+            raise
+        return httpx.Response(response.status_code, headers=response.headers, extensions=response.extensions,
+                              stream=_AsyncReleasingStream(response.stream, release))
+
+
+def _once(fn):
+    lock = threading.Lock()
+    done = []
+
+    def call():
+        with lock:
+            if done:
+                return
+            done.append(True)
+        fn()
+    return call
+
+
+class UsageTracker:
+    """Requests, tokens and latency of the model calls that reached the API, per service."""
+
+    RECENT = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started: dict[Any, tuple[str, float]] = {}
+        self.services: dict[str, dict] = {}
+        self.recent: deque = deque(maxlen=self.RECENT)
+
+    def handler(self, service: str) -> BaseCallbackHandler:
+        return _ServiceUsageHandler(self, service)
+
+    def start(self, run_id, service: str):
+        with self._lock:
+            self._started[run_id] = (service, time.perf_counter())
+
+    def end(self, run_id, response):
+        with self._lock:
+            service, started = self._started.pop(run_id, (None, None))
+        # Cache hits come back without llm_output: they cost nothing and aren't counted
+        token_usage = (response.llm_output or {}).get("token_usage")
+        if token_usage is not None:
+            prompt_tokens = token_usage.get("prompt_tokens") or 0
+            completion_tokens = token_usage.get("completion_tokens") or 0
+        else:
+            # A streamed completion reports its usage on the final chunk
+            generation = response.generations[0][0] if response.generations and response.generations[0] else None
+            usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if not isinstance(generation, ChatGenerationChunk) or not usage_metadata:
+                return
+            prompt_tokens = usage_metadata.get("input_tokens") or 0
+            completion_tokens = usage_metadata.get("output_tokens") or 0
+        if service is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            totals = self.services.setdefault(service, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                                                        "total_ms": 0.0})
+            totals["requests"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["total_ms"] += elapsed_ms
+            self.recent.append({"service": service, "prompt_tokens": prompt_tokens,
+                                "completion_tokens": completion_tokens, "elapsed_ms": elapsed_ms})
+
+    def error(self, run_id):
+        with self._lock:
+            self._started.pop(run_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            services = {
+                name: {**totals, "avg_prompt_tokens": totals["prompt_tokens"] / totals["requests"],
+                       "avg_completion_tokens": totals["completion_tokens"] / totals["requests"],
+                       "avg_ms": totals["total_ms"] / totals["requests"]}
+                for name, totals in self.services.items()
+            }
+            return {"services": services, "recent": list(self.recent)}
+
+
+class _ServiceUsageHandler(BaseCallbackHandler):
+    def __init__(self, tracker: UsageTracker, service: str):
+        self._tracker = tracker
+        self._service = service
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._tracker.start(run_id, self._service)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._tracker.start(run_id, self._service)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._tracker.end(run_id, response)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._tracker.error(run_id)
+
+
+_lock = threading.Lock()
+_slots: Optional[_Slots] = None
+_transport: Optional[httpx.HTTPTransport] = None
+_async_transport: Optional[httpx.AsyncHTTPTransport] = None
+_rate_limiter: Optional[InMemoryRateLimiter] = None
+_clients: dict[tuple, Any] = {}
+usage = UsageTracker()
+
+
+def _shared():
+    # Built on first use, so settings changed at startup (or by a benchmark) still apply
+    global _slots, _transport, _async_transport, _rate_limiter
+    if _slots is None:
+        limits = httpx.Limits(max_connections=settings.LLM_MAX_CONNECTIONS,
+                              max_keepalive_connections=settings.LLM_MAX_CONNECTIONS, keepalive_expiry=60)
+        _transport = httpx.HTTPTransport(limits=limits)
+        _async_transport = httpx.AsyncHTTPTransport(limits=limits)
+        _rate_limiter = InMemoryRateLimiter(
+            requests_per_second=settings.LLM_REQUESTS_PER_SECOND,
+            check_every_n_seconds=0.01,
+            max_bucket_size=max(settings.LLM_RATE_BURST, 1),
+        ) if settings.LLM_REQUESTS_PER_SECOND > 0 else None
+        _slots = _Slots(settings.LLM_MAX_CONCURRENCY, _parse_limits(settings.LLM_SERVICE_CONCURRENCY))
+    return _slots
+
+
+def _http_clients(service: str) -> tuple[httpx.Client, httpx.AsyncClient]:
+    slots = _shared()
+    return (httpx.Client(transport=_LimitedTransport(_transport, slots, service)),
+            httpx.AsyncClient(transport=_AsyncLimitedTransport(_async_transport, slots, service)))
+
+
+def get_chat_model(service: str, model: str = DEFAULT_MODEL, temperature: float = 0, **kwargs):
+    """The shared chat model of a service; extra kwargs (timeout, max_retries, ...) override the defaults."""
+    key = ("chat", service, model, temperature, tuple(sorted(kwargs.items())))
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            http_client, http_async_client = _http_clients(service)
+            options = {
+                "api_key": settings.OPENAI_API_KEY,
+                "base_url": settings.OPENAI_BASE_URL or None,
+                "timeout": settings.LLM_TIMEOUT,
+                "max_retries": settings.LLM_MAX_RETRIES,
+                "cache": get_llm_cache(service),
+                "stream_usage": True,
+                **kwargs,
+            }
+            client = init_chat_model(
+                model=model,
+                temperature=temperature,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                rate_limiter=_rate_limiter,
+                callbacks=[usage.handler(service)],
+                **options,
+            )
+            _clients[key] = client
+        return client
+
+
+def get_embeddings(service: str, model: str = "text-embedding-3-large") -> OpenAIEmbeddings:
+    """The shared embeddings client of a service."""
+    key = ("embeddings", service, model)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            http_client, http_async_client = _http_clients(service)
+            client = OpenAIEmbeddings(
+                model=model,
+                api_key=settings.OPENAI_API_KEY or None,
+                base_url=settings.OPENAI_BASE_URL or None,
+                timeout=settings.LLM_TIMEOUT,
+                max_retries=settings.LLM_MAX_RETRIES,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+            _clients[key] = client
+        return client
+
+
+async def close():
+    """Close the pooled connections (app shutdown)."""
+    global _slots
+    with _lock:
+        _clients.clear()
+        transport, async_transport = _transport, _async_transport
+        _slots = None
+    if transport is not None:
+        transport.close()
+    if async_transport is not None:
+        await async_transport.aclose()
+
+
+def stats() -> dict:
+    slots = _slots
+    return {
+        "clients": len(_clients),
+        "in_flight": slots.in_flight if slots else 0,
+        "max_in_flight": slots.max_in_flight if slots else 0,
+        "waited_for_slot": slots.waits if slots else 0,
+        "max_concurrency": settings.LLM_MAX_CONCURRENCY,
+        "service_concurrency": _parse_limits(settings.LLM_SERVICE_CONCURRENCY),
+        "requests_per_second": settings.LLM_REQUESTS_PER_SECOND or None,
+        **usage.stats(),
+    }
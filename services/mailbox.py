@@ -0,0 +1,202 @@
+import base64
+import binascii
+import email
+import imaplib
+import itertools
+import quopri
+import re
+from collections import defaultdict
+from typing import Iterator, Optional
+
+from core import settings
+from services.email_body import bodies_to_text
+from services.imap_response import parse_fetch_response
+
+_HEADER_FIELDS = "HEADER.FIELDS (SUBJECT FROM DATE)"
+_PARTIAL_QP_ESCAPE = re.compile(rb"=[0-9A-Fa-f]?$")
+
+
+def connect(user: str, password: str) -> imaplib.IMAP4:
+    if settings.IMAP_USE_SSL:
+        mail = imaplib.IMAP4_SSL(settings.IMAP_HOST, settings.IMAP_PORT)
+    else:
+        mail = imaplib.IMAP4(settings.IMAP_HOST, settings.IMAP_PORT)
+    mail.login(user, password)
+    return mail
+
+
+def select_inbox(mail: imaplib.IMAP4) -> Optional[int]:
+    """SELECT the inbox and return its UIDVALIDITY, or None if it can't be selected."""
+    status, _ = mail.select("inbox")
+    if status != 'OK':
+        return None
+    _, data = mail.response("UIDVALIDITY")
+    return int(data[0]) if data and data[0] else None
+
+
+def search_uids(mail: imaplib.IMAP4, after_uid: Optional[int] = None) -> list[int]:
+    """
+    UIDs in the inbox, ascending; with after_uid, only those above it.
+
+    'UID n:*' always matches the newest message even when its UID is below n,
+    so the result is filtered here as well as on the server.
+    """
+    criteria = f"UID {after_uid + 1}:*" if after_uid is not None else "ALL"
+    status, data = mail.uid("SEARCH", None, criteria)
+    if status != 'OK' or not data or not data[0]:
+        return []
+    uids = sorted(int(uid) for uid in data[0].split())
+    return [uid for uid in uids if uid > after_uid] if after_uid is not None else uids
+
+
+def _params(values) -> dict:
+    if not isinstance(values, list):
+        return {}
+    return {str(k).lower(): v for k, v in zip(values[::2], values[1::2])}
+
+
+def _leaf_parts(structure: list, section: str = "") -> Iterator[dict]:
+    """The non-multipart parts of a BODYSTRUCTURE, with their section numbers, in MIME order."""
+    if structure and isinstance(structure[0], list):
+        # Multipart: the child parts come first, then the subtype and extension data
+        children = itertools.takewhile(lambda child: isinstance(child, list), structure)
+        for i, child in enumerate(children, start=1):
+            yield from _leaf_parts(child, f"{section}.{i}" if section else str(i))
+        return
+    maintype, subtype = str(structure[0]).lower(), str(structure[1]).lower()
+    # Disposition sits after the type-specific fields and the MD5
+    disposition_index = {"text": 9, "message": 11}.get(maintype, 8)
+    if maintype == "message" and subtype != "rfc822":
+        disposition_index = 8
+    disposition = structure[disposition_index] if len(structure) > disposition_index else None
+    disposition_type, disposition_params = None, {}
+    if isinstance(disposition, list) and disposition:
+        disposition_type = str(disposition[0]).lower()
+        disposition_params = _params(disposition[1] if len(disposition) > 1 else None)
+    params = _params(structure[2])
+    yield {
+        "section": section or "1",
+        "content_type": f"{maintype}/{subtype}",
+        "encoding": str(structure[5] or "7bit").lower(),
+        "size": structure[6] if isinstance(structure[6], int) else 0,
+        "disposition": disposition_type,
+        "filename": disposition_params.get("filename") or params.get("name"),
+        "charset": params.get("charset"),
+    }
+def _select_parts(structure: list) -> tuple[Optional[dict], bool, list[dict]]:
+    """
+    The part to download as the body, whether it is HTML, and the attachment metadata.
+
+    Same choice as services.email_body.extract_body: the first text/plain part without a disposition,
+    else the last text/html one; a single-part message is its own body (HTML if it is text/html).
+    """
+    parts = list(_leaf_parts(structure))
+    if not isinstance(structure[0], list):
+        body, is_html = parts[0], parts[0]["content_type"] == "text/html"
+    else:
+        body, is_html = None, False
+        for part in parts:
+            if part["disposition"] is None and part["content_type"] == "text/plain":
+                body, is_html = part, False
+                break
+            if part["disposition"] is None and part["content_type"] == "text/html":
+                body, is_html = part, True
+    attachments = [
+        {"filename": part["filename"], "content_type": part["content_type"], "size": part["size"]}
+        for part in parts
+        if part is not body and (part["disposition"] == "attachment" or part["filename"]
+                                 or not part["content_type"].startswith("text/"))
+    ]
+    return body, is_html, attachments
+
+
+def _decode_part(data: bytes, encoding: str, truncated: bool) -> bytes:
+    if encoding == "base64":
+        data = b"".join(data.split())
+        # A byte cap can cut the last base64 quantum short
+        data = data[:len(data) - len(data) % 4]
+        try:
+            return base64.b64decode(data)
+        except binascii.Error:
+            return b""
+    if encoding == "quoted-printable":
+        if truncated:
+            data = _PARTIAL_QP_ESCAPE.sub(b"", data)
+        return quopri.decodestring(data)
+    return data
+
+
+def _item(items: dict, prefix: str):
+    return next((value for name, value in items.items() if name.startswith(prefix)), None)
+
+
+def fetch_messages(mail: imaplib.IMAP4, uids: list[int], chunk_size: int, uidvalidity: int,
+                   max_body_bytes: Optional[int] = None) -> Iterator[list[dict]]:
+    """
+    Fetch and parse the messages with these UIDs without downloading whole messages.
+
+    Per chunk of UIDs, one UID FETCH gets every message's BODYSTRUCTURE and
+    subject/from/date headers; then one UID FETCH per distinct body section gets
+    only the chosen text part, capped at max_body_bytes (IMAP_BODY_MAX_BYTES).
+    Attachments are never downloaded, only listed with their name, type and size.
+
+    Yields the parsed emails of each chunk as soon as it is complete, in the order
+    of uids. Messages missing from a response (e.g. expunged meanwhile) are skipped.
+    """
+    max_body_bytes = max_body_bytes or settings.IMAP_BODY_MAX_BYTES
+    for start in range(0, len(uids), chunk_size):
+        chunk = uids[start:start + chunk_size]
+        status, msg_data = mail.uid("FETCH", ",".join(str(uid) for uid in chunk),
+                                    f"(UID BODYSTRUCTURE BODY.PEEK[{_HEADER_FIELDS}])")
+        if status != 'OK' or not msg_data:
+            continue
+        messages = {}
+        for items in parse_fetch_response(msg_data):
+            if isinstance(items.get("UID"), int) and isinstance(items.get("BODYSTRUCTURE"), list):
+                headers = _item(items, "BODY[HEADER")
+                messages[items["UID"]] = (headers if isinstance(headers, bytes) else b"", *_select_parts(items["BODYSTRUCTURE"]))
+
+        # Body parts sit at different sections; ask for each section once for the whole chunk
+        uids_by_section = defaultdict(list)
+        for uid, (_, body, _, _) in messages.items():
+            if body is not None:
+                uids_by_section[body["section"]].append(uid)
+        bodies = {}
+        for section, section_uids in uids_by_section.items():
+            status, msg_data = mail.uid("FETCH", ",".join(str(uid) for uid in section_uids),
+                                        f"(UID BODY.PEEK[{section}]<0.{max_body_bytes}>)")
+            if status != 'OK' or not msg_data:
+                continue
+            for items in parse_fetch_response(msg_data):
+                content = _item(items, f"BODY[{section}]")
+                if items.get("UID") in messages:
+                    bodies[items["UID"]] = content if isinstance(content, bytes) else b""
+
+        # Decoding and HTML-to-text for the whole chunk at once, on the worker pool if configured
+        uids_with_body = [uid for uid in chunk if uid in messages and messages[uid][1] is not None and uid in bodies]
+        texts = dict(zip(uids_with_body, bodies_to_text([
+            (
+                _decode_part(bodies[uid], messages[uid][1]["encoding"], messages[uid][1]["size"] > max_body_bytes),
+                messages[uid][1]["charset"],
+                messages[uid][2],
+            )
+            for uid in uids_with_body
+        ])))
+
+        parsed = []
+        for uid in chunk:
+            if uid not in messages:
+                continue
+            headers, body, is_html, attachments = messages[uid]
+            msg = email.message_from_bytes(headers)
+            parsed.append({
+                "email_id": str(uid),
+                "subject": msg['subject'],
+                "from": msg['from'],
+                "date": msg['date'],
+                "body": texts.get(uid, ""),
+                "attachments": attachments,
+                "uid": uid,
+                "uidvalidity": uidvalidity,
+            })
+        yield parsed
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """
+    Immutable snapshot of one classifier artifact.
+    Requests grab a reference once and keep using it, so a reload never changes
+    the model under a request that is already running.
+    """
+    pipeline: Any
+    label_encoder: Any
+    labels: list
+    version: str
+    path: str
+    loaded_at: float
+
+    def predict_proba(self, processed_texts: list[str]):
+        return self.pipeline.predict_proba(processed_texts)
+
+
+def _artifact_stamp(path: str):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def load_artifact(path: str) -> LoadedModel:
+    """Unpickle a {'pipeline', 'label_encoder'} artifact; the version is a hash of its bytes."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    model_data = pickle.loads(raw)
+    pipeline = model_data['pipeline']
+    label_encoder = model_data['label_encoder']
+    # Column i of predict_proba belongs to pipeline.classes_[i]
+    labels = [str(label) for label in label_encoder.inverse_transform(pipeline.classes_)]
+    return LoadedModel(
+        pipeline=pipeline,
+        label_encoder=label_encoder,
+        labels=labels,
+        version=hashlib.sha256(raw).hexdigest()[:12],
+        path=path,
+        loaded_at=time.time(),
+    )
+
+
+class ModelRegistry:
+    """
+    Holds the current classifier and swaps it atomically on reload.
+
+    Readers only read `current` (a single reference), so they never wait on a reload.
+    Loads are serialized by a lock and the new model is built completely before the
+    reference is replaced. If a load fails the previous model stays in service.
+    New artifacts should be dropped in with an atomic rename (os.replace).
+    """
+
+    def __init__(self, path: str, loader: Callable[[str], LoadedModel] = load_artifact):
+        self.path = path
+        self._loader = loader
+        self._current: Optional[LoadedModel] = None
+        self._stamp = None
+        self._failed_stamp = None
+        self._lock = threading.Lock()
+        self._listeners: list[Callable[[Optional[LoadedModel], LoadedModel], None]] = []
+        self.reload_count = 0
+        self.last_error: Optional[str] = None
+        self.predictions: Counter = Counter()
+
+    @property
+    def current(self) -> Optional[LoadedModel]:
+        return self._current
+
+    def get(self) -> LoadedModel:
+        model = self._current
+        if model is None:
+            try:
+                model = self.load()
+            except Exception as e:
+                raise RuntimeError("Email classification model or label encoder not loaded.") from e
+        return model
+
+    def add_listener(self, listener: Callable[[Optional[LoadedModel], LoadedModel], None]):
+        """Register a callback run as listener(old_model, new_model) after every swap."""
+        self._listeners.append(listener)
+
+    def load(self, force: bool = False) -> LoadedModel:
+        with self._lock:
+            stamp = _artifact_stamp(self.path)
+            if not force and self._current is not None and stamp == self._stamp:
+                return self._current
+            try:
+                model = self._loader(self.path)
+            except Exception as e:
+                self._failed_stamp = stamp
+                self.last_error = str(e)
+                raise
+            previous = self._current
+            self._current = model
+            self._stamp = stamp
+            self._failed_stamp = None
+            self.last_error = None
+            if previous is not None:
+                self.reload_count += 1
+        print(f"Email classification model loaded successfully! version={model.version}")
+        for listener in self._listeners:
+            listener(previous, model)
+        return model
+
+    def has_changed(self) -> bool:
+        """True if the artifact on disk differs from the loaded one and has not already failed to load."""
+        try:
+            stamp = _artifact_stamp(self.path)
+        except FileNotFoundError:
+            return False
+        return stamp != self._stamp and stamp != self._failed_stamp
+
+    async def watch(self, interval: float):
+        """Poll the artifact and reload it off the event loop whenever it changes."""
+        while True:
+            await asyncio.sleep(interval)
+            if not self.has_changed():
+                continue
+            try:
+                await asyncio.to_thread(self.load)
+            except Exception as e:
+                print(f"Error reloading model from '{self.path}': {e}")
+
+    def record_predictions(self, version: str, count: int):
+        self.predictions[version] += count
+
+    def status(self) -> dict:
+        model = self._current
+        return {
+            "path": self.path,
+            "version": model.version if model else None,
+            "loaded_at": model.loaded_at if model else None,
+            "labels": model.labels if model else [],
+            "reload_count": self.reload_count,
+            "last_error": self.last_error,
+            "predictions_by_version": dict(self.predictions),
+        }
@@ -0,0 +1,258 @@
+"""
+Pure-NumPy scorer for the department classifier.
+
+`export_model` turns the fitted TfidfVectorizer + linear classifier of a
+{'pipeline', 'label_encoder'} artifact into a directory of:
+
+    vocab.txt      one vocabulary term per line, line number = column index
+    idf.npy        IDF weights, shape (n_features,)
+    weights.npy    classifier weights, shape (n_features, n_classes)
+    bias.npy       classifier bias, shape (n_classes,)
+    meta.json      analyzer settings, labels, probability kind and model version
+
+The .npy files are opened with mmap_mode='r', so every uvicorn worker on a host
+shares one copy of the weights through the page cache, and scikit-learn is never
+imported at inference time.
+
+    uv run python -m services.numpy_runtime export pkl_files/email_dataset_long.pkl pkl_files/numpy_model
+    uv run python -m services.numpy_runtime verify pkl_files/email_dataset_long.pkl pkl_files/numpy_model
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import time
+
+import numpy as np
+
+from services.model_registry import LoadedModel
+
+
+class NumpyPipeline:
+    """Reproduces TfidfVectorizer.transform followed by the classifier's predict_proba."""
+
+    def __init__(self, model_dir: str, meta: dict):
+        with open(os.path.join(model_dir, "vocab.txt"), encoding="utf-8") as f:
+            self.vocabulary = {term: i for i, term in enumerate(f.read().split("\n")[:meta["n_features"]])}
+        self.idf = np.load(os.path.join(model_dir, "idf.npy"), mmap_mode="r") if meta["use_idf"] else None
+        self.weights = np.load(os.path.join(model_dir, "weights.npy"), mmap_mode="r")
+        self.bias = np.load(os.path.join(model_dir, "bias.npy"), mmap_mode="r")
+        self.kind = meta["kind"]
+        self.ngram_range = tuple(meta["ngram_range"])
+        self.lowercase = meta["lowercase"]
+        self.binary = meta["binary"]
+        self.sublinear_tf = meta["sublinear_tf"]
+        self.norm = meta["norm"]
+        self.stop_words = frozenset(meta["stop_words"] or ())
+        self.token_pattern = re.compile(meta["token_pattern"])
+        self.classes_ = np.arange(len(meta["labels"]))
+
+    def _analyze(self, text: str) -> list[str]:
+        # Same steps and order as sklearn's CountVectorizer word analyzer
+        if self.lowercase:
+            text = text.lower()
+        tokens = self.token_pattern.findall(text)
+        if self.stop_words:
+            tokens = [w for w in tokens if w not in self.stop_words]
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+        original_tokens = tokens
+        if min_n == 1:
+            tokens = list(original_tokens)
+            min_n += 1
+        else:
+            tokens = []
+        n_original_tokens = len(original_tokens)
+        for n in range(min_n, min(max_n + 1, n_original_tokens + 1)):
+            for i in range(n_original_tokens - n + 1):
+                tokens.append(" ".join(original_tokens[i:i + n]))
+        return tokens
+
+    def transform_one(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        """Sparse TF-IDF row as (column indices sorted ascending, values)."""
+        counts: dict[int, int] = {}
+        vocabulary = self.vocabulary
+        for feature in self._analyze(text):
+            index = vocabulary.get(feature)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+        indices = np.fromiter(sorted(counts), dtype=np.intp, count=len(counts))
+        values = np.fromiter((counts[i] for i in indices), dtype=np.float64, count=len(counts))
+        if self.binary:
+            values[:] = 1.0
+        if self.sublinear_tf:
+            values = np.log(values) + 1
+        if self.idf is not None:
+            values = values * self.idf[indices]
+        if self.norm == "l2":
+            total = 0.0
+            for v in values.tolist():
+                total += v * v
+            if total != 0.0:
+                values = values / math.sqrt(total)
+        elif self.norm == "l1":
+            total = 0.0
+            for v in values.tolist():
+                total += abs(v)
+            if total != 0.0:
+                values = values / total
+        return indices, values
+
+    def transform(self, texts: list[str]) -> list[tuple[np.ndarray, np.ndarray]]:
+        return [self.transform_one(text) for text in texts]
+
+    def decision_function(self, rows: list[tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+        scores = np.empty((len(rows), self.weights.shape[1]), dtype=np.float64)
+        for row, (indices, values) in enumerate(rows):
+            if len(indices):
+                # Sequential accumulation over nonzeros, in column order, like scipy's csr matmul
+                scores[row] = np.cumsum(self.weights[indices] * values[:, None], axis=0)[-1]
+            else:
+                scores[row] = 0.0
+        return scores + self.bias
+
+    def predict_proba(self, texts: list[str]) -> np.ndarray:
+        return self.predict_proba_transformed(self.transform(texts))
+
+    def predict_proba_transformed(self, rows: list[tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+        scores = self.decision_function(rows)
+        if self.kind == "log_prob":
+            # MultinomialNB: exp(jll - logsumexp(jll)), with logsumexp computed the way
+            # scipy.special does it: the maxima are split out of the sum and added back via log1p
+            top = scores.max(axis=1, keepdims=True)
+            is_max = scores == top
+            n_max = is_max.sum(axis=1, keepdims=True).astype(np.float64)
+            rest = np.where(is_max, 0.0, np.exp(scores - top)).sum(axis=1, keepdims=True) / n_max
+            log_norm = np.log1p(rest) + np.log(n_max) + top
+            return np.exp(scores - log_norm)
+        if self.kind == "softmax":
+            exp = np.exp(scores - scores.max(axis=1, keepdims=True))
+            return exp / exp.sum(axis=1, keepdims=True)
+        if self.kind == "binary":
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1 - positive, positive])
+        # one-vs-rest: independent sigmoids, normalized per row
+        prob = 1.0 / (1.0 + np.exp(-scores))
+        return prob / prob.sum(axis=1, keepdims=True)
+
+
+def load_numpy_artifact(meta_path: str) -> LoadedModel:
+    """Registry loader for an exported directory; meta.json is the file the registry watches."""
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    pipeline = NumpyPipeline(os.path.dirname(meta_path), meta)
+    return LoadedModel(
+        pipeline=pipeline,
+        label_encoder=None,
+        labels=meta["labels"],
+        version=meta["version"],
+        path=meta_path,
+        loaded_at=time.time(),
+    )
+
+
+def _classifier_arrays(classifier) -> tuple[str, np.ndarray, np.ndarray]:
+    name = type(classifier).__name__
+    if name == "MultinomialNB":
+        return "log_prob", classifier.feature_log_prob_, classifier.class_log_prior_
+    if name == "LogisticRegression":
+        if len(classifier.classes_) == 2:
+            return "binary", classifier.coef_, classifier.intercept_
+        ovr = classifier.multi_class == "ovr" or (
+            classifier.multi_class in ("auto", "deprecated", "warn") and classifier.solver == "liblinear"
+        )
+        return ("ovr" if ovr else "softmax"), classifier.coef_, classifier.intercept_
+    raise ValueError(f"Unsupported classifier for the NumPy runtime: {name}")
+
+
+def export_model(artifact_path: str, out_dir: str) -> dict:
+    """Write the NumPy runtime files for a pickled TF-IDF + linear classifier artifact."""
+    import pickle
+
+    with open(artifact_path, "rb") as f:
+        raw = f.read()
+    model_data = pickle.loads(raw)
+    pipeline = model_data["pipeline"]
+    label_encoder = model_data["label_encoder"]
+    vectorizer, classifier = pipeline.steps[0][1], pipeline.steps[-1][1]
+    if len(pipeline.steps) != 2 or type(vectorizer).__name__ != "TfidfVectorizer":
+        raise ValueError("Only TfidfVectorizer + classifier pipelines can be exported.")
+    if vectorizer.analyzer != "word" or vectorizer.preprocessor or vectorizer.tokenizer or vectorizer.strip_accents:
+        raise ValueError("Only the default word analyzer without custom preprocessing can be exported.")
+    kind, weights, bias = _classifier_arrays(classifier)
+
+    os.makedirs(out_dir, exist_ok=True)
+    terms = [None] * len(vectorizer.vocabulary_)
+    for term, index in vectorizer.vocabulary_.items():
+        terms[index] = term
+    with open(os.path.join(out_dir, "vocab.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(terms))
+    if vectorizer.use_idf:
+        np.save(os.path.join(out_dir, "idf.npy"), np.ascontiguousarray(vectorizer.idf_, dtype=np.float64))
+    np.save(os.path.join(out_dir, "weights.npy"), np.ascontiguousarray(np.asarray(weights, dtype=np.float64).T))
+    np.save(os.path.join(out_dir, "bias.npy"), np.ascontiguousarray(bias, dtype=np.float64))
+    stop_words = vectorizer.get_stop_words()
+    meta = {
+        "version": hashlib.sha256(raw).hexdigest()[:12],
+        "source": artifact_path,
+        "kind": kind,
+        "labels": [str(label) for label in label_encoder.inverse_transform(classifier.classes_)],
+        "n_features": len(terms),
+        "ngram_range": list(vectorizer.ngram_range),
+        "lowercase": vectorizer.lowercase,
+        "token_pattern": vectorizer.token_pattern,
+        "stop_words": sorted(stop_words) if stop_words else None,
+        "binary": vectorizer.binary,
+        "sublinear_tf": vectorizer.sublinear_tf,
+        "use_idf": vectorizer.use_idf,
+        "norm": vectorizer.norm,
+    }
+    # meta.json goes last and atomically: it is what the model registry watches
+    tmp_path = os.path.join(out_dir, "meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(out_dir, "meta.json"))
+    return meta
+
+
+def verify_export(artifact_path: str, out_dir: str, texts: list[str]) -> dict:
+    """Compare sklearn and NumPy predictions on texts (already preprocessed)."""
+    from services.model_registry import load_artifact
+
+    reference = load_artifact(artifact_path)
+    candidate = load_numpy_artifact(os.path.join(out_dir, "meta.json"))
+    expected = reference.predict_proba(texts)
+    actual = candidate.predict_proba(texts)
+    return {
+        "emails": len(texts),
+        "label_mismatches": int((expected.argmax(axis=1) != actual.argmax(axis=1)).sum()),
+        "identical_rows": int((expected == actual).all(axis=1).sum()),
+        "max_abs_probability_diff": float(np.abs(expected - actual).max()) if len(texts) else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import csv
+
+    from services.classify_email import preprocess_text_simple
+
+    parser = argparse.ArgumentParser(description="Export or verify the NumPy classifier runtime.")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("artifact", help="pickled {'pipeline', 'label_encoder'} artifact")
+    parser.add_argument("out_dir", help="directory of the exported runtime")
+    parser.add_argument("--dataset", default="pkl_files/email_dataset_long.csv")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        meta = export_model(args.artifact, args.out_dir)
+        print(f"Exported {meta['n_features']} features, {len(meta['labels'])} classes, version {meta['version']}")
+    else:
+        with open(args.dataset, newline="", encoding="utf-8") as f:
+            texts = [preprocess_text_simple(row["email_text"]) for row in csv.DictReader(f)]
+        report = verify_export(args.artifact, args.out_dir, texts)
+        print(json.dumps(report, indent=2))
+        if report["label_mismatches"]:
+            raise SystemExit(1)
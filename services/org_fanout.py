@@ -0,0 +1,66 @@
+import asyncio
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Union
+
+from core import settings
+
+# Org runs are blocking (IMAP, database, LLM calls), so they get their own threads rather
+# than asyncio's default pool, which is sized for the CPU count
+_executor = ThreadPoolExecutor(max_workers=settings.ORG_FANOUT_CONCURRENCY, thread_name_prefix="org-fanout")
+
+
+RunOrg = Union[Callable[[int], dict], Callable[[int], Awaitable[dict]]]
+
+
+async def _run_one(org_id: int, run_org: RunOrg, timeout: float, semaphore: asyncio.Semaphore) -> dict:
+    await semaphore.acquire()
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    if inspect.iscoroutinefunction(run_org):
+        future = asyncio.ensure_future(run_org(org_id))
+    else:
+        future = loop.run_in_executor(_executor, run_org, org_id)
+    # A blocking run that times out can't be interrupted; its slot frees up only when it really ends
+    future.add_done_callback(lambda _: semaphore.release())
+    try:
+        result = await asyncio.wait_for(asyncio.shield(future), timeout)
+    except asyncio.CancelledError:
+        # The request itself went away (client disconnected): the shield kept the run going, so stop it too
+        if isinstance(future, asyncio.Task):
+            future.cancel()
+        raise
+    except asyncio.TimeoutError:
+        if isinstance(future, asyncio.Task):
+            # A coroutine can: its pending database and LLM calls are dropped (a thread it awaits still runs out)
+            future.cancel()
+        return {"orgId": org_id, "status": "timeout", "error": f"No result within {timeout}s",
+                "elapsed_ms": (time.perf_counter() - start) * 1000}
+    except Exception as e:
+        return {"orgId": org_id, "status": "error", "error": str(e),
+                "elapsed_ms": (time.perf_counter() - start) * 1000}
+    error = result.get("error") if isinstance(result, dict) else None
+    return {"orgId": org_id, "status": "error" if error else "ok", "error": error, "result": result,
+            "elapsed_ms": (time.perf_counter() - start) * 1000}
+
+
+async def run_for_orgs(org_ids: list[int], run_org: RunOrg, timeout: float,
+                       concurrency: int | None = None) -> dict:
+    """
+    Run run_org for every org concurrently (at most `concurrency` at a time), each under its own timeout.
+    run_org is either blocking (run on the fan-out's threads) or a coroutine function (awaited on the loop).
+
+    One org failing or timing out doesn't affect the others: every org gets an entry
+    with status "ok", "error" or "timeout", and the totals say how many succeeded.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.ORG_FANOUT_CONCURRENCY)
+    start = time.perf_counter()
+    orgs = await asyncio.gather(*(_run_one(org_id, run_org, timeout, semaphore) for org_id in org_ids))
+    succeeded = sum(1 for org in orgs if org["status"] == "ok")
+    return {
+        "orgs": orgs,
+        "succeeded": succeeded,
+        "failed": len(orgs) - succeeded,
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+    }
@@ -1,7 +1,8 @@
 from sqlmodel import Session, select
-from models.schema import Org
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.schema import Org, OrgMailboxState
 from typing import List, Optional
-from core.database import engine
+from core.database import async_engine, engine
 
 # 1. Create Org
 def create_org(org: Org) -> Org:
@@ -22,3 +23,48 @@ def get_org_by_id(org_id: int) -> Optional[Org]:
     with Session(engine) as session:
         org = session.get(Org, org_id)
         return org
+
+
+# 4. Get the mailbox sync position of an org
+def get_mailbox_state(org_id: int) -> Optional[OrgMailboxState]:
+    with Session(engine) as session:
+        return session.get(OrgMailboxState, org_id)
+
+# 5. Save the mailbox sync position of an org
+def save_mailbox_state(org_id: int, uidvalidity: int, last_uid: int) -> OrgMailboxState:
+    with Session(engine) as session:
+        mailbox_state = session.get(OrgMailboxState, org_id) or OrgMailboxState(org_id=org_id, uidvalidity=uidvalidity)
+        mailbox_state.uidvalidity = uidvalidity
+        mailbox_state.last_uid = last_uid
+        session.add(mailbox_state)
+        session.commit()
+        session.refresh(mailbox_state)
+        return mailbox_state
+
+
+# Async variants for request handlers (the ones above stay for scripts and sync graph nodes)
+async def create_org_async(org: Org) -> Org:
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        session.add(org)
+        await session.commit()
+        await session.refresh(org)
+        return org
+
+async def get_orgs_by_user_async(user_id: int) -> List[Org]:
+    async with AsyncSession(async_engine) as session:
+        orgs = (await session.exec(select(Org).where(Org.userId == user_id))).all()
+        return list(orgs)
+
+async def get_org_by_id_async(org_id: int) -> Optional[Org]:
+    async with AsyncSession(async_engine) as session:
+        return await session.get(Org, org_id)
+
+async def save_mailbox_state_async(org_id: int, uidvalidity: int, last_uid: int) -> OrgMailboxState:
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        mailbox_state = await session.get(OrgMailboxState, org_id) or OrgMailboxState(org_id=org_id, uidvalidity=uidvalidity)
+        mailbox_state.uidvalidity = uidvalidity
+        mailbox_state.last_uid = last_uid
+        session.add(mailbox_state)
+        await session.commit()
+        await session.refresh(mailbox_state)
+        return mailbox_state
@@ -1,27 +1,27 @@
-from core import settings
-from langchain.chat_models import init_chat_model
-from langchain_openai import OpenAIEmbeddings
+from services.llm_gateway import get_chat_model, get_embeddings
 from langchain_postgres import PGVector
 import os
 
-from services.generate_email_from_db import execute_query
+from core.database import async_engine
+from services.generate_email_from_db import execute_query, execute_query_async
 
-def retrieve_from_pgvector(query: str, collection_name: str, k: int = 3):
-	check_sql = f"""
+def _collection_check_sql(collection_name: str) -> str:
+	return f"""
     SELECT 1 FROM langchain_pg_collection 
     WHERE name = '{collection_name}'
     """
 
-	exists = execute_query(check_sql)
+def retrieve_documents(query: str, collection_name: str, k: int = 3):
+	"""
+	Top-k documents of a collection for the query, or None if the collection does not exist. No LLM call.
+	"""
+	exists = execute_query(_collection_check_sql(collection_name))
  
 	data = exists.get("data", [])
 	if not data:
-		return {
-			"results": [],
-			"llm_answer": f"Collection '{collection_name}' does not exist."
-		}
+		return None
 	# Retrieve results
-	embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+	embeddings = get_embeddings("rag_embeddings")
 	vector_store = PGVector(
 		embeddings=embeddings,
 		collection_name=collection_name,
@@ -31,19 +31,58 @@ def retrieve_from_pgvector(query: str, collection_name: str, k: int = 3):
 		search_type="similarity",
 		search_kwargs={"k": k},
 	)
-	results = retriever.invoke(query)
+	return retriever.invoke(query)
 
-	# Initialize LLM
-	llm = init_chat_model(
-		model="gpt-4o-mini",
-		temperature=0,
-		api_key=settings.OPENAI_API_KEY
+async def retrieve_documents_async(query: str, collection_name: str, k: int = 3):
+	"""
+	retrieve_documents on the async engine, with the query embedded by the async client.
+	"""
+	exists = await execute_query_async(_collection_check_sql(collection_name))
+	if not exists.get("data", []):
+		return None
+	vector_store = PGVector(
+		embeddings=get_embeddings("rag_embeddings"),
+		collection_name=collection_name,
+		connection=async_engine,
+		async_mode=True,
+	)
+	retriever = vector_store.as_retriever(
+		search_type="similarity",
+		search_kwargs={"k": k},
 	)
+	return await retriever.ainvoke(query)
+
+def _missing_collection(collection_name: str) -> dict:
+	return {
+		"results": [],
+		"llm_answer": f"Collection '{collection_name}' does not exist."
+	}
 
+def _rag_prompt(query: str, results) -> str:
 	# Aggregate retrieved docs for context
 	context = "\n\n".join([doc.page_content for doc in results])
-	prompt = f"Context:\n{context}\n\nQuestion: {query}\nAnswer:"
-	llm_response = llm.invoke(prompt)
+	return f"Context:\n{context}\n\nQuestion: {query}\nAnswer:"
+
+def retrieve_from_pgvector(query: str, collection_name: str, k: int = 3):
+	results = retrieve_documents(query, collection_name, k)
+	if results is None:
+		return _missing_collection(collection_name)
+
+	# Shared client: keeps its pooled connections between requests
+	llm = get_chat_model("rag_answer")
+	llm_response = llm.invoke(_rag_prompt(query, results))
+
+	return {
+		"results": results,
+		"llm_answer": llm_response.content if hasattr(llm_response, 'content') else str(llm_response)
+	}
+
+async def retrieve_from_pgvector_async(query: str, collection_name: str, k: int = 3):
+	results = await retrieve_documents_async(query, collection_name, k)
+	if results is None:
+		return _missing_collection(collection_name)
+
+	llm_response = await get_chat_model("rag_answer").ainvoke(_rag_prompt(query, results))
 
 	return {
 		"results": results,
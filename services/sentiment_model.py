@@ -0,0 +1,39 @@
+"""
+Local sentiment classifier, used before the LLM.
+
+The artifact has the same {'pipeline', 'label_encoder'} shape as the department
+classifier (scikit-learn/main.py train --label-column sentiment) and is served
+by its own ModelRegistry. Emails it labels with at least SENTIMENT_LOCAL_THRESHOLD
+confidence never reach the LLM.
+"""
+from typing import Optional
+
+from core import settings
+from services.model_registry import ModelRegistry
+from services.text_normalizer import normalize_texts
+
+# Empty SENTIMENT_MODEL_PATH: every email goes to the LLM
+registry = ModelRegistry(settings.SENTIMENT_MODEL_PATH) if settings.SENTIMENT_MODEL_PATH else None
+
+
+def current_version() -> Optional[str]:
+    if registry is None:
+        return None
+    try:
+        return registry.get().version
+    except Exception:
+        return None
+
+
+def predict_sentiments(texts: list[str]) -> list[dict]:
+    """{'sentiment', 'confidence', 'model_version'} per text, in input order."""
+    if registry is None or not texts:
+        return []
+    model = registry.get()
+    probabilities = model.predict_proba(normalize_texts(texts))
+    best = probabilities.argmax(axis=1)
+    registry.record_predictions(model.version, len(texts))
+    return [
+        {"sentiment": model.labels[best_index], "confidence": float(row[best_index]), "model_version": model.version}
+        for row, best_index in zip(probabilities, best)
+    ]
@@ -0,0 +1,70 @@
+"""
+Packing several emails into one sentiment request.
+
+Each email becomes a block headed "### Email <id>"; the model answers with one
+JSON object mapping every id to its category. Packs are filled greedily up to a
+token budget (estimated at CHARS_PER_TOKEN characters per token, no tokenizer
+needed) and a maximum number of emails; a body that wouldn't fit even alone is
+truncated. parse_packed_response keeps only well-formed answers for the ids that
+were asked, so the caller can re-issue the rest.
+"""
+import json
+import re
+from typing import Optional
+
+CHARS_PER_TOKEN = 4
+SENTIMENTS = ("Positive", "Negative", "Neutral")
+
+_BLOCK_OVERHEAD = 8  # tokens for the "### Email <id>" header and separators
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def email_text(subject: Optional[str], body: Optional[str], max_tokens: Optional[int] = None) -> str:
+    """The text analysed for one email, cut to about max_tokens."""
+    text = f"Subject: {subject}\nBody: {body}"
+    if max_tokens is not None and estimate_tokens(text) > max_tokens:
+        text = text[:max(max_tokens, 1) * CHARS_PER_TOKEN]
+    return text
+
+
+def build_packs(items: list[tuple[str, str]], token_budget: int, max_emails: int) -> list[list[tuple[str, str]]]:
+    """Split (id, text) pairs into packs of at most max_emails whose estimated size stays within token_budget."""
+    packs: list[list[tuple[str, str]]] = []
+    pack: list[tuple[str, str]] = []
+    used = 0
+    for email_id, text in items:
+        # An email too long for an empty pack gets one to itself, truncated
+        text = text[:max(token_budget - _BLOCK_OVERHEAD, 1) * CHARS_PER_TOKEN]
+        tokens = estimate_tokens(text) + _BLOCK_OVERHEAD
+        if pack and (used + tokens > token_budget or len(pack) >= max_emails):
+            packs.append(pack)
+            pack, used = [], 0
+        pack.append((email_id, text))
+        used += tokens
+    if pack:
+        packs.append(pack)
+    return packs
+
+
+def render_pack(pack: list[tuple[str, str]]) -> str:
+    return "\n\n".join(f"### Email {email_id}\n{text}" for email_id, text in pack)
+
+
+def parse_packed_response(content: str, ids: list[str]) -> dict[str, str]:
+    """Valid categories by id from a packed answer; ids missing or with anything but a known category are left out."""
+    try:
+        data = json.loads(_FENCE.sub("", content.strip()))
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    results = {}
+    for email_id in ids:
+        value = data.get(email_id)
+        if isinstance(value, str) and value.strip().capitalize() in SENTIMENTS:
+            results[email_id] = value.strip().capitalize()
+    return results
@@ -12,7 +12,6 @@
 #
 # This approach is robust for semantic search, RAG, and LLM pipelines, balancing chunk size, context, and deduplication.
 from langchain_community.document_loaders import PyPDFLoader
-from langchain_openai import OpenAIEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_postgres import PGVector
 from dotenv import load_dotenv
@@ -21,6 +20,7 @@ import os
 import tempfile
 from core.config import settings
 from models.request_response import StorePDFRequest
+from services.llm_gateway import get_embeddings
 
 load_dotenv()
 
@@ -108,7 +108,7 @@ def store_pdf_in_pgvector(file_or_path, collection_name="hr_documents", loader_c
             chunk.metadata['content_hash'] = content_hash
 
         # Embeddings
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+        embeddings = get_embeddings("pdf_embeddings")
 
         # PGVector store
         vector_store = PGVector(
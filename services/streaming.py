@@ -0,0 +1,108 @@
+"""
+Streaming responses: Server-Sent Events and newline-delimited JSON.
+
+sse_response turns an async iterator of (event, data) pairs into a
+text/event-stream response, ndjson_response an async iterator of dicts into
+one JSON object per line. The iterator runs in its own task while the
+response polls for a client disconnect; on disconnect that task is cancelled,
+which closes the upstream model request and frees its gateway slot instead of
+producing output nobody will read.
+"""
+import asyncio
+import json
+from contextlib import suppress
+from typing import Any, AsyncIterator, Callable
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+DISCONNECT_POLL_SECONDS = 0.1
+_END = object()
+
+
+def format_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def format_line(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+async def text_events(chunks: AsyncIterator[str], result_key: str) -> AsyncIterator[tuple[str, dict]]:
+    """A "token" event per text chunk, then "done" with the whole text under result_key."""
+    parts = []
+    async for chunk in chunks:
+        parts.append(chunk)
+        yield "token", {"text": chunk}
+    yield "done", {result_key: "".join(parts)}
+
+
+async def _produce(items: AsyncIterator[Any], queue: asyncio.Queue, format_item: Callable[[Any], str],
+                   format_error: Callable[[str], str]):
+    try:
+        async for item in items:
+            await queue.put(format_item(item))
+    except Exception as e:
+        print(f"Stream failed: {e}")
+        await queue.put(format_error(str(e)))
+    finally:
+        await queue.put(_END)
+
+
+async def _until_disconnected(request: Request, items: AsyncIterator[Any], format_item: Callable[[Any], str],
+                              format_error: Callable[[str], str]) -> AsyncIterator[str]:
+    queue: asyncio.Queue = asyncio.Queue()
+    producer = asyncio.create_task(_produce(items, queue, format_item, format_error))
+    loop = asyncio.get_running_loop()
+    next_check = loop.time() + DISCONNECT_POLL_SECONDS
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), max(next_check - loop.time(), 0))
+            except asyncio.TimeoutError:
+                item = None
+            # Polled on a timer, also while tokens flow: servers drop writes to a closed connection silently
+            if loop.time() >= next_check:
+                if await request.is_disconnected():
+                    print("Client disconnected, cancelling the stream")
+                    return
+                next_check = loop.time() + DISCONNECT_POLL_SECONDS
+            if item is _END:
+                return
+            if item is not None:
+                yield item
+    finally:
+        producer.cancel()
+        with suppress(asyncio.CancelledError):
+            await producer
+
+
+class _CancellingStreamResponse(StreamingResponse):
+    async def __call__(self, scope, receive, send):
+        # No disconnect-listener task group here (unlike StreamingResponse): its cancel scope keeps
+        # re-cancelling the producer while httpx closes the upstream connection, leaving it open
+        try:
+            await self.stream_response(send)
+        except OSError:
+            pass  # the client went away
+        finally:
+            await self.body_iterator.aclose()
+
+
+def sse_response(request: Request, events: AsyncIterator[tuple[str, Any]]) -> StreamingResponse:
+    return _CancellingStreamResponse(
+        _until_disconnected(request, events, lambda event: format_event(*event),
+                            lambda detail: format_event("error", {"detail": detail})),
+        media_type="text/event-stream",
+        # No proxy buffering or caching: each event should reach the client as soon as it is written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def ndjson_response(request: Request, records: AsyncIterator[dict]) -> StreamingResponse:
+    return _CancellingStreamResponse(
+        _until_disconnected(request, records, format_line,
+                            lambda detail: format_line({"type": "error", "detail": detail})),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,42 @@
+"""
+Fast text normalization for the department classifier.
+
+Produces output byte-identical to the original five-regex preprocessing
+(lowercase, emails -> email_address, URLs -> url_link, standalone numbers ->
+number, punctuation other than ? and ! -> space, collapse whitespace), with
+fewer and cheaper passes:
+
+- the email and URL passes only run when the text can contain a match
+  ('@', 'http' or 'www' present), so most bodies skip two full copies;
+- the email pattern is anchored to the start of a whitespace-delimited run
+  instead of being retried (with backtracking) at every character;
+- the number pattern starts with a digit, which lets the regex engine skip
+  straight to candidate positions instead of testing \\b everywhere.
+"""
+import re
+
+# A run of non-space characters is replaced whole when it has an '@' with something on both sides
+_EMAIL = re.compile(r'(?<!\S)\S+@\S+')
+_URL = re.compile(r'http\S+|www\S+')
+# Same matches as \b\d+\b: a digit run with no word character directly before or after it
+_NUMBER = re.compile(r'\d(?<!\w\d)\d*(?!\w)')
+_PUNCTUATION = re.compile(r'[^\w\s?!]')
+
+
+def normalize_text(text) -> str:
+    if text is None:
+        return ""
+    text = text.lower()
+    if '@' in text:
+        text = _EMAIL.sub(' email_address ', text)
+    if 'http' in text or 'www' in text:
+        text = _URL.sub(' url_link ', text)
+    text = _NUMBER.sub(' number ', text)
+    text = _PUNCTUATION.sub(' ', text)
+    return ' '.join(text.split())
+
+
+def normalize_texts(texts) -> list[str]:
+    """Batch variant of normalize_text; results keep input order."""
+    normalize = normalize_text
+    return [normalize(text) for text in texts]